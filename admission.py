@@ -0,0 +1,227 @@
+"""
+Admission Control: Backpressure in front of the chat workflow
+- Concurrency limit (MAX_INFLIGHT) with a bounded wait queue (MAX_QUEUE)
+- Per-session and per-IP token buckets
+- Fast rejections carrying a Retry-After hint (429 rate limited, 503 overloaded)
+- Queue wait time metrics
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+# Workflow runs allowed at once (each one makes upstream Gemini calls)
+MAX_INFLIGHT = int(os.getenv("MAX_INFLIGHT", "8"))
+
+# Requests allowed to wait for a slot; beyond this they are rejected at once
+MAX_QUEUE = int(os.getenv("MAX_QUEUE", "32"))
+
+# Longest a request may wait in the queue (seconds)
+QUEUE_TIMEOUT = float(os.getenv("QUEUE_TIMEOUT", "5"))
+
+# Token buckets: sustained requests/second and burst size
+SESSION_RATE = float(os.getenv("SESSION_RATE", "0.5"))
+SESSION_BURST = int(os.getenv("SESSION_BURST", "5"))
+IP_RATE = float(os.getenv("IP_RATE", "2"))
+IP_BURST = int(os.getenv("IP_BURST", "20"))
+
+# Buckets kept per limiter before the least recently used are dropped
+MAX_TRACKED_KEYS = 10000
+
+
+class AdmissionRejected(Exception):
+    """Request refused before any work was done"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+# ============================================================================
+# TOKEN BUCKETS
+# ============================================================================
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> Tuple[bool, float]:
+        """
+        Take one token if available
+
+        Returns:
+            (acquired, seconds until a token will be available)
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+class RateLimiter:
+    """One token bucket per key (session ID, client IP), LRU-bounded"""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = MAX_TRACKED_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key: str) -> Tuple[bool, float]:
+        """Consume a token for key; returns (allowed, retry_after_seconds)"""
+        if self.rate <= 0 or not key:
+            return True, 0.0
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.try_acquire()
+
+
+# ============================================================================
+# CONCURRENCY LIMITER
+# ============================================================================
+
+class AdmissionController:
+    """
+    Limit concurrent workflow runs and queue a bounded number of waiters
+
+    Usage:
+        async with admission.slot(timeout=...):
+            result = await run_workflow(...)
+    """
+
+    def __init__(self, max_inflight: int = MAX_INFLIGHT, max_queue: int = MAX_QUEUE,
+                 queue_timeout: float = QUEUE_TIMEOUT):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.session_limiter = RateLimiter(SESSION_RATE, SESSION_BURST)
+        self.ip_limiter = RateLimiter(IP_RATE, IP_BURST)
+        self._semaphore = None
+        self.inflight = 0
+        self.waiting = 0
+        # Recent service times, for Retry-After estimates
+        self._service_times = deque(maxlen=100)
+        self._wait_times = deque(maxlen=1000)
+        self.counters = {
+            "admitted": 0,
+            "admitted_after_wait": 0,
+            "rejected_queue_full": 0,
+            "rejected_queue_timeout": 0,
+            "rate_limited_session": 0,
+            "rate_limited_ip": 0,
+        }
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the server's running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_inflight)
+        return self._semaphore
+
+    def _estimated_wait(self) -> float:
+        """Rough time until a slot frees up, from recent service times"""
+        if not self._service_times:
+            return 1.0
+        avg = sum(self._service_times) / len(self._service_times)
+        return avg * (self.waiting + 1) / max(self.max_inflight, 1)
+
+    def check_rate_limits(self, client_ip: Optional[str], session_id: Optional[str]):
+        """
+        Apply per-IP and per-session token buckets
+
+        Raises:
+            AdmissionRejected: 429 with the time until the next token
+        """
+        allowed, retry_after = self.ip_limiter.check(client_ip)
+        if not allowed:
+            self.counters["rate_limited_ip"] += 1
+            raise AdmissionRejected(429, "Too many requests from this client", retry_after)
+        allowed, retry_after = self.session_limiter.check(session_id)
+        if not allowed:
+            self.counters["rate_limited_session"] += 1
+            raise AdmissionRejected(429, "Too many requests in this session", retry_after)
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None):
+        """
+        Hold one workflow slot for the duration of the block
+
+        Args:
+            timeout: Max seconds to wait in the queue (default QUEUE_TIMEOUT)
+
+        Raises:
+            AdmissionRejected: 503 when the queue is full or the wait times out
+        """
+        semaphore = self._get_semaphore()
+        queued_at = time.monotonic()
+        if semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.counters["rejected_queue_full"] += 1
+                raise AdmissionRejected(503, "Server busy, queue is full", self._estimated_wait())
+            self.waiting += 1
+            try:
+                wait_timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+                await asyncio.wait_for(semaphore.acquire(), timeout=max(wait_timeout, 0))
+            except asyncio.TimeoutError:
+                self.counters["rejected_queue_timeout"] += 1
+                raise AdmissionRejected(503, "Server busy, timed out waiting in queue", self._estimated_wait())
+            finally:
+                self.waiting -= 1
+            self.counters["admitted_after_wait"] += 1
+        else:
+            await semaphore.acquire()
+
+        self._wait_times.append(time.monotonic() - queued_at)
+        self.counters["admitted"] += 1
+        self.inflight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            self._service_times.append(time.monotonic() - started)
+            semaphore.release()
+
+    def snapshot(self) -> Dict:
+        """Current load, rejection counters and queue wait percentiles"""
+        waits = sorted(self._wait_times)
+
+        def pct(p):
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p / 100 * len(waits)))] * 1000, 1)
+
+        return {
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "inflight": self.inflight,
+            "queue_depth": self.waiting,
+            **self.counters,
+            "queue_wait_ms": {
+                "p50": pct(50),
+                "p95": pct(95),
+                "p99": pct(99),
+                "max": round(waits[-1] * 1000, 1) if waits else 0.0,
+            },
+        }
@@ -0,0 +1,233 @@
+"""
+BM25 Lexical Index: In-memory inverted index over catalog chunks
+Complements embedding similarity for exact SKU/model tokens
+("SW-PRO-X-001", "20000mAh", "UltraView 4K"). Built at ingest time by
+embed_and_store.py and loaded lazily on first search.
+
+Usage:
+    python bm25_index.py            # Rebuild chroma_db/bm25_index.json from product_info.txt
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+# Imported lazily: the API only needs BM25_INDEX_PATH at startup
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+from local_embeddings import tokenize
+
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", os.path.join("chroma_db", "bm25_index.json"))
+
+STOPWORDS = {
+    "a", "an", "and", "are", "any", "can", "do", "does", "for", "have", "how", "i",
+    "in", "is", "it", "me", "my", "of", "on", "or", "show", "tell", "the", "there",
+    "to", "what", "whats", "which", "with", "you", "your", "about", "s",
+}
+
+_SUBTOKEN = re.compile(r"[a-z]+|\d+")
+
+
+def tokenize_terms(text: str) -> List[str]:
+    """
+    Tokenize text into index terms
+
+    Compound tokens are kept whole and also split into their alphabetic and
+    numeric parts, so "SW-PRO-X-001" matches both the full SKU and "001",
+    and "20000mAh" matches a query for "20000".
+    """
+    terms = []
+    for token in tokenize(text):
+        if token not in STOPWORDS:
+            terms.append(token)
+        parts = _SUBTOKEN.findall(token)
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p not in STOPWORDS)
+    return terms
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed set of documents"""
+
+    def __init__(self, documents: List[Dict], postings: Dict[str, List[List[int]]],
+                 doc_lengths: List[int], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+        total = len(doc_lengths)
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in postings.items()
+        }
+
+    @classmethod
+    def build(cls, documents: List["Document"], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """Build an index from LangChain Documents"""
+        stored = []
+        postings: Dict[str, List[List[int]]] = {}
+        doc_lengths = []
+        for doc_id, doc in enumerate(documents):
+            terms = tokenize_terms(doc.page_content)
+            doc_lengths.append(len(terms))
+            for term, freq in Counter(terms).items():
+                postings.setdefault(term, []).append([doc_id, freq])
+            stored.append({"text": doc.page_content, "metadata": dict(doc.metadata)})
+        return cls(stored, postings, doc_lengths, k1=k1, b=b)
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[int, float]]:
+        """
+        Score documents against the query
+
+        Returns:
+            Up to k (doc_id, score) pairs, best first
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize_terms(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for doc_id, freq in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_doc_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def document(self, doc_id: int) -> "Document":
+        """Return the stored Document for a doc_id"""
+        from langchain_core.documents import Document
+
+        stored = self.documents[doc_id]
+        return Document(page_content=stored["text"], metadata=dict(stored["metadata"]))
+
+    def save(self, path: str = BM25_INDEX_PATH):
+        """Write the index to a JSON file"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": 1,
+                "k1": self.k1,
+                "b": self.b,
+                "documents": self.documents,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str = BM25_INDEX_PATH) -> "BM25Index":
+        """Read an index written by save()"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["documents"], data["postings"], data["doc_lengths"], k1=data["k1"], b=data["b"])
+
+
+# ============================================================================
+# LAZY LOADING
+# ============================================================================
+
+_loaded_indexes: Dict[str, Tuple[float, Optional[BM25Index]]] = {}
+_load_lock = threading.Lock()
+
+
+def load_bm25_index(path: str = BM25_INDEX_PATH) -> Optional[BM25Index]:
+    """
+    Load the index on first use and cache it per path
+
+    Reloads automatically if the file is rebuilt. Returns None if no
+    index has been built yet, so callers can fall back to vector search.
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    cached = _loaded_indexes.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with _load_lock:
+        cached = _loaded_indexes.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        index = BM25Index.load(path)
+        _loaded_indexes[path] = (mtime, index)
+        return index
+
+
+# ============================================================================
+# RANK FUSION
+# ============================================================================
+
+def document_key(doc: "Document") -> str:
+    """Identity of a chunk across retrievers (SKU for product records)"""
+    return doc.metadata.get("sku") or doc.page_content
+
+
+def reciprocal_rank_fusion(result_lists: List[List["Document"]], k: int = 4, rrf_k: int = 60) -> List["Document"]:
+    """
+    Merge ranked result lists with Reciprocal Rank Fusion
+
+    score(doc) = sum over lists of 1 / (rrf_k + rank)
+
+    Args:
+        result_lists: Ranked Documents from each retriever
+        k: Number of documents to return
+        rrf_k: Damping constant (60 is the value from the original paper)
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, "Document"] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, 1):
+            key = document_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    for key in ranked:
+        docs[key].metadata["rrf_score"] = round(scores[key], 5)
+    return [docs[key] for key in ranked]
+
+
+def merge_by_score(result_lists: List[List["Document"]], k: int = 4,
+                   score_key: str = "relevance_score") -> List["Document"]:
+    """
+    Merge result lists whose scores are comparable into the best k
+
+    Used across catalog shards: every shard is searched with the same
+    embedding model (or BM25), so scores can be compared directly, while
+    rank fusion would put every shard's first hit on a par.
+
+    Args:
+        result_lists: Documents with metadata[score_key] set
+        k: Number of documents to return
+        score_key: Metadata field holding the score (higher is better)
+    """
+    best: Dict[str, "Document"] = {}
+    for results in result_lists:
+        for doc in results:
+            key = document_key(doc)
+            if key not in best or doc.metadata.get(score_key, 0.0) > best[key].metadata.get(score_key, 0.0):
+                best[key] = doc
+    return sorted(best.values(), key=lambda doc: doc.metadata.get(score_key, 0.0), reverse=True)[:k]
+
+
+if __name__ == "__main__":
+    from langchain_community.document_loaders import TextLoader
+    from catalog import iter_catalog_documents
+    from embed_and_store import CHUNKING_STRATEGY, create_splitter
+
+    # Same chunks as the vector index, so fused results line up
+    if CHUNKING_STRATEGY == "records":
+        chunks = list(iter_catalog_documents("product_info.txt"))
+    else:
+        chunks = create_splitter().split_documents(TextLoader("product_info.txt").load())
+    index = BM25Index.build(chunks)
+    index.save(BM25_INDEX_PATH)
+    print(f"✓ BM25 index built: {len(chunks)} documents, {len(index.postings)} terms")
+    print(f"  - Saved to: {BM25_INDEX_PATH}")
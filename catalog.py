@@ -0,0 +1,286 @@
+"""
+Catalog Parser: Record-aware parsing and chunking of product_info.txt
+- One record per "Product:" block, with structured metadata
+- One record per company policy section (Return Policy, Shipping Information, ...)
+- Record splitter that turns records into LangChain Documents for embedding
+- Streaming file reader: records are yielded one at a time from a
+  memory-mapped file, so memory stays flat however large the catalog is
+- Catalog directories: a catalog path may name a directory of catalog
+  files (one per category group or vendor); they are read in name order
+  as one catalog, and each file is a shard (see catalog_shards.py)
+"""
+
+import hashlib
+import mmap
+import os
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional
+
+# langchain_core is only needed to build Documents; importing it lazily keeps
+# the API's cold start (which only parses records) fast
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+SECTION_HEADER = re.compile(r"^=+\s*(.+?)\s*=+$")
+FIELD_LINE = re.compile(r"^([A-Z][A-Za-z &/-]*):\s*(.*)$")
+POLICY_SECTION = "COMPANY POLICIES & SUPPORT"
+
+# Files of a catalog directory that hold catalog text
+CATALOG_FILE_SUFFIX = ".txt"
+
+# Maps the catalog's field labels to metadata keys
+PRODUCT_FIELDS = {
+    "Product": "name",
+    "SKU": "sku",
+    "Price": "price_text",
+    "Category": "category",
+    "Features": "features",
+    "Specifications": "specifications",
+    "Warranty": "warranty",
+    "Stock Status": "stock",
+    "Colors Available": "colors",
+}
+
+
+def parse_price(price_text: str) -> Optional[int]:
+    """Convert a catalog price like '₹15,999' to an integer number of rupees"""
+    digits = re.sub(r"[^\d]", "", price_text or "")
+    return int(digits) if digits else None
+
+
+def _product_record(lines: List[str], section: str) -> Dict:
+    record = {"type": "product", "section": section}
+    for line in lines:
+        match = FIELD_LINE.match(line)
+        if match and match.group(1) in PRODUCT_FIELDS:
+            record[PRODUCT_FIELDS[match.group(1)]] = match.group(2).strip()
+    record["price"] = parse_price(record.get("price_text", ""))
+    record["in_stock"] = record.get("stock", "").lower() == "in stock"
+    record["text"] = "\n".join(lines)
+    return record
+
+
+def _policy_record(lines: List[str], section: str) -> Dict:
+    return {
+        "type": "policy",
+        "section": section,
+        "name": lines[0].rstrip(":").strip(),
+        "text": "\n".join(lines),
+    }
+
+
+def iter_catalog_records(lines: Iterable[str]) -> Iterator[Dict]:
+    """
+    Parse catalog lines into product and policy records
+
+    Records are separated by blank lines; "==== NAME ====" lines set the
+    section that following records belong to.
+
+    Args:
+        lines: Lines of product_info.txt (with or without trailing newlines)
+
+    Yields:
+        Record dicts with a "type" of "product" or "policy"
+    """
+    section = ""
+    block: List[str] = []
+
+    def flush():
+        if not block:
+            return None
+        if block[0].startswith("Product:"):
+            return _product_record(block, section)
+        if section == POLICY_SECTION and block[0].endswith(":"):
+            return _policy_record(block, section)
+        return None
+
+    for raw_line in lines:
+        line = raw_line.rstrip("\r\n").rstrip()
+        header = SECTION_HEADER.match(line)
+        if header or not line:
+            record = flush()
+            if record:
+                yield record
+            block = []
+            if header:
+                section = header.group(1)
+            continue
+        block.append(line)
+
+    record = flush()
+    if record:
+        yield record
+
+
+def parse_catalog(text: str) -> List[Dict]:
+    """Parse the full catalog text into a list of records"""
+    return list(iter_catalog_records(text.splitlines()))
+
+
+def iter_catalog_lines(filepath: str) -> Iterator[str]:
+    """
+    Lines of a catalog file, read through a memory map
+
+    The OS pages the file in and out as needed; only the current line is
+    decoded, so memory does not grow with the file size.
+    """
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return  # mmap cannot map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for raw_line in iter(mapped.readline, b""):
+                yield raw_line.decode("utf-8")
+
+
+def catalog_files(path: str) -> List[str]:
+    """The file itself, or the catalog files of a catalog directory in name order"""
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if name.endswith(CATALOG_FILE_SUFFIX) and not name.startswith(".")
+    )
+
+
+def shard_name(filepath: str) -> str:
+    """Name of the shard a catalog file is ingested into ("catalog/audio.txt" -> "audio")"""
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+
+def catalog_size(path: str) -> int:
+    """Bytes of catalog text (all files of a catalog directory)"""
+    return sum(os.path.getsize(f) for f in catalog_files(path))
+
+
+def catalog_mtime(path: str) -> float:
+    """
+    Last modification of a catalog file or directory
+
+    For a directory this is the newest of the directory itself (files
+    added or removed) and its catalog files (edited).
+
+    Raises:
+        OSError: The path does not exist
+    """
+    mtime = os.path.getmtime(path)
+    if os.path.isdir(path):
+        mtime = max([mtime] + [os.path.getmtime(f) for f in catalog_files(path)])
+    return mtime
+
+
+def catalog_version(path: str) -> str:
+    """Content hash identifying a catalog version (file names included for a directory)"""
+    digest = hashlib.sha256()
+    directory = os.path.isdir(path)
+    for filepath in catalog_files(path):
+        if directory:
+            digest.update(os.path.basename(filepath).encode("utf-8") + b"\0")
+        with open(filepath, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def iter_catalog_file(filepath: str = "product_info.txt") -> Iterator[Dict]:
+    """
+    Stream the records of a catalog file (or directory), one at a time
+
+    Only the record being parsed is held in memory; use this instead of
+    load_catalog_records when the records are processed once (counting,
+    validating, embedding).
+    """
+    for path in catalog_files(filepath):
+        yield from iter_catalog_records(iter_catalog_lines(path))
+
+
+def load_catalog_records(filepath: str = "product_info.txt") -> List[Dict]:
+    """Parse a catalog file into records"""
+    return list(iter_catalog_file(filepath))
+
+
+def load_product_names(filepath: str = "product_info.txt") -> List[str]:
+    """Product names of a catalog file, without keeping the records"""
+    return [r["name"] for r in iter_catalog_file(filepath) if r["type"] == "product" and r.get("name")]
+
+
+def catalog_stats(filepath: str = "product_info.txt") -> Dict:
+    """
+    Counts for a catalog file, computed in one streaming pass
+
+    Returns:
+        {"bytes", "products", "policies", "categories", "sections"}
+    """
+    products = policies = 0
+    categories, sections = set(), set()
+    for record in iter_catalog_file(filepath):
+        sections.add(record["section"])
+        if record["type"] == "product":
+            products += 1
+            if record.get("category"):
+                categories.add(record["category"])
+        else:
+            policies += 1
+    return {
+        "bytes": catalog_size(filepath),
+        "products": products,
+        "policies": policies,
+        "categories": len(categories),
+        "sections": len(sections),
+    }
+
+
+def record_metadata(record: Dict) -> Dict:
+    """
+    Build vector store metadata for a record
+
+    Chroma only accepts str/int/float/bool values, so missing fields are
+    left out instead of being stored as None.
+    """
+    keys = ("type", "section", "name", "sku", "category", "price", "stock", "in_stock")
+    return {key: record[key] for key in keys if record.get(key) is not None}
+
+
+def record_document(record: Dict, source: Optional[str] = None) -> "Document":
+    """LangChain Document for one record (page content = the record's lines)"""
+    from langchain_core.documents import Document
+
+    metadata = record_metadata(record)
+    if source is not None:
+        metadata = {"source": source, **metadata}
+    return Document(page_content=record["text"], metadata=metadata)
+
+
+def iter_catalog_documents(filepath: str = "product_info.txt") -> Iterator["Document"]:
+    """
+    Stream one Document per record of a catalog file
+
+    Same chunks and metadata as TextLoader + CatalogRecordSplitter, without
+    loading the file as one Document first.
+    """
+    for path in catalog_files(filepath):
+        for record in iter_catalog_records(iter_catalog_lines(path)):
+            yield record_document(record, source=path)
+
+
+class CatalogRecordSplitter:
+    """
+    Split product_info.txt into one Document per catalog record
+
+    Drop-in replacement for RecursiveCharacterTextSplitter.split_documents:
+    products are never cut mid-record, neighbours never bleed into each
+    other through overlap, and every chunk carries structured metadata
+    (name, SKU, category, price, stock) for filtered search.
+    """
+
+    def split_text(self, text: str) -> List["Document"]:
+        """Split raw catalog text into record Documents"""
+        return [record_document(record) for record in parse_catalog(text)]
+
+    def split_documents(self, documents: List["Document"]) -> List["Document"]:
+        """Split loaded catalog Documents, keeping each source's metadata"""
+        chunks = []
+        for document in documents:
+            for chunk in self.split_text(document.page_content):
+                chunk.metadata = {**document.metadata, **chunk.metadata}
+                chunks.append(chunk)
+        return chunks
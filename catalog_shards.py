@@ -0,0 +1,110 @@
+"""
+Catalog Shards: One vector collection and BM25 index per catalog file
+CATALOG_PATH may name a directory of catalog files (catalog/audio.txt,
+catalog/wearables.txt, one per category group or vendor). Each file is a
+shard with its own ChromaDB collection and BM25 index:
+
+- Ingestion embeds shards in parallel, and `ingest.py embed --changed-only`
+  re-embeds only the files that changed
+- Retrieval (retrievers.ShardedRetriever) searches only the shards that
+  hold the category a query asks for, and fans out to all shards in
+  parallel otherwise, merging their results by score
+
+shards.json, next to the collections, lists each shard's collection, BM25
+index, content version and categories; the RAG chain switches to sharded
+retrieval when it finds one. A single catalog file keeps the one
+"product_info" collection and chroma_db/bm25_index.json as before.
+"""
+
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+from catalog import catalog_files, catalog_version, iter_catalog_file, shard_name
+
+SHARD_MANIFEST_NAME = "shards.json"
+
+# Collection names are "product_info__<shard>"; Chroma allows 3-63 characters
+COLLECTION_PREFIX = "product_info__"
+COLLECTION_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_-]+")
+
+# Shards embedded at once during ingestion, and searched at once per query
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "4"))
+
+
+def shard_collection_name(name: str) -> str:
+    """ChromaDB collection of a shard ("Smart Home" -> "product_info__Smart_Home")"""
+    slug = COLLECTION_NAME_CHARS.sub("_", name).strip("_-") or "shard"
+    return (COLLECTION_PREFIX + slug)[:63].rstrip("_-")
+
+
+def describe_shard(filepath: str) -> Dict:
+    """
+    Manifest entry for one catalog file, from one streaming pass over it
+
+    Returns:
+        {"name", "file", "version", "collection", "index_file", "records", "categories"}
+    """
+    name = shard_name(filepath)
+    records = 0
+    categories = set()
+    for record in iter_catalog_file(filepath):
+        records += 1
+        if record["type"] == "product" and record.get("category"):
+            categories.add(record["category"])
+    return {
+        "name": name,
+        "file": os.path.basename(filepath),
+        "version": catalog_version(filepath),
+        "collection": shard_collection_name(name),
+        "index_file": f"bm25_{name}.json",
+        "records": records,
+        "categories": sorted(categories),
+    }
+
+
+def describe_shards(catalog_path: str) -> List[Dict]:
+    """Manifest entries for every file of a catalog directory"""
+    shards = [describe_shard(path) for path in catalog_files(catalog_path)]
+    collections = [s["collection"] for s in shards]
+    if len(set(collections)) != len(collections):
+        raise ValueError(f"catalog files in {catalog_path} map to the same collection name: {collections}")
+    return shards
+
+
+def is_sharded(catalog_path: str) -> bool:
+    """Whether a catalog is ingested as shards (it is a directory)"""
+    return os.path.isdir(catalog_path)
+
+
+def shard_manifest_path(persist_directory: str) -> str:
+    return os.path.join(persist_directory, SHARD_MANIFEST_NAME)
+
+
+def shard_index_path(persist_directory: str, shard: Dict) -> str:
+    """BM25 index of a shard (kept next to its collection)"""
+    return os.path.join(persist_directory, shard["index_file"])
+
+
+def load_shard_manifest(persist_directory: str) -> Optional[List[Dict]]:
+    """Shards written into persist_directory, or None for a single-collection store"""
+    try:
+        with open(shard_manifest_path(persist_directory), "r", encoding="utf-8") as f:
+            return json.load(f)["shards"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_shard_manifest(persist_directory: str, shards: List[Dict]):
+    os.makedirs(persist_directory, exist_ok=True)
+    with open(shard_manifest_path(persist_directory), "w", encoding="utf-8") as f:
+        json.dump({"shards": shards}, f, indent=2)
+
+
+def remove_shard_manifest(persist_directory: str):
+    """Forget earlier shards when a single catalog file is ingested into the same directory"""
+    try:
+        os.remove(shard_manifest_path(persist_directory))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,391 @@
+"""
+Catalog Snapshots: Hot-reload product_info.txt and its indexes without a restart
+A snapshot bundles one version of the catalog with everything derived from
+it - parsed records, product names, follow-up detector, off-topic gate,
+policy answers, query normalizer, ChromaDB collection, BM25 index and RAG
+chain. Snapshots are never modified after they are built.
+
+Reloads (POST /admin/reload or the file watcher) build the next snapshot in
+a background thread, into its own directory under SNAPSHOT_DIR, and then
+swap the current reference. Each request pins the snapshot it started on
+(SnapshotManager.acquire/release), so in-flight requests finish on the old
+indexes while new requests use the new ones. Old snapshot directories are
+deleted once they are neither current, previous nor pinned by a request.
+
+A catalog directory (see catalog_shards.py) is snapshotted the same way:
+the whole directory is copied and re-embedded shard by shard.
+"""
+
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from catalog import catalog_mtime, catalog_version, load_catalog_records
+from catalog_shards import load_shard_manifest
+from follow_up import FollowUpDetector
+from off_topic import OffTopicGate
+from policy_answers import PolicyAnswers, load_policy_answers
+from query_normalizer import QueryNormalizer, install_query_normalizer
+
+# Catalog file served by the API
+CATALOG_PATH = os.getenv("CATALOG_PATH", "product_info.txt")
+
+# Where reloaded snapshots keep their catalog copy, ChromaDB and BM25 index
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join("chroma_db", "snapshots"))
+
+# Poll the catalog file every N seconds and reload when it changes (0 = off)
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL", "0"))
+
+
+class CatalogSnapshot:
+    """
+    One immutable version of the catalog and its indexes
+
+    The RAG chain is created on first use for the startup snapshot and
+    eagerly for reloaded ones, so a swap never exposes a cold chain.
+    """
+
+    def __init__(self, version: str, catalog_path: str, persist_directory: str, index_path: str):
+        self.version = version
+        self.catalog_path = catalog_path
+        self.persist_directory = persist_directory
+        self.index_path = index_path
+        self.created_at = datetime.now()
+
+        try:
+            self.records: List[Dict] = load_catalog_records(catalog_path)
+        except FileNotFoundError:
+            self.records = []
+        self.product_names: List[str] = [r["name"] for r in self.records if r["type"] == "product" and r.get("name")]
+        self.follow_up_detector = FollowUpDetector(self.product_names)
+        self.off_topic_gate = OffTopicGate(self.records)
+        self.query_normalizer = QueryNormalizer(self.records)
+        # None if policy_intents.json is missing or invalid (policy questions go through RAG)
+        self.policy_answers: Optional[PolicyAnswers] = None
+        try:
+            self.policy_answers = load_policy_answers(self.records, version, self.product_names)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: no policy answers for catalog {version}: {e}")
+        # None for a single-collection store
+        self.shards: Optional[List[Dict]] = load_shard_manifest(persist_directory)
+
+        self.router = None
+        self._rag_chain = None
+        self._chain_lock = threading.Lock()
+        self._vector_client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def rag_chain(self):
+        """RAG chain over this snapshot's vector store and BM25 index"""
+        if self._rag_chain is None:
+            with self._chain_lock:
+                if self._rag_chain is None:
+                    from rag_chain import create_model_router, create_rag_chain
+                    router = create_model_router()
+                    self._rag_chain = create_rag_chain(
+                        persist_directory=self.persist_directory,
+                        catalog_path=self.catalog_path,
+                        index_path=self.index_path,
+                        router=router
+                    )
+                    self.router = router
+        return self._rag_chain
+
+    @property
+    def vector_client(self):
+        """Chroma client over this snapshot's vector store, opened once (health probes reuse it)"""
+        if self._vector_client is None:
+            with self._client_lock:
+                if self._vector_client is None:
+                    import chromadb
+                    self._vector_client = chromadb.PersistentClient(path=self.persist_directory)
+        return self._vector_client
+
+    def describe(self) -> Dict:
+        return {
+            "version": self.version,
+            "products": len(self.product_names),
+            "records": len(self.records),
+            "shards": len(self.shards) if self.shards else None,
+            "persist_directory": self.persist_directory,
+            "created_at": self.created_at.isoformat()
+        }
+
+
+def _snapshot_directory(snapshot: CatalogSnapshot) -> str:
+    """Directory holding a snapshot's catalog copy, vector store and BM25 index"""
+    return os.path.abspath(os.path.dirname(snapshot.persist_directory))
+
+
+class SnapshotManager:
+    """
+    Builds catalog snapshots in the background and swaps them in atomically
+
+    Usage:
+        manager.load_current()             # at startup, serve the existing index
+        snapshot = manager.acquire()        # once per request...
+        manager.release(snapshot)           # ...and when it is done
+        manager.reload()                    # rebuild if the catalog changed
+    """
+
+    def __init__(self, catalog_path: str = CATALOG_PATH, snapshot_dir: str = SNAPSHOT_DIR):
+        self.catalog_path = catalog_path
+        self.snapshot_dir = snapshot_dir
+        self._current: Optional[CatalogSnapshot] = None
+        self._previous: Optional[CatalogSnapshot] = None
+        self._build_lock = threading.Lock()
+        self._building: Optional[str] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_error: Optional[str] = None
+        self.counters = {"reloads": 0, "failed": 0, "unchanged": 0}
+        # Pinned snapshot directories -> number of requests holding them
+        self._leases: Dict[str, int] = {}
+        # Directories pruned while pinned, deleted when their last request releases them
+        self._retired = set()
+        self._lease_lock = threading.Lock()
+
+    @property
+    def current(self) -> CatalogSnapshot:
+        """The snapshot new requests should use"""
+        if self._current is None:
+            self.load_current()
+        return self._current
+
+    @property
+    def live(self) -> Optional[CatalogSnapshot]:
+        """The current snapshot if one is loaded, without loading it (metrics)"""
+        return self._current
+
+    def acquire(self) -> CatalogSnapshot:
+        """
+        Pin the current snapshot for one request
+
+        Its directory is not deleted by a later reload until release() is
+        called, however many reloads happen in between.
+        """
+        with self._lease_lock:
+            snapshot = self.current
+            directory = _snapshot_directory(snapshot)
+            self._leases[directory] = self._leases.get(directory, 0) + 1
+        return snapshot
+
+    def release(self, snapshot: CatalogSnapshot):
+        """Unpin a snapshot returned by acquire(), deleting it if it was pruned meanwhile"""
+        directory = _snapshot_directory(snapshot)
+        with self._lease_lock:
+            self._leases[directory] -= 1
+            if self._leases[directory] > 0:
+                return
+            del self._leases[directory]
+            if directory not in self._retired:
+                return
+            self._retired.discard(directory)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    @contextmanager
+    def pin(self):
+        """acquire()/release() around a block"""
+        snapshot = self.acquire()
+        try:
+            yield snapshot
+        finally:
+            self.release(snapshot)
+
+    def load_current(self) -> CatalogSnapshot:
+        """
+        Load the startup snapshot
+
+        Reuses the newest reloaded snapshot built for the current catalog
+        content, so a reload survives restarts; otherwise serves the index
+        built by embed_and_store.py.
+        """
+        try:
+            version = catalog_version(self.catalog_path)
+        except OSError:
+            version = "missing"
+
+        built = sorted(
+            name for name in (os.listdir(self.snapshot_dir) if os.path.isdir(self.snapshot_dir) else [])
+            if name.startswith(f"{version}-")
+        )
+        if built:
+            directory = os.path.join(self.snapshot_dir, built[-1])
+            self._current = CatalogSnapshot(
+                version,
+                os.path.join(directory, os.path.basename(os.path.normpath(self.catalog_path))),
+                os.path.join(directory, "chroma"),
+                os.path.join(directory, "bm25_index.json")
+            )
+        else:
+            # bm25_index pulls in langchain_core; imported here to keep the API import light
+            from bm25_index import BM25_INDEX_PATH
+            self._current = CatalogSnapshot(version, self.catalog_path, "chroma_db", BM25_INDEX_PATH)
+        # Cache keys computed outside a workflow run (request coalescing) use its SKU aliases
+        install_query_normalizer(self._current.query_normalizer)
+        print(f"✓ Catalog snapshot {version} loaded ({len(self._current.product_names)} products)")
+        print(f"  - Vector store: {self._current.persist_directory}")
+        return self._current
+
+    # ------------------------------------------------------------------------
+    # Reload
+    # ------------------------------------------------------------------------
+
+    def reload(self, force: bool = False) -> Dict:
+        """
+        Start building a snapshot of the catalog file in the background
+
+        Args:
+            force: Rebuild even if the catalog content has not changed
+
+        Returns:
+            Dict with "status" ("started", "in_progress" or "unchanged")
+            and the version involved
+        """
+        version = catalog_version(self.catalog_path)
+        if not force and self._current is not None and version == self._current.version:
+            self.counters["unchanged"] += 1
+            return {"status": "unchanged", "version": version}
+
+        if not self._build_lock.acquire(blocking=False):
+            return {"status": "in_progress", "version": self._building}
+
+        self._building = version
+        thread = threading.Thread(target=self._build_and_swap, args=(version,), name="catalog-reload", daemon=True)
+        thread.start()
+        return {"status": "started", "version": version}
+
+    def _build_and_swap(self, version: str):
+        try:
+            snapshot = self._build(version)
+            # Single reference assignment: requests see the old or the new snapshot, never a mix
+            self._previous, self._current = self._current, snapshot
+            install_query_normalizer(snapshot.query_normalizer)
+            self.counters["reloads"] += 1
+            self.last_error = None
+            print(f"✓ Catalog snapshot {version} is live ({len(snapshot.product_names)} products)")
+            self._prune()
+        except Exception as e:
+            self.counters["failed"] += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            serving = self._current.version if self._current else "nothing"
+            print(f"Warning: catalog reload failed, still serving {serving}: {self.last_error}")
+        finally:
+            self._building = None
+            self._build_lock.release()
+
+    def _build(self, version: str) -> CatalogSnapshot:
+        """Copy the catalog, embed it into a fresh directory and warm the chain"""
+        from embed_and_store import load_and_embed_documents
+
+        directory = os.path.join(self.snapshot_dir, f"{version}-{int(time.time())}")
+        os.makedirs(directory, exist_ok=True)
+        try:
+            # Index a private copy so later edits cannot change this snapshot
+            catalog_copy = os.path.join(directory, os.path.basename(os.path.normpath(self.catalog_path)))
+            if os.path.isdir(self.catalog_path):
+                shutil.copytree(self.catalog_path, catalog_copy)
+            else:
+                shutil.copyfile(self.catalog_path, catalog_copy)
+            if catalog_version(catalog_copy) != version:
+                raise RuntimeError("catalog changed while copying, will retry on the next reload")
+
+            persist_directory = os.path.join(directory, "chroma")
+            index_path = os.path.join(directory, "bm25_index.json")
+            load_and_embed_documents(
+                catalog_path=catalog_copy,
+                persist_directory=persist_directory,
+                index_path=index_path
+            )
+            snapshot = CatalogSnapshot(version, catalog_copy, persist_directory, index_path)
+            if not snapshot.product_names:
+                raise RuntimeError("no products parsed from the new catalog")
+            # Build the chain now so the first request after the swap is not cold
+            snapshot.rag_chain
+        except Exception:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        return snapshot
+
+    def _prune(self):
+        """
+        Delete snapshot directories other than the current and previous one
+
+        Directories still pinned by a request are only marked; release()
+        deletes them when the last request holding them finishes.
+        """
+        keep = {_snapshot_directory(s) for s in (self._current, self._previous) if s is not None}
+        if not os.path.isdir(self.snapshot_dir):
+            return
+        unused = []
+        with self._lease_lock:
+            for name in os.listdir(self.snapshot_dir):
+                path = os.path.abspath(os.path.join(self.snapshot_dir, name))
+                if path in keep:
+                    continue
+                if self._leases.get(path):
+                    self._retired.add(path)
+                else:
+                    unused.append(path)
+        for path in unused:
+            shutil.rmtree(path, ignore_errors=True)
+
+    # ------------------------------------------------------------------------
+    # File watcher
+    # ------------------------------------------------------------------------
+
+    def start_watcher(self, interval: float = CATALOG_WATCH_INTERVAL):
+        """Poll the catalog file and reload when it changes (no-op if interval <= 0)"""
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval, self._mtime()), name="catalog-watcher", daemon=True
+        )
+        self._watcher.start()
+        print(f"✓ Watching {self.catalog_path} for changes every {interval:g}s")
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def _watch(self, interval: float, last_mtime: Optional[float]):
+        while not self._stop.wait(interval):
+            mtime = self._mtime()
+            if mtime == last_mtime:
+                continue
+            # Wait for the file to stop changing before reading it (editors save in steps)
+            if self._stop.wait(interval) or self._mtime() != mtime:
+                continue
+            last_mtime = mtime
+            try:
+                result = self.reload()
+                print(f"Catalog file changed: reload {result['status']} ({result['version']})")
+            except OSError as e:
+                print(f"Warning: could not read {self.catalog_path}: {e}")
+
+    def _mtime(self) -> Optional[float]:
+        try:
+            return catalog_mtime(self.catalog_path)
+        except OSError:
+            return None
+
+    def status(self) -> Dict:
+        """Current/previous versions, build state and counters (for /metrics)"""
+        return {
+            "current": self._current.describe() if self._current else None,
+            "previous": self._previous.version if self._previous else None,
+            "building": self._building,
+            "watching": self._watcher is not None,
+            "last_error": self.last_error,
+            "pinned": sum(self._leases.values()),
+            "awaiting_release": len(self._retired),
+            **self.counters
+        }
@@ -6,6 +6,8 @@ Shows current configuration and what's been completed
 import os
 from pathlib import Path
 
+from catalog import catalog_stats
+
 def check_status():
     print("="*70)
     print("🔍 TECHGEAR CHATBOT - SYSTEM STATUS CHECK")
@@ -14,17 +16,17 @@ def check_status():
     # Check product_info.txt
     print("\n📦 PRODUCT CATALOG:")
     product_file = Path("product_info.txt")
+    product_count = 0
     if product_file.exists():
-        with open(product_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            char_count = len(content)
-            product_count = content.count("Product: ")
-            category_count = content.count("====================")
+        # One streaming pass over the records; the file is never loaded whole
+        stats = catalog_stats(str(product_file))
+        product_count = stats["products"]
             
         print(f"  ✅ File exists: {product_file}")
-        print(f"  ✅ Total characters: {char_count:,}")
+        print(f"  ✅ Total size: {stats['bytes']:,} bytes")
         print(f"  ✅ Total products: {product_count}")
-        print(f"  ✅ Total categories: {category_count}")
+        print(f"  ✅ Total categories: {stats['categories']} (in {stats['sections']} sections)")
+        print(f"  ✅ Policy sections: {stats['policies']}")
     else:
         print(f"  ❌ File not found: {product_file}")
     
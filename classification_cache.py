@@ -0,0 +1,191 @@
+"""
+Classification Cache: Reuse category decisions for repeated queries
+A query's category depends only on its text, so "What is your return
+policy?", "what is your return policy" and "WHAT IS YOUR RETURN POLICY ??"
+share one decision. Queries are normalized (synonyms and acronyms, case,
+punctuation, whitespace; see query_normalizer.py) before lookup.
+
+Two tiers:
+- An in-process LRU with TTL answers most repeats without any I/O
+- A SQLite table shared by all workers on the host (WAL mode) fills new
+  workers and survives restarts
+
+Only LLM decisions are stored; keyword-fallback classifications are not.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlite_store import SQLiteStore
+
+# Entries kept in each worker's memory
+CLASSIFICATION_CACHE_SIZE = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "10000"))
+
+# Seconds a decision is reused (both tiers)
+CLASSIFICATION_CACHE_TTL = float(os.getenv("CLASSIFICATION_CACHE_TTL", str(24 * 3600)))
+
+# Shared tier; set CLASSIFICATION_CACHE_SHARED=false for memory only
+CLASSIFICATION_CACHE_SHARED = os.getenv("CLASSIFICATION_CACHE_SHARED", "true").lower() == "true"
+CLASSIFICATION_CACHE_PATH = os.getenv("CLASSIFICATION_CACHE_PATH", os.path.join("chroma_db", "classification_cache.sqlite"))
+
+# Rows kept in the shared tier; older decisions are dropped first
+CLASSIFICATION_CACHE_MAX_ROWS = 100000
+
+PUNCTUATION = re.compile(r"[^\w\s]+")
+WHITESPACE = re.compile(r"\s+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    version TEXT NOT NULL,
+    query_key TEXT NOT NULL,
+    category TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (version, query_key)
+);
+CREATE INDEX IF NOT EXISTS classifications_created_at ON classifications (created_at);
+"""
+
+
+class ClassificationCache:
+    """
+    Two-tier (memory LRU + shared SQLite) cache of query -> category
+
+    Usage:
+        category = cache.get(query)
+        if category is None:
+            category = classify(query)
+            cache.put(query, category)
+    """
+
+    def __init__(self, version: str, normalize: Optional[Callable[[str], str]] = None,
+                 size: int = CLASSIFICATION_CACHE_SIZE, ttl: float = CLASSIFICATION_CACHE_TTL,
+                 shared: bool = CLASSIFICATION_CACHE_SHARED, path: str = CLASSIFICATION_CACHE_PATH):
+        """
+        Args:
+            version: Classifier prompt/model version; decisions of other versions are ignored
+            normalize: Key function for queries (e.g. query_normalizer.normalize_key);
+                default folds case, punctuation and whitespace only
+            size: Max entries in memory
+            ttl: Seconds a decision is reused
+            shared: Also use the SQLite tier shared across workers
+            path: SQLite file of the shared tier
+        """
+        self.version = version
+        self.normalize = normalize
+        self.size = size
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = SQLiteStore(path, SCHEMA) if shared else None
+        self._stores_since_trim = 0
+        self.counters = {"memory_hits": 0, "shared_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    def key(self, query: str) -> str:
+        """Normalized text the decision is stored under"""
+        if self.normalize is not None:
+            return self.normalize(query)
+        text = PUNCTUATION.sub(" ", query.lower())
+        return WHITESPACE.sub(" ", text).strip()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _remember(self, key: str, category: str, created_at: float):
+        with self._lock:
+            self._memory[key] = (category, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
+
+    def get(self, query: str) -> Optional[str]:
+        """Cached category for a query, or None"""
+        key = self.key(query)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return entry[0]
+                del self._memory[key]
+
+        if self._store is not None:
+            try:
+                row = self._store.connect().execute(
+                    "SELECT category, created_at FROM classifications WHERE version = ? AND query_key = ?",
+                    (self.version, key)
+                ).fetchone()
+            except sqlite3.Error as e:
+                self._count("errors")
+                print(f"Warning: classification cache lookup failed: {e}")
+                row = None
+            if row is not None and now - row[1] <= self.ttl:
+                self._remember(key, row[0], row[1])
+                self._count("shared_hits")
+                return row[0]
+
+        self._count("misses")
+        return None
+
+    def put(self, query: str, category: str):
+        """Store an LLM classification in both tiers"""
+        key = self.key(query)
+        now = time.time()
+        self._remember(key, category, now)
+        self._count("stores")
+        if self._store is None:
+            return
+        try:
+            conn = self._store.connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO classifications (version, query_key, category, created_at) VALUES (?, ?, ?, ?)",
+                (self.version, key, category, now)
+            )
+            with self._lock:
+                self._stores_since_trim += 1
+                trim = self._stores_since_trim >= 500
+                if trim:
+                    self._stores_since_trim = 0
+            if trim:
+                self.trim()
+        except sqlite3.Error as e:
+            self._count("errors")
+            print(f"Warning: classification cache store failed: {e}")
+
+    def trim(self) -> int:
+        """Drop expired rows (of any version), then the oldest above the row limit"""
+        conn = self._store.connect()
+        removed = conn.execute(
+            "DELETE FROM classifications WHERE created_at < ?", (time.time() - self.ttl,)
+        ).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM classifications").fetchone()[0] - CLASSIFICATION_CACHE_MAX_ROWS
+        if excess > 0:
+            removed += conn.execute(
+                "DELETE FROM classifications WHERE rowid IN "
+                "(SELECT rowid FROM classifications ORDER BY created_at LIMIT ?)",
+                (excess,)
+            ).rowcount
+        return removed
+
+    def snapshot(self) -> Dict:
+        """Counters, hit ratio and memory usage (for /metrics)"""
+        with self._lock:
+            counters = dict(self.counters)
+            entries = len(self._memory)
+        hits = counters["memory_hits"] + counters["shared_hits"]
+        lookups = hits + counters["misses"]
+        return {
+            **counters,
+            "hit_ratio": round(hits / lookups, 3) if lookups else None,
+            "memory_entries": entries,
+            "memory_size": self.size,
+            "shared": self._store is not None,
+            "version": self.version
+        }
@@ -0,0 +1,186 @@
+"""
+Context Budget Manager: Assemble retrieved chunks into a compact prompt context
+- Drops low-relevance chunks (always keeping the best one)
+- Removes duplicate chunks and text repeated through chunk overlap
+- Trims the context to a token budget
+- Counts prompt tokens per request
+"""
+
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# ~600 tokens = the old 4 chunks x 600 chars, but without the duplicated overlap
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+
+# Chunks below this relevance score (0-1, higher is better) are dropped
+CONTEXT_MIN_SCORE = float(os.getenv("CONTEXT_MIN_SCORE", "0.25"))
+
+# Rough characters-per-token ratio for English/product text
+CHARS_PER_TOKEN = 4
+
+# Overlap shorter than this is treated as coincidence, not splitter overlap
+MIN_OVERLAP_CHARS = 20
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count without calling a tokenizer"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def _relevance(doc) -> Optional[float]:
+    return doc.metadata.get("relevance_score") if getattr(doc, "metadata", None) else None
+
+
+def _strip_overlap(previous: List[str], text: str) -> Tuple[str, int]:
+    """
+    Remove the longest prefix of text that an earlier block ends with
+
+    The character splitter repeats the end of chunk N at the start of
+    chunk N+1; when both are retrieved that text would be sent twice.
+    """
+    best = 0
+    for prev in previous:
+        for size in range(min(len(prev), len(text)), MIN_OVERLAP_CHARS - 1, -1):
+            if size <= best:
+                break
+            if prev.endswith(text[:size]):
+                best = size
+                break
+    return text[best:].lstrip(), best
+
+
+def assemble_context(docs: List, max_tokens: int = CONTEXT_TOKEN_BUDGET,
+                     min_score: float = CONTEXT_MIN_SCORE) -> Tuple[str, Dict]:
+    """
+    Build the prompt context from retrieved documents
+
+    Documents are kept in retrieval order. A document's "relevance_score"
+    metadata (set by the retrievers) is used for the score cut-off;
+    documents without a score (catalog lookups, BM25-only hits) are kept.
+
+    Args:
+        docs: Retrieved Documents, best first
+        max_tokens: Token budget for the whole context
+        min_score: Minimum relevance score to keep a document
+
+    Returns:
+        (context text, stats dict)
+    """
+    stats = {
+        "chunks_in": len(docs),
+        "dropped_low_score": 0,
+        "dropped_duplicate": 0,
+        "overlap_chars": 0,
+        "truncated": False,
+    }
+
+    kept = []
+    for index, doc in enumerate(docs):
+        score = _relevance(doc)
+        if index > 0 and score is not None and score < min_score:
+            stats["dropped_low_score"] += 1
+            continue
+        kept.append(doc)
+
+    sources: List[str] = []
+    blocks: List[str] = []
+    used_tokens = 0
+    for doc in kept:
+        text = doc.page_content.strip()
+        if not text or any(text in source for source in sources):
+            stats["dropped_duplicate"] += 1
+            continue
+
+        block, overlap = _strip_overlap(sources, text)
+        sources.append(text)
+        stats["overlap_chars"] += overlap
+        if not block:
+            stats["dropped_duplicate"] += 1
+            continue
+
+        lines = block.splitlines()
+        block_tokens = estimate_tokens(block)
+        separator_tokens = 1 if blocks else 0
+        if used_tokens + separator_tokens + block_tokens > max_tokens:
+            # Keep whole lines of the first block that doesn't fit, then stop
+            remaining = max_tokens - used_tokens - separator_tokens
+            partial = []
+            for line in lines:
+                line_tokens = estimate_tokens(line) + 1
+                if line_tokens > remaining:
+                    break
+                partial.append(line)
+                remaining -= line_tokens
+            if partial:
+                blocks.append("\n".join(partial))
+                used_tokens = max_tokens - remaining
+            stats["truncated"] = True
+            break
+
+        blocks.append(block)
+        used_tokens += separator_tokens + block_tokens
+
+    context = "\n\n".join(blocks)
+    stats["chunks_used"] = len(blocks)
+    stats["context_tokens"] = estimate_tokens(context)
+    return context, stats
+
+
+# ============================================================================
+# PROMPT TOKEN COUNTERS
+# ============================================================================
+
+class PromptTokenCounter:
+    """Thread-safe running totals of prompt size per request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.total_prompt_tokens = 0
+            self.total_context_tokens = 0
+            self.max_prompt_tokens = 0
+            self.last_prompt_tokens = 0
+            self.dropped_low_score = 0
+            self.dropped_duplicate = 0
+            self.overlap_chars = 0
+
+    def record_context(self, stats: Dict):
+        """Record the result of one assemble_context call"""
+        with self._lock:
+            self.total_context_tokens += stats["context_tokens"]
+            self.dropped_low_score += stats["dropped_low_score"]
+            self.dropped_duplicate += stats["dropped_duplicate"]
+            self.overlap_chars += stats["overlap_chars"]
+
+    def record_prompt(self, prompt_tokens: int):
+        """Record the size of one fully rendered prompt"""
+        with self._lock:
+            self.requests += 1
+            self.total_prompt_tokens += prompt_tokens
+            self.last_prompt_tokens = prompt_tokens
+            self.max_prompt_tokens = max(self.max_prompt_tokens, prompt_tokens)
+
+    def snapshot(self) -> Dict:
+        """Current counters, including averages"""
+        with self._lock:
+            requests = self.requests or 1
+            return {
+                "requests": self.requests,
+                "total_prompt_tokens": self.total_prompt_tokens,
+                "avg_prompt_tokens": round(self.total_prompt_tokens / requests, 1),
+                "avg_context_tokens": round(self.total_context_tokens / requests, 1),
+                "max_prompt_tokens": self.max_prompt_tokens,
+                "last_prompt_tokens": self.last_prompt_tokens,
+                "dropped_low_score_chunks": self.dropped_low_score,
+                "dropped_duplicate_chunks": self.dropped_duplicate,
+                "deduplicated_overlap_chars": self.overlap_chars,
+            }
+
+
+prompt_token_counter = PromptTokenCounter()
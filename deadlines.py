@@ -0,0 +1,153 @@
+"""
+Request Deadlines: One time budget per /chat request
+- Deadline object created in main.chat and carried in the workflow state
+- Context variable so retrievers and the model router see the deadline
+  without it being threaded through every LangChain call
+- call_with_deadline() bounds blocking calls (LLM, embedding, vector
+  search) by the remaining budget and stops waiting on cancellation
+"""
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# Total time budget for one /chat request (seconds)
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "20"))
+
+# How often blocked waits re-check for cancellation (seconds)
+CANCEL_POLL_INTERVAL = 0.1
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request's time budget is used up or it was cancelled"""
+
+
+class RequestCancelled(DeadlineExceeded):
+    """Raised to the waiting request when its client disconnected"""
+
+
+class Deadline:
+    """Absolute deadline for one request, with cooperative cancellation"""
+
+    def __init__(self, timeout: float = REQUEST_TIMEOUT):
+        self.timeout = timeout
+        self.started = time.monotonic()
+        self.expires_at = self.started + timeout
+        self._cancelled = threading.Event()
+        self.cancel_reason = None
+
+    def remaining(self) -> float:
+        """Seconds left (0 once expired or cancelled)"""
+        if self._cancelled.is_set():
+            return 0.0
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cancel(self, reason: str = "cancelled"):
+        """Stop all further work for this request (e.g. client disconnected)"""
+        self.cancel_reason = reason
+        self._cancelled.set()
+
+    def budget(self, cap: Optional[float] = None) -> float:
+        """Remaining time, optionally capped for a single step"""
+        remaining = self.remaining()
+        return min(remaining, cap) if cap is not None else remaining
+
+    def check(self, step: str = "request"):
+        """Raise DeadlineExceeded if no time is left"""
+        if self.cancelled:
+            raise DeadlineExceeded(f"{step}: {self.cancel_reason}")
+        if self.expired:
+            raise DeadlineExceeded(f"{step}: deadline of {self.timeout:.1f}s exceeded")
+
+
+# ============================================================================
+# CONTEXT PROPAGATION
+# ============================================================================
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the request being processed in this context, if any"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    """Make a deadline visible to everything called inside the block"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def check_deadline(step: str = "request"):
+    """Raise DeadlineExceeded if the current request is out of time"""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check(step)
+
+
+# ============================================================================
+# BOUNDED CALLS
+# ============================================================================
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("DEADLINE_WORKERS", "16")),
+                               thread_name_prefix="deadline")
+
+
+def call_with_deadline(fn: Callable, *args, step: str = "call", cap: Optional[float] = None, **kwargs):
+    """
+    Run a blocking call, giving up when the current deadline passes
+
+    Without a current deadline (CLI scripts, evaluation) the call simply
+    runs inline. The underlying call cannot be interrupted, so on timeout
+    it finishes in the background and its result is discarded.
+
+    Args:
+        fn: Function to call
+        step: Name used in DeadlineExceeded messages
+        cap: Maximum seconds for this step, even if more budget is left
+
+    Raises:
+        DeadlineExceeded: Budget used up or request cancelled
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return fn(*args, **kwargs)
+
+    deadline.check(step)
+    budget = deadline.budget(cap)
+    stop_at = time.monotonic() + budget
+    context = contextvars.copy_context()
+    future = _executor.submit(context.run, fn, *args, **kwargs)
+    while True:
+        remaining = stop_at - time.monotonic()
+        if remaining <= 0 or deadline.cancelled:
+            future.cancel()
+            deadline.check(step)
+            # Name the limit that applied: the step cap, or what was left of the request
+            if cap is not None and budget >= cap:
+                raise DeadlineExceeded(f"{step}: step budget of {cap}s exceeded")
+            raise DeadlineExceeded(f"{step}: remaining budget of {budget:.2f}s exceeded")
+        try:
+            return future.result(timeout=min(remaining, CANCEL_POLL_INTERVAL))
+        except FutureTimeoutError:
+            continue
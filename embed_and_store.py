@@ -1,14 +1,29 @@
 """
 RAG System Setup: Load product info, create embeddings, and store in ChromaDB
 Uses LangChain, ChromaDB, and Google Generative AI Embeddings
+
+A catalog directory is embedded shard by shard, in parallel: one
+collection and BM25 index per catalog file (see catalog_shards.py).
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.vectorstores import Chroma
+from catalog import CatalogRecordSplitter, iter_catalog_documents
+from bm25_index import BM25_INDEX_PATH, BM25Index
+from catalog_shards import (
+    SHARD_WORKERS,
+    describe_shards,
+    is_sharded,
+    remove_shard_manifest,
+    save_shard_manifest,
+    shard_index_path,
+)
+from policy_answers import build_policy_answers
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,50 +31,192 @@ load_dotenv()
 # Get the API key
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in .env file")
+# Chunking strategy: "records" (one chunk per product/policy record, with
+# metadata) or "character" (legacy fixed-size chunks)
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "records")
+
+# Character chunking configuration (see OPTIMIZATION_REPORT.md / evaluate_retrieval.py)
+# Analysis: avg product = 347 chars, using 600 for speed + completeness
+CHUNK_SIZE = 600  # Optimal for speed: covers avg product (347) + context
+CHUNK_OVERLAP = 80  # Balanced overlap for context without redundancy
+CHUNK_SEPARATORS = [
+    "\n\n==================== ",  # Category headers (primary)
+    "\n\nProduct: ",  # Product boundaries (secondary)
+    "\n\n",  # Paragraph breaks
+    "\n",  # Line breaks
+    " ",  # Word breaks
+    ""  # Character breaks (fallback)
+]
+
+
+def get_embeddings():
+    """
+    Create the Google Generative AI embeddings client
+
+    The API key is only required here, so offline tools (e.g. the
+    retrieval evaluation harness) can import the chunking helpers.
+    """
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY not found in .env file")
+
+    return GoogleGenerativeAIEmbeddings(
+        model="models/embedding-001",
+        google_api_key=GEMINI_API_KEY
+    )
+
+
+def create_text_splitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """
+    Create the character splitter used to chunk product_info.txt
+
+    Args:
+        chunk_size: Maximum characters per chunk
+        chunk_overlap: Characters shared between neighbouring chunks
+
+    Returns:
+        RecursiveCharacterTextSplitter
+    """
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=CHUNK_SEPARATORS
+    )
+
+
+def create_splitter(strategy=CHUNKING_STRATEGY):
+    """
+    Create the splitter for the given chunking strategy
+
+    Args:
+        strategy: "records" or "character"
+
+    Returns:
+        Object with a split_documents(documents) method
+    """
+    if strategy == "records":
+        return CatalogRecordSplitter()
+    if strategy == "character":
+        return create_text_splitter()
+    raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+
+def load_documents(catalog_path, strategy=CHUNKING_STRATEGY):
+    """Chunks of one catalog file: streamed records, or character chunks of the whole file"""
+    if strategy == "records":
+        return list(iter_catalog_documents(catalog_path))
+    return create_splitter(strategy).split_documents(TextLoader(catalog_path).load())
+
+
+def embed_shard(shard, catalog_path, persist_directory, embeddings, strategy=CHUNKING_STRATEGY):
+    """
+    Embed one catalog file into its shard collection and BM25 index
+
+    Returns:
+        Number of chunks written
+    """
+    chunks = load_documents(os.path.join(catalog_path, shard["file"]), strategy)
+    Chroma.from_documents(
+        documents=chunks,
+        embedding=embeddings,
+        persist_directory=persist_directory,
+        collection_name=shard["collection"]
+    )
+    BM25Index.build(chunks).save(shard_index_path(persist_directory, shard))
+    return len(chunks)
+
+
+def load_and_embed_shards(strategy=CHUNKING_STRATEGY, catalog_path="catalog",
+                          persist_directory="chroma_db"):
+    """
+    Embed a catalog directory, one collection and BM25 index per file
+
+    Shards are embedded SHARD_WORKERS at a time; shards.json is written
+    last, so the RAG chain never sees a half-built set of shards.
+
+    Args:
+        strategy: Chunking strategy ("records" or "character")
+        catalog_path: Catalog directory to index
+        persist_directory: ChromaDB directory to write
+    """
+
+    print("=" * 60)
+    print("Starting RAG Pipeline Setup (sharded catalog)")
+    print("=" * 60)
+
+    print(f"\n[Step 1] Reading catalog shards from {catalog_path}...")
+    shards = describe_shards(catalog_path)
+    if not shards:
+        raise FileNotFoundError(f"no catalog files in {catalog_path}")
+    for shard in shards:
+        print(f"  - {shard['name']}: {shard['records']} records, {len(shard['categories'])} categories")
+
+    print("\n[Step 2] Embedding shards...")
+    embeddings = get_embeddings()
+    with ThreadPoolExecutor(max_workers=max(1, SHARD_WORKERS), thread_name_prefix="shard") as pool:
+        counts = pool.map(
+            lambda shard: embed_shard(shard, catalog_path, persist_directory, embeddings, strategy), shards
+        )
+        for shard, count in zip(shards, counts):
+            shard["documents"] = count
+            print(f"✓ {shard['name']}: {count} chunks → {shard['collection']}")
+
+    save_shard_manifest(persist_directory, shards)
+    print(f"✓ Shard manifest saved ({len(shards)} shards, {SHARD_WORKERS} embedded at a time)")
+
+    print("\n[Step 3] Precomputing policy answers...")
+    policy_table = build_policy_answers(catalog_path)
+    print(f"✓ Policy answers saved")
+    print(f"  - Intents answered: {len(policy_table['intents'])}")
+
+    print("\n" + "=" * 60)
+    print("RAG Pipeline Setup Complete!")
+    print("=" * 60)
+
+    return shards
 
 
-def load_and_embed_documents():
+def load_and_embed_documents(strategy=CHUNKING_STRATEGY, catalog_path="product_info.txt",
+                             persist_directory="chroma_db", index_path=BM25_INDEX_PATH):
     """
     Load product info from text file, split into chunks,
     create embeddings, and store in ChromaDB
+
+    Args:
+        strategy: Chunking strategy ("records" or "character")
+        catalog_path: Catalog file to index
+        persist_directory: ChromaDB directory to write
+        index_path: BM25 index file to write
+
+    Returns:
+        (vectorstore, chunks); (None, shard manifest entries) for a catalog directory
     """
-    
+    if is_sharded(catalog_path):
+        return None, load_and_embed_shards(strategy, catalog_path, persist_directory)
+
     print("=" * 60)
     print("Starting RAG Pipeline Setup")
     print("=" * 60)
     
-    # Step 1: Load the document using TextLoader
-    print("\n[Step 1] Loading document from product_info.txt...")
-    loader = TextLoader("product_info.txt")
-    documents = loader.load()
-    print(f"✓ Document loaded successfully")
-    print(f"  - Total documents: {len(documents)}")
-    print(f"  - Document size: {len(documents[0].page_content)} characters")
+    # Step 1: Open the catalog (records are streamed from it, the file is not loaded whole)
+    print(f"\n[Step 1] Loading document from {catalog_path}...")
+    print(f"✓ Document found")
+    print(f"  - Document size: {os.path.getsize(catalog_path)} bytes")
     
     # Step 2: Split text into chunks
     print("\n[Step 2] Splitting text into chunks...")
-    # Optimized chunking for FAST processing and accurate retrieval
-    # Analysis: avg product = 347 chars, using 600 for speed + completeness
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=600,  # Optimal for speed: covers avg product (347) + context
-        chunk_overlap=80,  # Balanced overlap for context without redundancy
-        separators=[
-            "\n\n==================== ",  # Category headers (primary)
-            "\n\nProduct: ",  # Product boundaries (secondary)
-            "\n\n",  # Paragraph breaks
-            "\n",  # Line breaks
-            " ",  # Word breaks
-            ""  # Character breaks (fallback)
-        ]
-    )
-    chunks = text_splitter.split_documents(documents)
+    chunks = load_documents(catalog_path, strategy)
     print(f"✓ Text split successfully")
     print(f"  - Total chunks: {len(chunks)}")
-    print(f"  - Chunk size: 600 characters (optimized for speed)")
-    print(f"  - Chunk overlap: 80 characters (balanced)")
-    print(f"  - Strategy: Fast embeddings + accurate retrieval")
+    if strategy == "records":
+        products = sum(1 for c in chunks if c.metadata.get("type") == "product")
+        print(f"  - Strategy: one chunk per catalog record")
+        print(f"  - Product records: {products}")
+        print(f"  - Policy records: {len(chunks) - products}")
+        print(f"  - Metadata: name, sku, category, price, stock")
+    else:
+        print(f"  - Chunk size: {CHUNK_SIZE} characters (optimized for speed)")
+        print(f"  - Chunk overlap: {CHUNK_OVERLAP} characters (balanced)")
+        print(f"  - Strategy: Fast embeddings + accurate retrieval")
     
     # Display sample chunks
     print("\n  Sample chunks:")
@@ -69,19 +226,13 @@ def load_and_embed_documents():
     
     # Step 3: Create embeddings using Google Generative AI
     print("\n[Step 3] Creating embeddings using Google Generative AI...")
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=GEMINI_API_KEY
-    )
+    embeddings = get_embeddings()
     print("✓ Embeddings model initialized")
     print("  - Model: models/embedding-001")
     
     # Step 4: Store embeddings in ChromaDB (with persistence)
     print("\n[Step 4] Storing embeddings in ChromaDB...")
     
-    # Define persist directory
-    persist_directory = "chroma_db"
-    
     # Create Chroma vectorstore with persistence
     vectorstore = Chroma.from_documents(
         documents=chunks,
@@ -98,6 +249,22 @@ def load_and_embed_documents():
     # Verify persistence
     vectorstore.persist()
     print("✓ Database persisted to disk")
+    # A single collection from now on, even if a catalog directory was embedded here before
+    remove_shard_manifest(persist_directory)
+    
+    # Step 5: Build the BM25 lexical index over the same chunks
+    print("\n[Step 5] Building BM25 lexical index...")
+    bm25 = BM25Index.build(chunks)
+    bm25.save(index_path)
+    print(f"✓ BM25 index saved")
+    print(f"  - Path: {index_path}")
+    print(f"  - Terms: {len(bm25.postings)}")
+    
+    # Step 6: Pre-generate answers for company policy questions
+    print("\n[Step 6] Precomputing policy answers...")
+    policy_table = build_policy_answers(catalog_path)
+    print(f"✓ Policy answers saved")
+    print(f"  - Intents answered: {len(policy_table['intents'])}")
     
     print("\n" + "=" * 60)
     print("RAG Pipeline Setup Complete!")
@@ -141,10 +308,7 @@ def load_existing_vectorstore():
     """
     print("\nLoading existing vectorstore from disk...")
     
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=GEMINI_API_KEY
-    )
+    embeddings = get_embeddings()
     
     persist_directory = "chroma_db"
     
@@ -161,10 +325,11 @@ def load_existing_vectorstore():
 if __name__ == "__main__":
     try:
         # Create and setup the RAG pipeline
-        vectorstore, chunks = load_and_embed_documents()
+        vectorstore, chunks = load_and_embed_documents(catalog_path=os.getenv("CATALOG_PATH", "product_info.txt"))
         
-        # Test the retrieval system
-        test_retrieval(vectorstore)
+        # Test the retrieval system (one collection; sharded catalogs are tested through the RAG chain)
+        if vectorstore is not None:
+            test_retrieval(vectorstore)
         
         print("\n" + "=" * 60)
         print("Setup completed successfully!")
@@ -0,0 +1,158 @@
+"""
+Follow-up Detection Benchmark: Compare the legacy inline check with FollowUpDetector
+Measures accuracy, precision and recall on follow_up_eval_set.json and the
+per-query cost of each detector.
+
+Usage:
+    python evaluate_follow_up.py
+    python evaluate_follow_up.py --repeat 2000 --show-errors
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+
+from catalog import load_product_names
+from follow_up import FollowUpDetector
+
+DEFAULT_CATALOG = "product_info.txt"
+DEFAULT_EVAL_SET = "follow_up_eval_set.json"
+
+
+# ============================================================================
+# LEGACY DETECTOR (as previously inlined in main.chat)
+# ============================================================================
+
+LEGACY_FOLLOW_UP_INDICATORS = [
+    "this", "that", "it", "its", "them", "those", "these",
+    "that product", "this product", "the product", "same product",
+    "what about", "how about", "what", "how", "which", "where",
+    "colour", "color", "colors", "colours",
+    "price", "cost", "pricing",
+    "warranty", "guarantee",
+    "features", "specs", "specifications",
+    "availability", "available", "in stock",
+    "size", "weight", "dimensions",
+    "battery", "battery life",
+    "shipping", "delivery",
+    "reviews", "ratings",
+    "compatible", "compatibility",
+    "return", "refund",
+]
+LEGACY_QUESTION_STARTERS = ["what", "how", "which", "where", "when", "does", "is", "can", "do", "tell"]
+LEGACY_PRODUCT_KEYWORDS = [
+    "smart", "watch", "laptop", "earbuds", "earbud", "power bank",
+    "camera", "drone", "monitor", "tablet", "speaker", "phone",
+    "keyboard", "mouse", "charger", "gimbal", "stabilizer", "lock",
+    "hub", "display", "tracker", "headphones", "headphone", "bluetooth",
+    "wireless", "gaming", "fitness", "portable", "external",
+    "compressor", "luggage", "corrector", "wearable",
+]
+
+
+def legacy_is_follow_up(query: str, last_product: str, product_names: List[str]) -> bool:
+    """Substring-based check from main.chat (session assumed to have history)"""
+    query_lower = query.lower().strip()
+    is_follow_up = any(indicator in query_lower for indicator in LEGACY_FOLLOW_UP_INDICATORS)
+
+    starts_with_question = any(query_lower.startswith(q) for q in LEGACY_QUESTION_STARTERS)
+    if starts_with_question and len(query.split()) <= 8:
+        is_follow_up = True
+
+    if last_product and not is_follow_up:
+        has_product_mention = any(keyword in query_lower for keyword in LEGACY_PRODUCT_KEYWORDS)
+        if not has_product_mention:
+            has_product_mention = any(name.lower() in query_lower for name in product_names)
+        if not has_product_mention:
+            is_follow_up = True
+
+    return bool(last_product) and is_follow_up and last_product.lower() not in query_lower
+
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+def score_detector(predict: Callable[[str, str], bool], examples: List[Dict], repeat: int) -> Dict:
+    """
+    Run a detector over the labeled set
+
+    Returns:
+        Dict with accuracy, precision, recall, mean µs per query and the
+        misclassified examples
+    """
+    tp = fp = fn = tn = 0
+    errors = []
+    for example in examples:
+        predicted = predict(example["query"], example["last_product"])
+        expected = example["follow_up"]
+        if predicted and expected:
+            tp += 1
+        elif predicted:
+            fp += 1
+        elif expected:
+            fn += 1
+        else:
+            tn += 1
+        if predicted != expected:
+            errors.append({**example, "predicted": predicted})
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for example in examples:
+            predict(example["query"], example["last_product"])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "accuracy": (tp + tn) / len(examples),
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "us_per_query": elapsed / (repeat * len(examples)) * 1e6,
+        "errors": errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark follow-up detection")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG)
+    parser.add_argument("--eval-set", default=DEFAULT_EVAL_SET)
+    parser.add_argument("--repeat", type=int, default=500, help="Timing passes over the eval set")
+    parser.add_argument("--show-errors", action="store_true", help="Print misclassified queries")
+    args = parser.parse_args()
+
+    with open(args.eval_set, "r", encoding="utf-8") as f:
+        examples = json.load(f)["queries"]
+    product_names = load_product_names(args.catalog)
+
+    print("=" * 70)
+    print("FOLLOW-UP DETECTION BENCHMARK")
+    print("=" * 70)
+    print(f"  - Labeled queries: {len(examples)} ({sum(e['follow_up'] for e in examples)} follow-ups)")
+    print(f"  - Product names: {len(product_names)}")
+
+    start = time.perf_counter()
+    detector = FollowUpDetector(product_names)
+    print(f"  - Detector build: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    detectors = {
+        "legacy": lambda q, p: legacy_is_follow_up(q, p, product_names),
+        "compiled": detector.is_follow_up,
+    }
+
+    print(f"\n{'detector':<10} {'accuracy':>9} {'precision':>10} {'recall':>7} {'µs/query':>9}")
+    results = {}
+    for name, predict in detectors.items():
+        results[name] = score_detector(predict, examples, args.repeat)
+        r = results[name]
+        print(f"{name:<10} {r['accuracy']:>9.2%} {r['precision']:>10.2%} {r['recall']:>7.2%} {r['us_per_query']:>9.1f}")
+
+    if args.show_errors:
+        for name, r in results.items():
+            print(f"\n{name} errors:")
+            for error in r["errors"]:
+                print(f"  - [{'FP' if error['predicted'] else 'FN'}] {error['query']} (last: {error['last_product']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Retrieval Evaluation Harness: Sweep chunking parameters and retrieval k
+Builds ChromaDB indexes with a deterministic local embedder and measures
+recall@k, index build time, index size and search latency.
+
+Usage:
+    python evaluate_retrieval.py
+    python evaluate_retrieval.py --chunk-sizes 400,600,800 --overlaps 0,80 --k 2,4,6
+    python evaluate_retrieval.py --chunkers records --k 2,4
+    python evaluate_retrieval.py --chunkers records --retriever filtered
+    python evaluate_retrieval.py --chunkers records --retriever hybrid
+"""
+
+import argparse
+import json
+import re
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from langchain_community.document_loaders import TextLoader
+from langchain_community.vectorstores import Chroma
+
+from catalog import CatalogRecordSplitter, parse_catalog
+from bm25_index import BM25Index
+from embed_and_store import CHUNK_OVERLAP, CHUNK_SIZE, CHUNKING_STRATEGY, create_text_splitter
+from local_embeddings import HashingEmbeddings
+from rag_chain import RETRIEVER_K, create_retriever
+
+DEFAULT_CATALOG = "product_info.txt"
+DEFAULT_EVAL_SET = "retrieval_eval_set.json"
+DEFAULT_REPORT = "retrieval_eval_report.json"
+
+
+# ============================================================================
+# LABELED QUERIES
+# ============================================================================
+
+def load_catalog_categories(catalog_text: str) -> Dict[str, List[str]]:
+    """Map each catalog category to the product names it contains"""
+    categories: Dict[str, List[str]] = {}
+    for record in parse_catalog(catalog_text):
+        if record["type"] == "product" and record.get("category"):
+            categories.setdefault(record["category"], []).append(record["name"])
+    return categories
+
+
+def load_eval_set(path: str, catalog_text: str) -> List[Dict]:
+    """
+    Load the labeled query set and expand category labels into product targets
+
+    Returns:
+        List of {"query", "source", "targets"} where each target is a
+        ("product" | "policy", name) pair
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+
+    categories = load_catalog_categories(catalog_text)
+    labeled = []
+    for item in raw["queries"]:
+        targets = [("product", name) for name in item.get("products", [])]
+        for category in item.get("categories", []):
+            targets.extend(("product", name) for name in categories.get(category, []))
+        targets.extend(("policy", name) for name in item.get("policies", []))
+        if not targets:
+            print(f"  ⚠️  Skipping unlabeled query: {item['query']}")
+            continue
+        labeled.append({
+            "query": item["query"],
+            "source": item.get("source"),
+            "targets": list(dict.fromkeys(targets))
+        })
+    return labeled
+
+
+def _target_pattern(kind: str, name: str):
+    if kind == "product":
+        return re.compile(rf"^Product: {re.escape(name)}\s*$", re.MULTILINE)
+    return re.compile(rf"^{re.escape(name)}:", re.MULTILINE)
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+def score_query(retrieved_texts: List[str], targets: List, patterns: Dict) -> Dict:
+    """Compute hit, recall and reciprocal rank for one query's retrieved chunks"""
+    covered = set()
+    first_hit_rank = None
+    for rank, text in enumerate(retrieved_texts, 1):
+        matched = {t for t in targets if patterns[t].search(text)}
+        if matched and first_hit_rank is None:
+            first_hit_rank = rank
+        covered |= matched
+
+    # A query about a 9-product category can't be fully covered by k=4 chunks,
+    # so recall is normalised by the best achievable coverage
+    achievable = min(len(targets), max(len(retrieved_texts), 1))
+    return {
+        "hit": 1.0 if covered else 0.0,
+        "recall": min(len(covered) / achievable, 1.0),
+        "reciprocal_rank": 1.0 / first_hit_rank if first_hit_rank else 0.0
+    }
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def directory_size(path: Path) -> int:
+    """Total size in bytes of all files under path"""
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+def chunk_documents(documents, chunker: str, chunk_size: int = None, chunk_overlap: int = None):
+    """Chunk documents with the production character or record splitter"""
+    if chunker == "records":
+        return CatalogRecordSplitter().split_documents(documents)
+    return create_text_splitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap).split_documents(documents)
+
+
+def evaluate_config(documents, labeled: List[Dict], embeddings, k_values: List[int],
+                    chunker: str, chunk_size: int = None, chunk_overlap: int = None,
+                    retriever_type: str = "similarity") -> Dict:
+    """Build one index and evaluate every k against it"""
+    chunks = chunk_documents(documents, chunker, chunk_size, chunk_overlap)
+    records = parse_catalog(documents[0].page_content) if retriever_type != "similarity" else None
+    patterns = {t: _target_pattern(*t) for item in labeled for t in item["targets"]}
+
+    with tempfile.TemporaryDirectory(prefix="chroma_eval_") as tmpdir:
+        start = time.perf_counter()
+        vectorstore = Chroma.from_documents(
+            documents=chunks,
+            embedding=embeddings,
+            persist_directory=tmpdir,
+            collection_name="product_info_eval"
+        )
+        vectorstore.persist()
+        build_seconds = time.perf_counter() - start
+
+        lexical_build_seconds = None
+        index_path = str(Path(tmpdir) / "bm25_index.json")
+        if retriever_type == "hybrid":
+            start = time.perf_counter()
+            BM25Index.build(chunks).save(index_path)
+            lexical_build_seconds = time.perf_counter() - start
+        index_bytes = directory_size(Path(tmpdir))
+
+        k_results = []
+        for k in k_values:
+            retriever = create_retriever(vectorstore, k=k, records=records, mode=retriever_type,
+                                         index_path=index_path)
+            latencies = []
+            scores = []
+            for item in labeled:
+                start = time.perf_counter()
+                docs = retriever.invoke(item["query"])
+                latencies.append((time.perf_counter() - start) * 1000)
+                scores.append(score_query([d.page_content for d in docs], item["targets"], patterns))
+
+            k_results.append({
+                "k": k,
+                "hit_rate": round(statistics.mean(s["hit"] for s in scores), 4),
+                "recall": round(statistics.mean(s["recall"] for s in scores), 4),
+                "mrr": round(statistics.mean(s["reciprocal_rank"] for s in scores), 4),
+                "latency_ms": {
+                    "mean": round(statistics.mean(latencies), 3),
+                    "p50": round(_percentile(latencies, 50), 3),
+                    "p95": round(_percentile(latencies, 95), 3)
+                }
+            })
+
+        # Release the sqlite handle before the temp directory is removed
+        vectorstore.delete_collection()
+
+    chunk_lengths = [len(c.page_content) for c in chunks]
+    return {
+        "chunker": chunker,
+        "retriever": retriever_type,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "num_chunks": len(chunks),
+        "avg_chunk_chars": round(statistics.mean(chunk_lengths), 1),
+        "total_chunk_chars": sum(chunk_lengths),
+        "build_seconds": round(build_seconds, 4),
+        "lexical_build_seconds": round(lexical_build_seconds, 4) if lexical_build_seconds is not None else None,
+        "index_bytes": index_bytes,
+        "k_results": k_results
+    }
+
+
+def run_sweep(catalog: str, eval_set: str, chunk_sizes: List[int], overlaps: List[int],
+              k_values: List[int], chunkers: List[str] = ("character", "records"),
+              retriever_type: str = "similarity") -> Dict:
+    """Evaluate every chunker config x k combination and build the report"""
+    print("=" * 70)
+    print("Retrieval Evaluation Sweep")
+    print("=" * 70)
+
+    documents = TextLoader(catalog).load()
+    labeled = load_eval_set(eval_set, documents[0].page_content)
+    embeddings = HashingEmbeddings()
+    print(f"✓ Loaded {len(labeled)} labeled queries from {eval_set}")
+
+    configs = []
+    if "character" in chunkers:
+        configs.extend(
+            ("character", chunk_size, chunk_overlap)
+            for chunk_size in chunk_sizes
+            for chunk_overlap in overlaps
+            if chunk_overlap < chunk_size
+        )
+    if "records" in chunkers:
+        configs.append(("records", None, None))
+
+    results = []
+    for chunker, chunk_size, chunk_overlap in configs:
+        if chunker == "records":
+            print(f"\n[Config] records (one chunk per product/policy)")
+        else:
+            print(f"\n[Config] chunk_size={chunk_size}, overlap={chunk_overlap}")
+        result = evaluate_config(documents, labeled, embeddings, k_values, chunker,
+                                 chunk_size, chunk_overlap, retriever_type)
+        results.append(result)
+        print(f"  - Chunks: {result['num_chunks']} | Build: {result['build_seconds']:.2f}s | "
+              f"Size: {result['index_bytes'] / 1024:.0f} KB")
+        for kr in result["k_results"]:
+            print(f"  - k={kr['k']}: recall={kr['recall']:.3f} hit_rate={kr['hit_rate']:.3f} "
+                  f"mrr={kr['mrr']:.3f} p95={kr['latency_ms']['p95']:.2f}ms")
+
+    best = max(
+        ({**{key: r[key] for key in ("chunker", "retriever", "chunk_size", "chunk_overlap", "num_chunks")}, **kr}
+         for r in results for kr in r["k_results"]),
+        key=lambda row: (row["recall"], row["mrr"], -row["latency_ms"]["p95"]),
+        default=None
+    )
+
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "catalog": catalog,
+        "eval_set": eval_set,
+        "num_queries": len(labeled),
+        "embedder": {"name": "HashingEmbeddings", "dimensions": embeddings.dimensions},
+        "production_config": {
+            "chunker": CHUNKING_STRATEGY,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "k": RETRIEVER_K
+        },
+        "results": results,
+        "best": best
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def _str_list(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep chunking parameters and retrieval k")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG)
+    parser.add_argument("--eval-set", default=DEFAULT_EVAL_SET)
+    parser.add_argument("--chunk-sizes", type=_int_list, default=[400, 500, 600, 700, 800])
+    parser.add_argument("--overlaps", type=_int_list, default=[0, 80, 150])
+    parser.add_argument("--k", type=_int_list, default=[2, 3, 4, 5, 6])
+    parser.add_argument("--chunkers", type=_str_list, default=["character", "records"])
+    parser.add_argument("--retriever", choices=["similarity", "filtered", "hybrid"], default="similarity")
+    parser.add_argument("--output", default=DEFAULT_REPORT)
+    args = parser.parse_args()
+
+    report = run_sweep(args.catalog, args.eval_set, args.chunk_sizes, args.overlaps, args.k, args.chunkers, args.retriever)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "=" * 70)
+    if report["best"]:
+        best = report["best"]
+        print(f"Best: chunker={best['chunker']}, chunk_size={best['chunk_size']}, "
+              f"overlap={best['chunk_overlap']}, k={best['k']} (recall={best['recall']:.3f})")
+    print(f"Report written to {args.output}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
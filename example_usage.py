@@ -4,8 +4,6 @@ Example: How to use the RAG chain programmatically
 
 import os
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import Chroma
 from rag_chain import create_rag_chain
 
 # Load environment variables
@@ -26,19 +24,7 @@ def example_usage():
     print("\nInitializing RAG chain...")
     rag_chain = create_rag_chain()
     
-    # Step 2: Load retriever for source documents
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=GEMINI_API_KEY
-    )
-    vectorstore = Chroma(
-        persist_directory="chroma_db",
-        embedding_function=embeddings,
-        collection_name="product_info"
-    )
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
-    
-    # Step 3: Define example queries
+    # Step 2: Define example queries
     queries = [
         "What is the price of SmartWatch Pro X?",
         "Do you offer warranty?",
@@ -55,12 +41,11 @@ def example_usage():
         print(f"{'─' * 70}")
         
         try:
-            # Get answer from RAG chain
-            answer = rag_chain.invoke(query)
-            print(f"Assistant: {answer}")
+            # Get answer and source documents from a single RAG chain call
+            result = rag_chain.invoke(query)
+            print(f"Assistant: {result['answer']}")
             
-            # Get source documents
-            docs = retriever.invoke(query)
+            docs = result["source_documents"]
             print(f"\n[Retrieved {len(docs)} source document(s)]")
             
         except Exception as e:
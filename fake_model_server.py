@@ -0,0 +1,126 @@
+"""
+Fake Model Server: Local stand-in for the Gemini generateContent API
+Serves canned answers with configurable latency and failure rates per model,
+for exercising model_router.py (hedging, failover, circuit breakers)
+without calling the real API.
+
+Usage:
+    python fake_model_server.py --port 8081 --latency 0.5 \
+        --model-latency gemini-2.5-flash=6 --model-failure gemini-2.5-pro=0.2
+
+    # Point the RAG chain at it (REST transport is used automatically)
+    GEMINI_API_ENDPOINT=http://localhost:8081 python example_usage.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GENERATE_PATH = re.compile(r"/v1(?:beta)?\d*/models/(?P<model>[^/:]+):generateContent")
+
+
+def parse_overrides(values):
+    """Parse repeated NAME=NUMBER options into a dict"""
+    overrides = {}
+    for value in values or []:
+        name, _, number = value.partition("=")
+        overrides[name.strip()] = float(number)
+    return overrides
+
+
+class FakeModelHandler(BaseHTTPRequestHandler):
+    """Handles POST .../models/<model>:generateContent"""
+
+    config = {}
+    calls = {}
+    calls_lock = threading.Lock()
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        match = GENERATE_PATH.match(self.path.split("?", 1)[0])
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {self.path}", "status": "NOT_FOUND"}})
+            return
+
+        model = match.group("model")
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+
+        with self.calls_lock:
+            self.calls[model] = self.calls.get(model, 0) + 1
+
+        latency = self.config["model_latency"].get(model, self.config["latency"])
+        latency += random.uniform(0, self.config["jitter"])
+        time.sleep(latency)
+
+        failure_rate = self.config["model_failure"].get(model, self.config["failure_rate"])
+        if random.random() < failure_rate:
+            self._send_json(503, {"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}})
+            return
+
+        self._send_json(200, {
+            "candidates": [{
+                "content": {"parts": [{"text": f"[{model}] Fake answer after {latency:.2f}s"}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+                "safetyRatings": [],
+            }],
+            "promptFeedback": {"safetyRatings": []},
+        })
+
+    def log_message(self, format, *args):
+        print(f"  - {self.address_string()} {format % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini generateContent server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.5, help="Base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Extra random latency (0..jitter seconds)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of calls answered with 503")
+    parser.add_argument("--model-latency", action="append", metavar="MODEL=SECONDS",
+                        help="Per-model base latency (repeatable)")
+    parser.add_argument("--model-failure", action="append", metavar="MODEL=RATE",
+                        help="Per-model failure rate (repeatable)")
+    args = parser.parse_args()
+
+    FakeModelHandler.config = {
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "failure_rate": args.failure_rate,
+        "model_latency": parse_overrides(args.model_latency),
+        "model_failure": parse_overrides(args.model_failure),
+    }
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeModelHandler)
+    print("=" * 70)
+    print(f"Fake model server listening on http://{args.host}:{args.port}")
+    print("=" * 70)
+    print(f"  - Base latency: {args.latency}s (+0-{args.jitter}s jitter)")
+    print(f"  - Failure rate: {args.failure_rate:.0%}")
+    for model, seconds in FakeModelHandler.config["model_latency"].items():
+        print(f"  - {model}: {seconds}s latency")
+    for model, rate in FakeModelHandler.config["model_failure"].items():
+        print(f"  - {model}: {rate:.0%} failures")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nCalls per model: {FakeModelHandler.calls}")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Follow-up Detection: Decide whether a query refers to the previous product
+Replaces the per-request substring loops in main.chat with precompiled,
+word-boundary-aware matching and a small additive scoring model:
+
+    + coreference ("it", "this one", "the same product")
+    + ellipsis openers ("what about", "how about", "and")
+    + product attributes asked on their own ("colors?", "the warranty")
+    - an explicit product name or product type in the query (new topic)
+    - store-wide questions ("your return policy", "refunds", "is COD available")
+
+See evaluate_follow_up.py for accuracy and per-request cost on
+follow_up_eval_set.json.
+"""
+
+import re
+from typing import Dict, Iterable, Optional
+
+# Score at or above which a query is treated as a follow-up
+FOLLOW_UP_THRESHOLD = 2
+
+# Short queries are more likely to lean on context
+SHORT_QUERY_WORDS = 6
+
+WEIGHTS = {
+    "coreference": 4,
+    "ellipsis": 2,
+    "product_attribute": 2,
+    "short_question": 1,
+    "product_mention": -5,
+    "store_question": -2,
+}
+
+# Word-boundary-aware alternations; combined with the product names into one
+# pattern so a query is scanned once
+SIGNAL_PATTERNS = {
+    "coreference": r"it|its|it's|this|that|these|those|them|they|one|same|the product|this product|that product",
+    "product_attribute": (
+        r"colou?rs?|price|pricing|cost|how much|warranty|guarantee|features?|specs?|specifications?|"
+        r"availability|available|in stock|stock|size|weight|heavy|dimensions?|battery(?: life)?|reviews?|"
+        r"ratings?|compatib(?:le|ility)|capacity|resolution|display|emi|discount"
+    ),
+    # Store-wide topics: policies apply to every product, so they do not need the last one
+    "store_question": (
+        r"your|policy|policies|store|company|support|contact|hours|all products|any products|"
+        r"returns?|refunds?|exchanges?|return window|shipping|delivery|cod|cash on delivery|payments?|"
+        r"do you (?:ship|deliver|sell|offer|accept|have)"
+    ),
+}
+
+_ELLIPSIS = re.compile(r"(?:what about|how about|and|also|what of|same for)\b", re.IGNORECASE)
+_QUESTION_START = re.compile(r"(?:what|how|which|where|when|does|is|can|do|tell)\b", re.IGNORECASE)
+_SMALL_TALK = re.compile(
+    r"(?:hi|hello|hey|greetings|ok|okay|k|thanks|thank you|thankyou|got it|understood|bye|cool|great)\W*$",
+    re.IGNORECASE
+)
+
+# Generic product types; mentioning one means the user changed topic
+PRODUCT_TYPE_KEYWORDS = [
+    "smartwatch", "watch", "laptop", "earbud", "headphone", "power bank", "powerbank",
+    "camera", "drone", "monitor", "tablet", "speaker", "phone", "keyboard", "mouse", "mice",
+    "charger", "gimbal", "stabilizer", "lock", "hub", "tracker", "router", "projector",
+    "printer", "scooter", "ssd", "webcam", "microphone", "compressor", "luggage", "corrector",
+]
+
+
+def _trie_pattern(phrases: Iterable[str]) -> str:
+    """
+    Factor phrases into a prefix tree regex ("smart(?:watch|phone)")
+
+    A flat alternation of 200 product names retries every name at every
+    position; the factored form rejects a position after one character.
+    """
+    trie: Dict = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: Dict) -> str:
+        optional = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 and not optional else "(?:" + "|".join(branches) + ")"
+        return body + "?" if optional else body
+
+    return build(trie)
+
+
+def _compile_signals(product_names: Iterable[str]):
+    """Build one regex (matched against lowercased text) whose named groups are the scoring signals"""
+    names = {n.lower() for n in product_names if n}
+    # Product types also match plurals ("earbuds", "monitors")
+    types = {t + suffix for t in PRODUCT_TYPE_KEYWORDS for suffix in ("", "s", "es")}
+    groups = [f"(?P<product_mention>{_trie_pattern(names | types)})"]
+    groups += [f"(?P<{name}>{pattern})" for name, pattern in SIGNAL_PATTERNS.items()]
+    return re.compile(r"\b(?:" + "|".join(groups) + r")\b")
+
+
+class FollowUpDetector:
+    """
+    Scores a query for dependence on the session's last product
+
+    All signals and product names are compiled into a single regex at
+    construction, so scoring is one scan of the query instead of a loop
+    over every indicator and catalog name.
+    """
+
+    def __init__(self, product_names: Iterable[str] = (), threshold: int = FOLLOW_UP_THRESHOLD):
+        self.threshold = threshold
+        self._signals = _compile_signals(product_names)
+
+    def score(self, query: str) -> Dict:
+        """
+        Score a query without session state
+
+        Returns:
+            Dict with "score", "signals" (signal -> weight) and
+            "product_mentioned"
+        """
+        text = query.strip()
+        signals: Dict[str, int] = {}
+        if not text or _SMALL_TALK.match(text):
+            return {"score": 0, "signals": signals, "product_mentioned": False}
+
+        for match in self._signals.finditer(text.lower()):
+            signals[match.lastgroup] = WEIGHTS[match.lastgroup]
+        if _ELLIPSIS.match(text):
+            signals["ellipsis"] = WEIGHTS["ellipsis"]
+        if _QUESTION_START.match(text) and len(text.split()) <= SHORT_QUERY_WORDS:
+            signals["short_question"] = WEIGHTS["short_question"]
+
+        product_mentioned = "product_mention" in signals
+        return {"score": sum(signals.values()), "signals": signals, "product_mentioned": product_mentioned}
+
+    def is_follow_up(self, query: str, last_product: Optional[str]) -> bool:
+        """True if the query should be answered about last_product"""
+        if not last_product or last_product.lower() in query.lower():
+            return False
+        return self.score(query)["score"] >= self.threshold
+
+    def enhance(self, query: str, last_product: Optional[str]) -> str:
+        """Append the last product to a follow-up query; other queries are unchanged"""
+        if self.is_follow_up(query, last_product):
+            return f"{query} for {last_product}"
+        return query
+
@@ -0,0 +1,224 @@
+"""
+Generation Cache: Content-addressed on-disk cache for LLM calls
+Every generation is stored under sha256(prompt template version, model,
+temperature, prompt text). The prompt text already contains the retrieved
+context and the question, so any change to the template, the models, the
+retrieved chunks or the query produces a new key and old answers are
+never served for new inputs.
+
+The cache is a SQLite file shared by all workers and processes on the
+host and survives restarts. It is bounded by size: once the stored
+responses exceed GENERATION_CACHE_MAX_MB the least recently used ones
+are evicted.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from sqlite_store import SQLiteStore
+
+# SQLite file shared by all workers on the host
+GENERATION_CACHE_PATH = os.getenv("GENERATION_CACHE_PATH", os.path.join("chroma_db", "generation_cache.sqlite"))
+
+# Set to "false" to always call the models
+GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "true").lower() == "true"
+
+# Size limit for stored prompts + responses; LRU entries are evicted above it
+GENERATION_CACHE_MAX_MB = float(os.getenv("GENERATION_CACHE_MAX_MB", "256"))
+
+# Eviction trims down to this fraction of the limit, so it does not run on every store
+EVICT_TO_FRACTION = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    model TEXT NOT NULL,
+    template_version TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_hit REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS generations_last_hit ON generations (last_hit);
+"""
+
+
+def template_version(template: str) -> str:
+    """Short content hash of a prompt template; editing the template changes it"""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+
+def prompt_text(prompt: Any) -> str:
+    """Text of a PromptValue, message list or string, as sent to the model"""
+    if hasattr(prompt, "to_string"):
+        return prompt.to_string()
+    if isinstance(prompt, list):
+        return "\n".join(f"{getattr(m, 'type', '')}: {getattr(m, 'content', m)}" for m in prompt)
+    return str(prompt)
+
+
+def generation_key(template_version: str, model: str, temperature: float, text: str) -> str:
+    """Content address of one generation"""
+    payload = json.dumps([template_version, model, temperature, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """SQLite generation store with size-based LRU eviction"""
+
+    def __init__(self, path: str = GENERATION_CACHE_PATH, max_mb: float = GENERATION_CACHE_MAX_MB,
+                 enabled: bool = GENERATION_CACHE_ENABLED):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.enabled = enabled
+        self._store = SQLiteStore(path, SCHEMA)
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[str, int]] = {}
+        # Bytes stored, refreshed from the database on eviction (other processes write too)
+        self._size: Optional[int] = None
+
+    def _count(self, namespace: str, key: str):
+        with self._lock:
+            counters = self.counters.setdefault(namespace, {"hits": 0, "misses": 0, "stores": 0, "errors": 0})
+            counters[key] += 1
+
+    def get(self, key: str, namespace: str = "default") -> Optional[str]:
+        """Cached response for a key, or None (cache errors count as misses)"""
+        if not self.enabled:
+            return None
+        try:
+            conn = self._store.connect()
+            row = conn.execute("SELECT response FROM generations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count(namespace, "misses")
+                return None
+            conn.execute("UPDATE generations SET hits = hits + 1, last_hit = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            self._count(namespace, "errors")
+            print(f"Warning: generation cache lookup failed: {e}")
+            return None
+        self._count(namespace, "hits")
+        return row[0]
+
+    def put(self, key: str, response: str, namespace: str = "default", model: str = "",
+            template_version: str = ""):
+        """Store a response, evicting least recently used entries if over the size limit"""
+        if not self.enabled:
+            return
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        try:
+            self._store.connect().execute(
+                "INSERT OR REPLACE INTO generations "
+                "(key, namespace, model, template_version, response, size, created_at, last_hit, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, namespace, model, template_version, response, size, now, now)
+            )
+            self._count(namespace, "stores")
+            with self._lock:
+                if self._size is not None:
+                    self._size += size
+                over = self._size is None or self._size > self.max_bytes
+            if over:
+                self.evict()
+        except sqlite3.Error as e:
+            self._count(namespace, "errors")
+            print(f"Warning: generation cache store failed: {e}")
+
+    def evict(self) -> int:
+        """
+        Trim the cache to EVICT_TO_FRACTION of the size limit (LRU first)
+
+        Returns:
+            Number of entries removed
+        """
+        conn = self._store.connect()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM generations").fetchone()[0]
+        removed = 0
+        if total > self.max_bytes:
+            target = int(self.max_bytes * EVICT_TO_FRACTION)
+            freed = 0
+            victims = []
+            for key, size in conn.execute("SELECT key, size FROM generations ORDER BY last_hit"):
+                if total - freed <= target:
+                    break
+                victims.append((key,))
+                freed += size
+            conn.executemany("DELETE FROM generations WHERE key = ?", victims)
+            removed = len(victims)
+            total -= freed
+        with self._lock:
+            self._size = total
+        return removed
+
+    def snapshot(self) -> Dict:
+        """Per-namespace counters and hit ratios, entries and stored size (for /metrics)"""
+        with self._lock:
+            counters = {name: dict(c) for name, c in self.counters.items()}
+        for c in counters.values():
+            lookups = c["hits"] + c["misses"]
+            c["hit_ratio"] = round(c["hits"] / lookups, 3) if lookups else None
+        stats = {"enabled": self.enabled, "namespaces": counters}
+        if self.enabled:
+            try:
+                entries, size = self._store.connect().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations"
+                ).fetchone()
+                stats["entries"] = entries
+                stats["size_mb"] = round(size / 1024 / 1024, 2)
+                stats["max_mb"] = round(self.max_bytes / 1024 / 1024, 2)
+            except sqlite3.Error as e:
+                stats["error"] = str(e)
+        return stats
+
+
+@lru_cache(maxsize=1)
+def get_generation_cache() -> GenerationCache:
+    """Process-wide generation cache"""
+    return GenerationCache()
+
+
+class CachedLLM:
+    """
+    Wraps anything with invoke(prompt) (a chat model or the ModelRouter)
+
+    Returns answer text, from the cache when the same prompt was already
+    answered by the same model(s) at the same temperature. Failed calls
+    are not cached.
+    """
+
+    def __init__(self, llm, model: str, temperature: float, template_version: str,
+                 namespace: str = "default", cache: Optional[GenerationCache] = None):
+        """
+        Args:
+            llm: Model or router to call on a miss
+            model: Model name, or comma-joined names for a router
+            temperature: Sampling temperature the model was created with
+            template_version: template_version() of the prompt template
+            namespace: Label for metrics ("rag", "classifier")
+            cache: Cache to use (default: get_generation_cache())
+        """
+        self.llm = llm
+        self.model = model
+        self.temperature = temperature
+        self.template_version = template_version
+        self.namespace = namespace
+        self.cache = cache or get_generation_cache()
+
+    def invoke(self, prompt, config=None) -> str:
+        key = generation_key(self.template_version, self.model, self.temperature, prompt_text(prompt))
+        cached = self.cache.get(key, self.namespace)
+        if cached is not None:
+            return cached
+        result = self.llm.invoke(prompt)
+        answer = getattr(result, "content", result)
+        self.cache.put(key, answer, self.namespace, self.model, self.template_version)
+        return answer
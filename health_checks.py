@@ -0,0 +1,206 @@
+"""
+Health Checks: Dependency probes for /ready and /health/deep
+Each probe measures its own latency and caches the result for a TTL, so
+load balancers polling every few seconds do not add load to Chroma or the
+LLM API: at most one probe per dependency runs per TTL, and concurrent
+callers wait for it instead of probing again.
+
+Critical probes (workflow, catalog, vector store) make the service
+unhealthy when they fail. Non-critical ones (LLM, BM25 index, response
+rules) only degrade it - the workflow falls back to concise answers.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from deadlines import Deadline, call_with_deadline, deadline_scope
+
+# Seconds a probe result is reused before the dependency is probed again
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "30"))
+
+# LLM probes cost tokens and quota, so they are refreshed less often
+LLM_PROBE_TTL = float(os.getenv("LLM_PROBE_TTL", "300"))
+
+# Max seconds for a single probe before it counts as failed
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+
+# Prompt sent by the active LLM probe
+LLM_PROBE_PROMPT = "Reply with the single word OK."
+
+
+class ProbeFailed(RuntimeError):
+    """Raised by a check function when the dependency is reachable but unusable"""
+
+
+class CachedProbe:
+    """
+    One dependency check with TTL caching
+
+    The check function returns a dict of details (e.g. {"count": 210})
+    or raises; the cached result records status, latency and when it ran.
+    """
+
+    def __init__(self, name: str, check: Callable[[], Dict], ttl: float = HEALTH_CACHE_TTL,
+                 critical: bool = True, timeout: float = HEALTH_PROBE_TIMEOUT):
+        self.name = name
+        self.check = check
+        self.ttl = ttl
+        self.critical = critical
+        self.timeout = timeout
+        self._result: Optional[Dict] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _fresh(self) -> bool:
+        if self._result is None:
+            return False
+        # Failures are retried sooner so recovery shows up quickly
+        ttl = self.ttl if self._result["status"] == "ok" else min(self.ttl, HEALTH_CACHE_TTL)
+        return time.monotonic() - self._checked_at < ttl
+
+    def result(self, refresh: bool = False) -> Dict:
+        """Cached result, probing first if it is older than the TTL"""
+        if refresh or not self._fresh():
+            with self._lock:
+                # Another caller may have probed while we waited for the lock
+                if refresh or not self._fresh():
+                    self._result = self._probe()
+                    self._checked_at = time.monotonic()
+        return {**self._result, "age_seconds": round(time.monotonic() - self._checked_at, 1)}
+
+    def _probe(self) -> Dict:
+        start = time.perf_counter()
+        result = {"status": "ok", "critical": self.critical}
+        try:
+            with deadline_scope(Deadline(self.timeout)):
+                result["detail"] = call_with_deadline(self.check, step=f"{self.name} probe")
+        except Exception as e:
+            result["status"] = "fail"
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        result["checked_at"] = datetime.now().isoformat()
+        return result
+
+
+class HealthChecker:
+    """Runs a set of cached probes and summarizes them"""
+
+    def __init__(self, probes: List[CachedProbe]):
+        self.probes = {probe.name: probe for probe in probes}
+
+    def report(self, names: Optional[List[str]] = None, refresh: bool = False) -> Dict:
+        """
+        Probe results and overall status
+
+        Args:
+            names: Probes to include (default: all)
+            refresh: Ignore cached results
+
+        Returns:
+            {"status": "healthy" | "degraded" | "unhealthy", "checks": {...}}
+        """
+        checks = {
+            name: probe.result(refresh)
+            for name, probe in self.probes.items()
+            if names is None or name in names
+        }
+        failed = [c for c in checks.values() if c["status"] != "ok"]
+        if any(c["critical"] for c in failed):
+            overall = "unhealthy"
+        elif failed:
+            overall = "degraded"
+        else:
+            overall = "healthy"
+        return {"status": overall, "checks": checks}
+
+
+# ============================================================================
+# DEPENDENCY CHECKS
+# ============================================================================
+
+def check_workflow(workflow_app) -> Dict:
+    """The LangGraph workflow has been compiled"""
+    if workflow_app is None:
+        raise ProbeFailed("workflow not compiled")
+    return {"type": type(workflow_app).__name__}
+
+
+def check_catalog(snapshot) -> Dict:
+    """The catalog snapshot parsed and contains products"""
+    if not snapshot.product_names:
+        raise ProbeFailed(f"no products in {snapshot.catalog_path}")
+    return {"version": snapshot.version, "products": len(snapshot.product_names), "records": len(snapshot.records)}
+
+
+def check_vector_store(snapshot, collection_name: str = "product_info") -> Dict:
+    """The snapshot's Chroma collection (every shard's, if sharded) opens and is not empty"""
+    client = snapshot.vector_client
+    names = [shard["collection"] for shard in snapshot.shards] if snapshot.shards else [collection_name]
+    counts = {}
+    for name in names:
+        counts[name] = client.get_collection(name).count()
+        if counts[name] == 0:
+            raise ProbeFailed(f"collection '{name}' is empty")
+    if not snapshot.shards:
+        return {"collection": collection_name, "count": counts[collection_name],
+                "persist_directory": snapshot.persist_directory}
+    return {"collections": counts, "count": sum(counts.values()), "persist_directory": snapshot.persist_directory}
+
+
+def check_bm25_index(snapshot) -> Dict:
+    """The snapshot's BM25 index (every shard's, if sharded) loads (hybrid retrieval's lexical side)"""
+    from bm25_index import load_bm25_index
+    from catalog_shards import shard_index_path
+
+    paths = ([shard_index_path(snapshot.persist_directory, shard) for shard in snapshot.shards]
+             if snapshot.shards else [snapshot.index_path])
+    documents = terms = 0
+    for path in paths:
+        index = load_bm25_index(path)
+        if index is None:
+            raise ProbeFailed(f"no BM25 index at {path}")
+        documents += len(index.documents)
+        terms += len(index.postings)
+    return {"documents": documents, "terms": terms}
+
+
+def check_rules() -> Dict:
+    """The fallback response rules compile"""
+    from rule_engine import get_rule_engine
+
+    engine = get_rule_engine()
+    return {"rules": len(engine.rules), "products": len(engine.products)}
+
+
+def check_llm(router) -> Dict:
+    """
+    One short generation, calling the router's models directly
+
+    The probe budget (HEALTH_PROBE_TIMEOUT) is shorter than MODEL_TIMEOUT,
+    so probes bypass the router: a slow probe must not count against a
+    model's circuit breaker or move the latency percentile that real
+    requests hedge on. Models are tried in preference order until one
+    answers, so a failed primary with a healthy fallback still passes;
+    circuit states are read from router.stats().
+    """
+    if router is None:
+        raise ProbeFailed("RAG chain not built yet")
+    circuits = {name: model["circuit"] for name, model in router.stats()["models"].items()}
+    models = {}
+    answer = None
+    for name, model in router.models:
+        if answer is not None:
+            models[name] = {"circuit": circuits[name], "probe": "skipped"}
+            continue
+        try:
+            result = call_with_deadline(model.invoke, LLM_PROBE_PROMPT, step=f"{name} probe")
+            answer = getattr(result, "content", result)
+            models[name] = {"circuit": circuits[name], "probe": "ok"}
+        except Exception as e:
+            models[name] = {"circuit": circuits[name], "probe": f"{type(e).__name__}: {e}"[:200]}
+    if answer is None:
+        raise ProbeFailed("no model answered: " + "; ".join(f"{n}: {m['probe']}" for n, m in models.items()))
+    return {"answer": str(answer)[:20], "models": models}
@@ -0,0 +1,999 @@
+"""
+Catalog Ingestion CLI: Parse, validate, diff, embed, verify and compact
+One command per ingest stage, so a catalog rebuild can be checked before
+anything is written, run in CI without an API key, and timed stage by stage.
+
+- parse:    Parse the catalog into records
+- validate: Check every record (required fields, prices, SKUs, duplicates)
+- diff:     Records added, removed or changed since the last ingest (or another catalog file)
+- embed:    Parse, validate, embed in concurrent batches and write ChromaDB,
+            the BM25 index, the policy answers and the ingest manifest
+- verify:   Check the written indexes against the catalog and run smoke retrievals
+- compact:  Evict expired cache entries and VACUUM the SQLite files
+
+The catalog is streamed from a memory-mapped file, record by record (or
+section by section into worker processes for files over 1 MB), so parsing
+and validation hold only a bounded window of records whatever the catalog
+size. embed streams documents into the vector store in batches; the BM25
+index, which stores every document, is the one stage that grows with it.
+
+--catalog may name a directory of catalog files: each file is embedded
+into its own collection and BM25 index (catalog_shards.py), shards in
+parallel, and `embed --changed-only` re-embeds only the files whose
+content changed since the last ingest.
+
+Every command streams progress and ends with a per-stage timing table
+(--report writes it as JSON). --embedder fake uses the deterministic
+HashingEmbeddings from local_embeddings.py: no API key or network, for CI.
+
+Usage:
+    python ingest.py parse
+    python ingest.py validate --workers 4
+    python ingest.py diff                              # Against the last ingest
+    python ingest.py diff --against old_product_info.txt
+    python ingest.py embed --dry-run                   # Parse, validate and diff only
+    python ingest.py embed --concurrency 4 --batch-size 32
+    python ingest.py embed --embedder fake --persist-directory /tmp/ci_chroma
+    python ingest.py embed --catalog catalog/ --changed-only   # Sharded: only changed files
+    python ingest.py verify --sample 20
+    python ingest.py compact
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from catalog import (
+    SECTION_HEADER,
+    catalog_files,
+    catalog_size,
+    catalog_version,
+    iter_catalog_documents,
+    iter_catalog_file,
+    iter_catalog_lines,
+    iter_catalog_records,
+)
+from catalog_shards import (
+    SHARD_WORKERS,
+    describe_shards,
+    is_sharded,
+    load_shard_manifest,
+    remove_shard_manifest,
+    save_shard_manifest,
+    shard_index_path,
+)
+
+DEFAULT_CATALOG = os.getenv("CATALOG_PATH", "product_info.txt")
+DEFAULT_PERSIST_DIRECTORY = "chroma_db"
+COLLECTION_NAME = "product_info"
+
+# Written next to the vector store; records what was ingested, with what, and how long it took
+MANIFEST_NAME = "ingest_manifest.json"
+
+# Texts per embedding request, and requests in flight at once
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "32"))
+EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+
+# Worker processes for parsing and validation
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Worker processes pay for start-up and for pickling records back; below
+# this file size that costs more than it saves (the 200-product catalog
+# parses in under 10 ms in-process)
+PARALLEL_MIN_BYTES = 1024 * 1024
+
+# Records per validation batch, and lines per parse job when a section is long
+RECORD_BATCH_SIZE = 1000
+SECTION_CHUNK_LINES = 5000
+
+SKU_PATTERN = re.compile(r"^[A-Z0-9]+(?:-[A-Z0-9.]+)+$")
+KNOWN_STOCK_STATUSES = {"in stock", "out of stock", "limited stock", "pre-order", "preorder"}
+REQUIRED_PRODUCT_FIELDS = ("name", "sku", "price_text", "category", "features")
+
+
+# ============================================================================
+# TIMING AND PROGRESS
+# ============================================================================
+
+class StageTimer:
+    """Wall-clock time per named stage, printed as a table at the end"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        print(f"\n[{name}]")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def print_summary(self):
+        print("\n" + "=" * 60)
+        print("STAGE TIMINGS")
+        print("=" * 60)
+        for name, seconds in self.stages.items():
+            print(f"  {name:<12} {seconds * 1000:>10.1f} ms")
+        print(f"  {'total':<12} {self.total * 1000:>10.1f} ms")
+
+    def snapshot(self) -> Dict:
+        return {
+            "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()},
+            "total_ms": round(self.total * 1000, 1)
+        }
+
+
+class Progress:
+    """
+    Prints "done/total" lines as work completes: about every 10% of a
+    known total, or every `every` items when the total is not known yet
+    (records streamed from the file)
+    """
+
+    def __init__(self, label: str, total: Optional[int] = None, every: int = 5000):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.start = time.perf_counter()
+        self._step = max(1, total // 10) if total else every
+        self._next = self._step
+        self._printed = 0
+
+    def _print(self):
+        elapsed = time.perf_counter() - self.start
+        if self.total:
+            print(f"  - {self.label}: {self.done}/{self.total} ({100 * self.done / self.total:.0f}%) {elapsed:.1f}s", flush=True)
+        else:
+            print(f"  - {self.label}: {self.done} {elapsed:.1f}s", flush=True)
+        self._printed = self.done
+
+    def advance(self, count: int = 1):
+        self.done += count
+        if self.done >= self._next:
+            self._print()
+            self._next = self.done + self._step
+
+    def finish(self):
+        if self._printed != self.done:
+            self._print()
+
+
+# ============================================================================
+# STREAMING PARSE
+# ============================================================================
+
+@contextmanager
+def worker_pool(path: str, workers: int):
+    """Process pool for large catalogs; None (work in this process) for small ones"""
+    if workers > 1 and catalog_size(path) >= PARALLEL_MIN_BYTES:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield pool
+    else:
+        yield None
+
+
+def submit(pool: Optional[ProcessPoolExecutor], fn, arg) -> "asyncio.Future":
+    """Run fn(arg) in the pool, or right away when there is none"""
+    loop = asyncio.get_running_loop()
+    if pool is not None:
+        return loop.run_in_executor(pool, fn, arg)
+    future = loop.create_future()
+    future.set_result(fn(arg))
+    return future
+
+
+def iter_sections(path: str) -> Iterator[str]:
+    """
+    Stream catalog text in section-sized pieces
+
+    Each piece starts with its "==== SECTION ====" header, so it parses to
+    exactly the records the whole file yields for it. Sections longer than
+    SECTION_CHUNK_LINES are cut at a blank line (a record boundary) and the
+    header is repeated, so no piece grows with the catalog. Files of a
+    catalog directory never share a piece.
+    """
+    for filepath in catalog_files(path):
+        header = None
+        lines: List[str] = []
+        for line in iter_catalog_lines(filepath):
+            if SECTION_HEADER.match(line.rstrip()):
+                if lines:
+                    yield "".join(lines)
+                header, lines = line, [line]
+                continue
+            lines.append(line)
+            if not line.strip() and len(lines) >= SECTION_CHUNK_LINES:
+                yield "".join(lines)
+                lines = [header] if header else []
+        if lines:
+            yield "".join(lines)
+
+
+def parse_section(section: str) -> List[Dict]:
+    """Records of one catalog section (runs in a worker process)"""
+    return list(iter_catalog_records(section.splitlines()))
+
+
+async def stream_records(path: str, pool: Optional[ProcessPoolExecutor] = None,
+                         lookahead: int = 8) -> AsyncIterator[Dict]:
+    """
+    Yield the records of a catalog file in file order
+
+    Without a pool the memory-mapped file is parsed record by record in
+    this process. With one, sections are parsed by the workers, at most
+    `lookahead` sections ahead of the consumer, so memory stays flat
+    either way.
+    """
+    if pool is None:
+        for record in iter_catalog_file(path):
+            yield record
+        return
+
+    pending: Deque["asyncio.Future"] = deque()
+    for section in iter_sections(path):
+        pending.append(submit(pool, parse_section, section))
+        if len(pending) >= lookahead:
+            for record in await pending.popleft():
+                yield record
+    while pending:
+        for record in await pending.popleft():
+            yield record
+
+
+def record_key(record: Dict) -> str:
+    """Stable identity of a record across catalog edits (SKU, else type and name)"""
+    return record.get("sku") or f"{record['type']}:{record.get('name', '')}"
+
+
+def record_hash(record: Dict) -> str:
+    """Content hash of a record; changes when any of its lines change"""
+    return hashlib.sha256(record["text"].encode("utf-8")).hexdigest()[:16]
+
+
+# ============================================================================
+# VALIDATE
+# ============================================================================
+
+def validate_record(record: Dict) -> List[Tuple[str, str]]:
+    """
+    Checks that need only the record itself
+
+    Returns:
+        (level, message) pairs; level is "error" (blocks embedding) or "warning"
+    """
+    issues = []
+    if record["type"] == "policy":
+        if len(record["text"].splitlines()) < 2:
+            issues.append(("error", "policy section has no content"))
+        return issues
+
+    for field in REQUIRED_PRODUCT_FIELDS:
+        if not record.get(field):
+            issues.append(("error", f"missing {field}"))
+    if record.get("price_text") and not record.get("price"):
+        issues.append(("error", f"unparseable price {record['price_text']!r}"))
+    sku = record.get("sku")
+    if sku and not SKU_PATTERN.match(sku):
+        issues.append(("warning", f"SKU {sku!r} does not look like XX-NAME-000"))
+    stock = record.get("stock", "")
+    if not stock:
+        issues.append(("warning", "missing stock status"))
+    elif stock.lower() not in KNOWN_STOCK_STATUSES:
+        issues.append(("warning", f"unknown stock status {stock!r} (treated as out of stock)"))
+    if not record.get("warranty"):
+        issues.append(("warning", "missing warranty"))
+    return issues
+
+
+def issue(level: str, record: Optional[Dict], message: str) -> Dict:
+    return {
+        "level": level,
+        "record": record_key(record) if record else None,
+        "name": record.get("name") if record else None,
+        "message": message
+    }
+
+
+def validate_batch(records: List[Dict]) -> List[Dict]:
+    """Validate a batch of records (runs in a worker process)"""
+    return [issue(level, record, message) for record in records for level, message in validate_record(record)]
+
+
+class CatalogScan:
+    """
+    What one streaming pass over the catalog keeps
+
+    Counts, {record key: content hash} for diffs and manifests, product
+    names by key, and the cross-record checks (duplicate SKUs and names).
+    These grow with the number of records, but not with their text.
+    """
+
+    def __init__(self):
+        self.records = 0
+        self.products = 0
+        self.categories = set()
+        self.hashes: Dict[str, str] = {}
+        self.names: Dict[str, str] = {}
+        # SKUs of named products, in file order (verify samples from these)
+        self.skus: List[str] = []
+        self.issues: List[Dict] = []
+        self._duplicates: List[Dict] = []
+        self._seen = {"sku": set(), "name": set()}
+
+    def add(self, record: Dict):
+        key = record_key(record)
+        self.records += 1
+        self.hashes[key] = record_hash(record)
+        if record.get("name"):
+            self.names[key] = record["name"]
+        if record["type"] != "product":
+            return
+        self.products += 1
+        if record.get("category"):
+            self.categories.add(record["category"])
+        if record.get("sku") and record.get("name"):
+            self.skus.append(record["sku"])
+        for field, level in (("sku", "error"), ("name", "warning")):
+            value = record.get(field)
+            if not value:
+                continue
+            if value.lower() in self._seen[field]:
+                self._duplicates.append(issue(level, record, f"duplicate {field} {value!r}"))
+            self._seen[field].add(value.lower())
+
+    def catalog_issues(self) -> List[Dict]:
+        """Issues found across records (call after the pass)"""
+        issues = list(self._duplicates)
+        if not self.products:
+            issues.append(issue("error", None, "no products in the catalog"))
+        return issues
+
+    @property
+    def errors(self) -> int:
+        return sum(1 for found in self.issues if found["level"] == "error")
+
+    def print_summary(self):
+        print(f"✓ {self.records} records parsed")
+        print(f"  - Products: {self.products} in {len(self.categories)} categories")
+        print(f"  - Policy sections: {self.records - self.products}")
+
+
+async def scan_catalog(path: str, workers: int = INGEST_WORKERS, validate: bool = True) -> CatalogScan:
+    """
+    Parse (and validate) a catalog file in one streaming pass
+
+    Records are validated in batches of RECORD_BATCH_SIZE, in worker
+    processes for large files, with a bounded number of batches in flight.
+
+    Returns:
+        CatalogScan; .issues holds validation issues, errors first
+    """
+    scan = CatalogScan()
+    progress = Progress("records scanned")
+    pending: Deque["asyncio.Future"] = deque()
+    batch: List[Dict] = []
+
+    with worker_pool(path, workers) as pool:
+        async def drain(limit: int):
+            while len(pending) > limit:
+                scan.issues.extend(await pending.popleft())
+
+        async for record in stream_records(path, pool, lookahead=2 * max(1, workers)):
+            scan.add(record)
+            progress.advance()
+            if validate:
+                batch.append(record)
+                if len(batch) >= RECORD_BATCH_SIZE:
+                    pending.append(submit(pool, validate_batch, batch))
+                    batch = []
+                    await drain(2 * max(1, workers))
+        if validate and batch:
+            pending.append(submit(pool, validate_batch, batch))
+        await drain(0)
+    progress.finish()
+
+    if validate:
+        scan.issues.extend(scan.catalog_issues())
+        scan.issues.sort(key=lambda found: found["level"] != "error")
+    return scan
+
+
+def print_issues(issues: List[Dict], limit: int = 50) -> int:
+    """Print validation issues; returns the number of errors"""
+    errors = sum(1 for found in issues if found["level"] == "error")
+    for found in issues[:limit]:
+        where = found["name"] or found["record"] or "catalog"
+        print(f"  {'ERROR' if found['level'] == 'error' else 'Warning'}: {where}: {found['message']}")
+    if len(issues) > limit:
+        print(f"  ... and {len(issues) - limit} more")
+    mark = "✓" if not errors else "✗"
+    print(f"{mark} {errors} errors, {len(issues) - errors} warnings")
+    return errors
+
+
+# ============================================================================
+# DIFF
+# ============================================================================
+
+def manifest_path(persist_directory: str) -> str:
+    return os.path.join(persist_directory, MANIFEST_NAME)
+
+
+def load_manifest(persist_directory: str) -> Optional[Dict]:
+    """The manifest of the last ingest into persist_directory, or None"""
+    try:
+        with open(manifest_path(persist_directory), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def diff_hashes(current: Dict[str, str], previous: Dict[str, str]) -> Dict:
+    """
+    Compare {record key: content hash} of the catalog with an earlier one
+
+    Returns:
+        {"added", "removed", "changed"} lists of record keys, plus "unchanged" count
+    """
+    return {
+        "added": sorted(k for k in current if k not in previous),
+        "removed": sorted(k for k in previous if k not in current),
+        "changed": sorted(k for k in current if k in previous and current[k] != previous[k]),
+        "unchanged": sum(1 for k in current if previous.get(k) == current[k])
+    }
+
+
+async def previous_hashes(args) -> Optional[Dict[str, str]]:
+    """Record hashes to diff against: --against catalog file, else the last manifest"""
+    if getattr(args, "against", None):
+        return (await scan_catalog(args.against, args.workers, validate=False)).hashes
+    manifest = load_manifest(args.persist_directory)
+    return manifest["records"] if manifest else None
+
+
+def print_diff(diff: Optional[Dict], names: Dict[str, str], limit: int = 20):
+    if diff is None:
+        print("  - No previous ingest manifest; everything is new")
+        return
+    for change in ("added", "removed", "changed"):
+        keys = diff[change]
+        print(f"  - {change.capitalize()}: {len(keys)}")
+        for key in keys[:limit]:
+            label = names.get(key)
+            print(f"      {key}" + (f" ({label})" if label and label != key else ""))
+        if len(keys) > limit:
+            print(f"      ... and {len(keys) - limit} more")
+    print(f"  - Unchanged: {diff['unchanged']}")
+
+
+# ============================================================================
+# EMBED
+# ============================================================================
+
+def get_embedder(name: str):
+    """
+    Args:
+        name: "gemini" (embedding-001, needs GEMINI_API_KEY) or "fake"
+            (HashingEmbeddings: deterministic, offline)
+    """
+    if name == "fake":
+        from local_embeddings import HashingEmbeddings
+        return HashingEmbeddings()
+    from embed_and_store import get_embeddings
+    return get_embeddings()
+
+
+def iter_documents(catalog_path: str, strategy: str) -> Iterator:
+    """Documents to index: streamed one per record, or character chunks for the legacy strategy"""
+    if strategy == "records":
+        return iter_catalog_documents(catalog_path)
+    # Character chunks cut across records, so this strategy loads the file whole
+    from langchain_community.document_loaders import TextLoader
+    from embed_and_store import create_splitter
+    return iter(create_splitter(strategy).split_documents(TextLoader(catalog_path).load()))
+
+
+def empty_collection(persist_directory: str, name: str = COLLECTION_NAME):
+    """
+    The Chroma collection, emptied
+
+    It is recreated, so re-running never duplicates documents.
+    """
+    import chromadb
+
+    os.makedirs(persist_directory, exist_ok=True)
+    client = chromadb.PersistentClient(path=persist_directory)
+    try:
+        client.delete_collection(name)
+    except ValueError:
+        pass  # First ingest into this directory
+    return client.create_collection(name)
+
+
+def drop_collections(persist_directory: str, names: Iterable[str]):
+    """Delete collections that are no longer served (removed shards, or all shards)"""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=persist_directory)
+    for name in names:
+        try:
+            client.delete_collection(name)
+        except ValueError:
+            pass
+
+
+async def embed_documents(documents: Iterator, embeddings, collection, total: Optional[int] = None,
+                          batch_size: int = EMBED_BATCH_SIZE, concurrency: int = EMBED_CONCURRENCY,
+                          label: str = "documents embedded") -> List:
+    """
+    Embed streamed documents in batches and add them to the collection
+
+    Up to `concurrency` embedding requests are in flight; each batch is
+    written as soon as its vectors arrive, so only those batches are held
+    in memory besides the returned documents.
+
+    Returns:
+        All documents, for the BM25 index (which stores every document's
+        text, so it is the one part of an ingest that grows with the catalog)
+    """
+    loop = asyncio.get_running_loop()
+    progress = Progress(label, total)
+    indexed: List = []
+    pending: Deque[Tuple[List, "asyncio.Future"]] = deque()
+
+    async def write_oldest():
+        batch, vectors = pending.popleft()
+        vectors = await vectors
+        start = len(indexed)
+        collection.add(
+            ids=[f"doc-{start + i:05d}" for i in range(len(batch))],
+            embeddings=vectors,
+            metadatas=[doc.metadata for doc in batch],
+            documents=[doc.page_content for doc in batch]
+        )
+        indexed.extend(batch)
+        progress.advance(len(batch))
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="embed") as pool:
+        for batch in batched(documents, batch_size):
+            texts = [doc.page_content for doc in batch]
+            pending.append((batch, loop.run_in_executor(pool, embeddings.embed_documents, texts)))
+            if len(pending) >= max(1, concurrency):
+                await write_oldest()
+        while pending:
+            await write_oldest()
+    progress.finish()
+    return indexed
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    """Consecutive lists of `size` items (the last may be shorter)"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def default_index_path(persist_directory: str) -> str:
+    """BM25 index next to the vector store (BM25_INDEX_PATH for the default directory)"""
+    if os.path.normpath(persist_directory) == DEFAULT_PERSIST_DIRECTORY:
+        from bm25_index import BM25_INDEX_PATH
+        return BM25_INDEX_PATH
+    return os.path.join(persist_directory, "bm25_index.json")
+
+
+async def embed_shards(args, embeddings, reuse: bool = False) -> List[Dict]:
+    """
+    Embed every file of a catalog directory into its own collection and BM25 index
+
+    Up to --shard-workers shards are embedded at once. With reuse, a shard
+    whose file content is unchanged since the last ingest is kept as is.
+    Collections of shards whose file was removed are dropped, and
+    shards.json is written last.
+
+    Returns:
+        Shard manifest entries, with "documents" set
+    """
+    from bm25_index import BM25Index
+
+    shards = describe_shards(args.catalog)
+    if not shards:
+        raise FileNotFoundError(f"no catalog files in {args.catalog}")
+    previous = {shard["name"]: shard for shard in load_shard_manifest(args.persist_directory) or []}
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, args.shard_workers))
+    embedded = []
+
+    async def embed_one(shard: Dict):
+        old = previous.get(shard["name"])
+        if reuse and old and old["version"] == shard["version"] and old.get("collection") == shard["collection"]:
+            shard["documents"] = old["documents"]
+            print(f"  - {shard['name']}: unchanged, kept ({shard['documents']} documents)")
+            return
+        async with semaphore:
+            collection = empty_collection(args.persist_directory, shard["collection"])
+            total = shard["records"] if args.strategy == "records" else None
+            documents = await embed_documents(
+                iter_documents(os.path.join(args.catalog, shard["file"]), args.strategy), embeddings, collection,
+                total, args.batch_size, args.concurrency, label=f"{shard['name']} embedded"
+            )
+            # BM25 indexes are per shard, so only one shard's documents are held at a time per worker
+            index_path = shard_index_path(args.persist_directory, shard)
+            await loop.run_in_executor(None, lambda: BM25Index.build(documents).save(index_path))
+            shard["documents"] = len(documents)
+            embedded.append(shard["name"])
+            print(f"✓ {shard['name']}: {shard['documents']} documents → {shard['collection']}")
+
+    await asyncio.gather(*(embed_one(shard) for shard in shards))
+
+    removed = [old for name, old in previous.items() if name not in {shard["name"] for shard in shards}]
+    if removed:
+        drop_collections(args.persist_directory, [old["collection"] for old in removed])
+        print(f"  - Dropped shards of removed files: {', '.join(old['name'] for old in removed)}")
+    save_shard_manifest(args.persist_directory, shards)
+    print(f"✓ {len(shards)} shards in {args.persist_directory} ({len(embedded)} embedded)")
+    return shards
+
+
+# ============================================================================
+# COMMANDS
+# ============================================================================
+
+async def cmd_parse(args, timer: StageTimer) -> Dict:
+    with timer.stage("parse"):
+        if not args.output:
+            scan = await scan_catalog(args.catalog, args.workers, validate=False)
+        else:
+            # Written as the records stream past, one JSON object at a time
+            scan = CatalogScan()
+            with open(args.output, "w", encoding="utf-8") as f, worker_pool(args.catalog, args.workers) as pool:
+                f.write("[")
+                async for record in stream_records(args.catalog, pool, lookahead=2 * max(1, args.workers)):
+                    f.write(",\n" if scan.records else "\n")
+                    json.dump(record, f, ensure_ascii=False)
+                    scan.add(record)
+                f.write("\n]\n")
+        scan.print_summary()
+    if args.output:
+        print(f"✓ Records written to {args.output}")
+    return {"records": scan.records}
+
+
+async def cmd_validate(args, timer: StageTimer) -> Dict:
+    with timer.stage("validate"):
+        scan = await scan_catalog(args.catalog, args.workers)
+        scan.print_summary()
+        print_issues(scan.issues)
+    errors = scan.errors
+    return {"records": scan.records, "errors": errors, "warnings": len(scan.issues) - errors, "ok": errors == 0}
+
+
+async def cmd_diff(args, timer: StageTimer) -> Dict:
+    with timer.stage("parse"):
+        scan = await scan_catalog(args.catalog, args.workers, validate=False)
+        scan.print_summary()
+    with timer.stage("diff"):
+        previous = await previous_hashes(args)
+        diff = diff_hashes(scan.hashes, previous) if previous is not None else None
+        print_diff(diff, scan.names)
+    return {"diff": diff}
+
+
+async def cmd_embed(args, timer: StageTimer) -> Dict:
+    version = catalog_version(args.catalog)
+    print(f"Catalog: {args.catalog} (version {version})")
+    print(f"Embedder: {args.embedder} | Strategy: {args.strategy} | Store: {args.persist_directory}")
+
+    with timer.stage("validate"):
+        scan = await scan_catalog(args.catalog, args.workers)
+        scan.print_summary()
+        errors = print_issues(scan.issues)
+    if errors and not args.force:
+        print("\n✗ Validation failed; fix the catalog or re-run with --force")
+        return {"ok": False, "errors": errors}
+
+    with timer.stage("diff"):
+        previous = load_manifest(args.persist_directory)
+        diff = diff_hashes(scan.hashes, previous["records"]) if previous else None
+        print_diff(diff, scan.names)
+        if previous and previous.get("embedder") != args.embedder:
+            print(f"  - Embedder changes from {previous.get('embedder')} to {args.embedder}")
+
+    if args.dry_run:
+        print("\nDry run: nothing embedded or written")
+        return {"ok": True, "dry_run": True, "records": scan.records, "diff": diff}
+
+    embeddings = get_embedder(args.embedder)
+    shards = None
+    if is_sharded(args.catalog):
+        # One collection and BM25 index per catalog file, written shard by shard
+        with timer.stage("shards"):
+            reuse = bool(args.changed_only and previous and previous.get("embedder") == args.embedder
+                         and previous.get("strategy") == args.strategy)
+            shards = await embed_shards(args, embeddings, reuse)
+            count = sum(shard["documents"] for shard in shards)
+        index_path = None
+    else:
+        # Second pass over the file: documents are built, embedded and stored batch by batch
+        with timer.stage("embed"):
+            collection = empty_collection(args.persist_directory)
+            total = scan.records if args.strategy == "records" else None
+            documents = await embed_documents(iter_documents(args.catalog, args.strategy), embeddings, collection,
+                                              total, args.batch_size, args.concurrency)
+            count = collection.count()
+            print(f"✓ ChromaDB collection '{COLLECTION_NAME}' rebuilt: {count} documents ({args.strategy})")
+
+        index_path = args.index_path or default_index_path(args.persist_directory)
+        with timer.stage("bm25"):
+            from bm25_index import BM25Index
+            bm25 = BM25Index.build(documents)
+            bm25.save(index_path)
+            print(f"✓ BM25 index saved: {index_path} ({len(bm25.postings)} terms)")
+        del documents
+
+        previous_shards = load_shard_manifest(args.persist_directory)
+        if previous_shards:
+            remove_shard_manifest(args.persist_directory)
+            drop_collections(args.persist_directory, [shard["collection"] for shard in previous_shards])
+            print(f"  - {len(previous_shards)} shard collections of an earlier catalog directory dropped")
+
+    if not args.skip_policy:
+        with timer.stage("policy"):
+            from policy_answers import build_policy_answers
+            table = build_policy_answers(args.catalog)
+            print(f"✓ Policy answers saved: {len(table['intents'])} intents")
+
+    manifest = {
+        "catalog_path": args.catalog,
+        "catalog_version": version,
+        "embedder": args.embedder,
+        "strategy": args.strategy,
+        "documents": count,
+        "index_path": index_path,
+        "shards": [shard["name"] for shard in shards] if shards else None,
+        "records": scan.hashes,
+        "created_at": datetime.now().isoformat(),
+        "timings": timer.snapshot()
+    }
+    with open(manifest_path(args.persist_directory), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"\n✓ Manifest written: {manifest_path(args.persist_directory)}")
+    return {"ok": True, "documents": count, "diff": diff}
+
+
+async def cmd_verify(args, timer: StageTimer) -> Dict:
+    import chromadb
+    from bm25_index import BM25Index
+
+    failures = []
+    manifest = load_manifest(args.persist_directory)
+    if manifest is None:
+        print(f"Warning: no {MANIFEST_NAME} in {args.persist_directory} (built by embed_and_store.py?)")
+    embedder_name = args.embedder or (manifest or {}).get("embedder", "gemini")
+
+    with timer.stage("parse"):
+        scan = await scan_catalog(args.catalog, args.workers, validate=False)
+        scan.print_summary()
+
+    shards = load_shard_manifest(args.persist_directory)
+    with timer.stage("collection"):
+        client = chromadb.PersistentClient(path=args.persist_directory)
+        names = [shard["collection"] for shard in shards] if shards else [COLLECTION_NAME]
+        collections = [client.get_collection(name) for name in names]
+        count = 0
+        stored_skus = set()
+        for collection in collections:
+            documents = collection.count()
+            print(f"  - Documents in '{collection.name}': {documents}")
+            count += documents
+            stored = collection.get(include=["metadatas"])["metadatas"]
+            stored_skus.update(m.get("sku") for m in stored if m.get("sku"))
+        if manifest and count != manifest["documents"]:
+            failures.append(f"collections have {count} documents, manifest says {manifest['documents']}")
+        catalog_skus = set(scan.skus)
+        if stored_skus:
+            missing, stale = catalog_skus - stored_skus, stored_skus - catalog_skus
+            print(f"  - SKUs indexed: {len(stored_skus & catalog_skus)}/{len(catalog_skus)}")
+            if missing:
+                failures.append(f"{len(missing)} catalog SKUs not indexed (e.g. {sorted(missing)[:3]})")
+            if stale:
+                failures.append(f"{len(stale)} indexed SKUs no longer in the catalog (e.g. {sorted(stale)[:3]})")
+        if manifest and diff_hashes(scan.hashes, manifest["records"])["unchanged"] != len(scan.hashes):
+            failures.append("catalog changed since the last ingest (run: python ingest.py diff)")
+
+    with timer.stage("bm25"):
+        if shards:
+            index_paths = [shard_index_path(args.persist_directory, shard) for shard in shards]
+        else:
+            index_paths = [args.index_path or (manifest or {}).get("index_path")
+                           or default_index_path(args.persist_directory)]
+        try:
+            bm25_documents = 0
+            for index_path in index_paths:
+                bm25_documents += len(BM25Index.load(index_path).documents)
+            print(f"  - BM25 documents: {bm25_documents} ({len(index_paths)} index files)")
+            if bm25_documents != count:
+                failures.append(f"BM25 indexes have {bm25_documents} documents, collections {count}")
+        except (OSError, ValueError, KeyError) as e:
+            failures.append(f"BM25 index unreadable: {e}")
+
+    with timer.stage("retrieval"):
+        # Each sampled product's name should retrieve its own record
+        step = max(1, len(scan.skus) // args.sample) if args.sample else 1
+        sample = scan.skus[::step][:args.sample] if args.sample else scan.skus
+        embeddings = get_embedder(embedder_name)
+        loop = asyncio.get_running_loop()
+        vectors = await loop.run_in_executor(None, embeddings.embed_documents, [scan.names[sku] for sku in sample])
+        hits = 0
+        for sku, vector in zip(sample, vectors):
+            # Nearest k over all collections (every shard is searched when the category is unknown)
+            nearest = []
+            for collection in collections:
+                result = collection.query(query_embeddings=[vector], n_results=args.k,
+                                          include=["metadatas", "distances"])
+                nearest.extend(zip(result["distances"][0], result["metadatas"][0]))
+            nearest.sort(key=lambda hit: hit[0])
+            if any(m.get("sku") == sku for _, m in nearest[:args.k]):
+                hits += 1
+            elif args.verbose:
+                print(f"  - Miss: {scan.names[sku]}")
+        hit_rate = hits / len(sample) if sample else 1.0
+        print(f"  - Product name → own record in top {args.k}: {hits}/{len(sample)} ({hit_rate:.0%}, {embedder_name})")
+        if hit_rate < args.min_hit_rate:
+            failures.append(f"retrieval hit rate {hit_rate:.0%} below {args.min_hit_rate:.0%}")
+
+    print()
+    for failure in failures:
+        print(f"✗ {failure}")
+    if not failures:
+        print("✓ Indexes match the catalog")
+    return {"ok": not failures, "failures": failures, "documents": count}
+
+
+def vacuum(path: str) -> Optional[Tuple[int, int]]:
+    """VACUUM a SQLite file; returns (bytes before, bytes after), None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    before = os.path.getsize(path)
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return before, os.path.getsize(path)
+
+
+async def cmd_compact(args, timer: StageTimer) -> Dict:
+    from classification_cache import CLASSIFICATION_CACHE_PATH, ClassificationCache
+    from generation_cache import GenerationCache
+    from response_cache import ResponseCache
+
+    removed = {}
+    with timer.stage("evict"):
+        keep_version = None
+        if args.prune_versions:
+            keep_version = catalog_version(args.catalog)
+        response_cache = ResponseCache(enabled=True)
+        removed["response_cache"] = response_cache.evict(keep_version=keep_version)
+        generation_cache = GenerationCache(enabled=True)
+        removed["generation_cache"] = generation_cache.evict()
+        if os.path.exists(CLASSIFICATION_CACHE_PATH):
+            removed["classification_cache"] = ClassificationCache(version="compact").trim()
+        for name, count in removed.items():
+            print(f"  - {name}: {count} entries removed")
+
+    sizes = {}
+    with timer.stage("vacuum"):
+        paths = [response_cache.path, generation_cache.path, CLASSIFICATION_CACHE_PATH,
+                 os.path.join(args.persist_directory, "chroma.sqlite3")]
+        for path in paths:
+            result = vacuum(path)
+            if result is None:
+                continue
+            before, after = result
+            sizes[path] = {"before": before, "after": after}
+            print(f"  - {path}: {before / 1024:.0f} KB → {after / 1024:.0f} KB")
+        reclaimed = sum(s["before"] - s["after"] for s in sizes.values())
+        print(f"✓ {reclaimed / 1024:.0f} KB reclaimed")
+    return {"ok": True, "removed": removed, "sizes": sizes}
+
+
+COMMANDS = {
+    "parse": cmd_parse,
+    "validate": cmd_validate,
+    "diff": cmd_diff,
+    "embed": cmd_embed,
+    "verify": cmd_verify,
+    "compact": cmd_compact,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Catalog ingestion: parse, validate, diff, embed, verify, compact")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--catalog", default=DEFAULT_CATALOG, help="Catalog file (default: product_info.txt)")
+    common.add_argument("--persist-directory", default=DEFAULT_PERSIST_DIRECTORY, help="ChromaDB directory")
+    common.add_argument("--workers", type=int, default=INGEST_WORKERS, help="Processes for parsing and validation")
+    common.add_argument("--report", help="Write stage timings and the result as JSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    parse = sub.add_parser("parse", parents=[common], help="Parse the catalog into records")
+    parse.add_argument("--output", help="Write the records as JSON")
+
+    sub.add_parser("validate", parents=[common], help="Validate catalog records (exit 1 on errors)")
+
+    diff = sub.add_parser("diff", parents=[common], help="Records changed since the last ingest")
+    diff.add_argument("--against", help="Compare with another catalog file instead of the last ingest")
+
+    embed = sub.add_parser("embed", parents=[common], help="Embed the catalog and write all indexes")
+    embed.add_argument("--embedder", choices=["gemini", "fake"], default="gemini",
+                       help="fake = deterministic offline HashingEmbeddings (CI)")
+    embed.add_argument("--strategy", choices=["records", "character"],
+                       default=os.getenv("CHUNKING_STRATEGY", "records"))
+    embed.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Texts per embedding request")
+    embed.add_argument("--concurrency", type=int, default=EMBED_CONCURRENCY, help="Embedding requests in flight")
+    embed.add_argument("--index-path", help="BM25 index file (default: next to the vector store)")
+    embed.add_argument("--skip-policy", action="store_true", help="Do not rebuild the policy answer table")
+    embed.add_argument("--force", action="store_true", help="Embed even if validation finds errors")
+    embed.add_argument("--dry-run", action="store_true", help="Validate and diff without writing")
+    embed.add_argument("--shard-workers", type=int, default=SHARD_WORKERS,
+                       help="Shards embedded at once (catalog directories)")
+    embed.add_argument("--changed-only", action="store_true",
+                       help="Catalog directories: keep shards whose file has not changed since the last ingest")
+
+    verify = sub.add_parser("verify", parents=[common], help="Check the indexes against the catalog")
+    verify.add_argument("--embedder", choices=["gemini", "fake"], help="Default: the one recorded at ingest")
+    verify.add_argument("--index-path", help="BM25 index file (default: from the manifest)")
+    verify.add_argument("--sample", type=int, default=20, help="Products to test retrieval for (0 = all)")
+    verify.add_argument("--k", type=int, default=4, help="Results searched per product")
+    verify.add_argument("--min-hit-rate", type=float, default=0.8)
+    verify.add_argument("--verbose", action="store_true", help="List retrieval misses")
+
+    compact = sub.add_parser("compact", parents=[common], help="Evict expired cache entries and VACUUM SQLite files")
+    compact.add_argument("--prune-versions", action="store_true",
+                         help="Also drop cached responses of other catalog versions")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+
+    print("=" * 60)
+    print(f"CATALOG INGEST: {args.command.upper()}")
+    print("=" * 60)
+    timer = StageTimer()
+    result = asyncio.run(COMMANDS[args.command](args, timer))
+    timer.print_summary()
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"command": args.command, **timer.snapshot(), "result": result}, f, indent=2)
+        print(f"\n✓ Report written to {args.report}")
+    if result.get("ok") is False:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""
+Intent Classifier: Local nearest-neighbour classifier for query categories
+The classifier node only has to pick one of four labels (products,
+returns, general, unknown). Most queries are close to examples we have
+already labeled, so they are classified here in microseconds:
+
+- Queries are embedded with signed feature hashing (word unigrams and
+  bigrams plus character trigrams, so typos and plurals still overlap)
+- The embedded training examples are kept in one matrix; a category's
+  score is the mean similarity of its NEIGHBOURS_PER_CATEGORY closest
+  examples. Query vectors are sparse, so similarities are one NumPy
+  product over just the query's non-zero features
+- The softmax of the category scores is the confidence; below
+  INTENT_CONFIDENCE_THRESHOLD the classifier abstains and the LLM decides
+
+Per-category centroids were tried first: "products" covers listings,
+prices, specs and recommendations, so its centroid sits far from most of
+its own examples (78% accuracy vs 87% for neighbours, see `evaluate`).
+
+Trained from intent_training_set.json plus optional query logs; the model
+(the embedded examples and their labels) is saved next to the vector
+index and retrained automatically when the training set changes.
+
+Usage:
+    python intent_classifier.py train [--logs test_results_*.json]
+    python intent_classifier.py evaluate [--folds 5] [--llm]
+    python intent_classifier.py "Do you accept UPI?"
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+INTENT_TRAINING_SET = os.getenv("INTENT_TRAINING_SET", "intent_training_set.json")
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", os.path.join("chroma_db", "intent_model.npz"))
+
+# Minimum confidence for a local decision; less confident queries go to the LLM
+# (set above 1 to always use the LLM)
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.7"))
+
+CATEGORIES = ["products", "returns", "general", "unknown"]
+
+# Hashed feature space; large enough that collisions between common words are rare
+FEATURE_DIMENSIONS = 4096
+
+# Closest examples averaged into each category's score
+NEIGHBOURS_PER_CATEGORY = 2
+
+# Sharpness of the softmax over category scores
+SOFTMAX_SCALE = 10.0
+
+# Character n-grams are weighted down so whole words dominate
+CHAR_NGRAM_WEIGHT = 0.5
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+# ============================================================================
+# FEATURES
+# ============================================================================
+
+def _hashed(features: List[Tuple[str, float]], dimensions: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(indices, signed weights) of features; crc32 is stable across processes, so saved models stay valid"""
+    hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f, _ in features), dtype=np.uint64, count=len(features))
+    weights = np.fromiter((w for _, w in features), dtype=np.float32, count=len(features))
+    # np.bincount only takes indices castable to intp (not uint64) before NumPy 2
+    indices = ((hashes >> 1) % dimensions).astype(np.intp)
+    return indices, np.where(hashes & 1, weights, -weights)
+
+
+@lru_cache(maxsize=20000)
+def _word_features(word: str, dimensions: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashed word + character trigram features of one word (cached: vocabularies are small)"""
+    padded = f"#{word}#"
+    features = [(f"w:{word}", 1.0)]
+    features.extend((f"c:{padded[i:i + 3]}", CHAR_NGRAM_WEIGHT) for i in range(len(padded) - 2))
+    return _hashed(features, dimensions)
+
+
+def embed_queries(texts: List[str], dimensions: int = FEATURE_DIMENSIONS) -> np.ndarray:
+    """
+    L2-normalized hashed feature vectors, one row per text
+
+    Features are words, word bigrams and character trigrams (weighted by
+    CHAR_NGRAM_WEIGHT), signed-hashed into `dimensions` buckets.
+    """
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = WORD_PATTERN.findall(text.lower())
+        if not words:
+            continue
+        parts = [_word_features(w, dimensions) for w in words]
+        if len(words) > 1:
+            parts.append(_hashed([(f"b:{a} {b}", 1.0) for a, b in zip(words, words[1:])], dimensions))
+        indices = np.concatenate([p[0] for p in parts])
+        weights = np.concatenate([p[1] for p in parts])
+        matrix[row] = np.bincount(indices, weights=weights, minlength=dimensions)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+# ============================================================================
+# MODEL
+# ============================================================================
+
+class IntentClassifier:
+    """Nearest-neighbour classifier over hashed query embeddings"""
+
+    def __init__(self, examples: np.ndarray, targets: np.ndarray, labels: List[str],
+                 threshold: float = INTENT_CONFIDENCE_THRESHOLD, training_version: str = ""):
+        """
+        Args:
+            examples: Embedded training queries, one row each
+            targets: Index into labels of each example
+            labels: Category names
+            threshold: Minimum confidence for a local decision
+            training_version: training_version() of the examples
+        """
+        # Group examples by category so each category is a contiguous column range
+        order = np.argsort(targets, kind="stable")
+        self.examples = examples[order]
+        self.targets = targets[order]
+        self.labels = list(labels)
+        self.threshold = threshold
+        self.training_version = training_version
+        # Feature-major copy: a query touches only the rows of its non-zero features
+        self._by_feature = np.ascontiguousarray(self.examples.T)
+        bounds = np.searchsorted(self.targets, np.arange(len(self.labels) + 1))
+        self._ranges = list(zip(bounds[:-1], bounds[1:]))
+
+    @classmethod
+    def train(cls, queries: List[str], categories: List[str], threshold: float = INTENT_CONFIDENCE_THRESHOLD,
+              training_version: str = "") -> "IntentClassifier":
+        """Embed the labeled queries once; they are the model"""
+        labels = [c for c in CATEGORIES if c in set(categories)]
+        targets = np.array([labels.index(c) for c in categories])
+        return cls(embed_queries(queries), targets, labels, threshold, training_version)
+
+    def probabilities(self, queries: List[str]) -> np.ndarray:
+        """Softmax over category scores, shape (len(queries), len(labels))"""
+        vectors = embed_queries(queries, self.examples.shape[1])
+        features = np.flatnonzero(vectors.any(axis=0))
+        similarities = vectors[:, features] @ self._by_feature[features]
+        scores = np.empty((len(queries), len(self.labels)), dtype=np.float32)
+        for i, (start, end) in enumerate(self._ranges):
+            k = min(NEIGHBOURS_PER_CATEGORY, end - start)
+            # Top-k similarities of this category without a full sort
+            nearest = np.partition(similarities[:, start:end], end - start - k, axis=1)[:, -k:]
+            scores[:, i] = nearest.mean(axis=1)
+        scores = (scores - scores.max(axis=1, keepdims=True)) * SOFTMAX_SCALE
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_batch(self, queries: List[str]) -> List[Tuple[str, float]]:
+        """(category, confidence) for each query"""
+        probs = self.probabilities(queries)
+        best = probs.argmax(axis=1)
+        return [(self.labels[i], float(probs[row, i])) for row, i in enumerate(best)]
+
+    def predict(self, query: str) -> Tuple[Optional[str], float]:
+        """
+        Classify one query
+
+        Returns:
+            (category, confidence); category is None when the confidence is
+            below the threshold and the caller should ask the LLM
+        """
+        category, confidence = self.predict_batch([query])[0]
+        return (category if confidence >= self.threshold else None), confidence
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path, examples=self.examples, targets=self.targets, labels=np.array(self.labels),
+            training_version=np.array(self.training_version)
+        )
+
+    @classmethod
+    def load(cls, path: str, threshold: float = INTENT_CONFIDENCE_THRESHOLD) -> "IntentClassifier":
+        with np.load(path) as data:
+            return cls(data["examples"], data["targets"], data["labels"].tolist(), threshold,
+                       str(data["training_version"]))
+
+
+# ============================================================================
+# TRAINING DATA
+# ============================================================================
+
+def load_training_set(path: str = INTENT_TRAINING_SET) -> List[Dict]:
+    """Labeled examples: [{"query", "category", "source"}]"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["examples"]
+
+
+def load_logged_examples(patterns: List[str]) -> List[Dict]:
+    """
+    Labeled queries from logs: test_results_*.json (category_results) or
+    JSON-lines files with {"query", "category"} per line
+    """
+    examples = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, "r", encoding="utf-8") as f:
+                if path.endswith(".jsonl"):
+                    rows = [json.loads(line) for line in f if line.strip()]
+                else:
+                    rows = [r for results in json.load(f).get("category_results", {}).values() for r in results]
+            examples.extend(
+                {"query": r["query"], "category": r["category"], "source": path}
+                for r in rows if r.get("query") and r.get("category") in CATEGORIES
+            )
+    return examples
+
+
+def training_version(examples: List[Dict]) -> str:
+    """
+    Hash of the training set examples
+
+    A saved model built from another version of the training set is
+    retrained; logged examples added by `train --logs` do not count, so
+    such a model is kept until the training set itself changes.
+    """
+    payload = json.dumps([[e["query"], e["category"]] for e in examples], ensure_ascii=False)
+    return f"{zlib.crc32(payload.encode('utf-8')):08x}"
+
+
+def train_from_examples(examples: List[Dict], threshold: float = INTENT_CONFIDENCE_THRESHOLD,
+                        version: str = "") -> IntentClassifier:
+    """Train on deduplicated examples; later sources (logs) override the label of a query seen earlier"""
+    labeled = {e["query"].strip().lower(): e for e in examples}
+    unique = list(labeled.values())
+    return IntentClassifier.train(
+        [e["query"] for e in unique], [e["category"] for e in unique], threshold, version
+    )
+
+
+_classifier: Optional[IntentClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier(training_path: str = INTENT_TRAINING_SET,
+                          model_path: str = INTENT_MODEL_PATH) -> IntentClassifier:
+    """
+    Load the saved model, retraining (and saving) it if the training set changed
+
+    Training takes a few milliseconds, so a read-only deployment simply
+    trains in memory.
+    """
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                examples = load_training_set(training_path)
+                version = training_version(examples)
+                try:
+                    model = IntentClassifier.load(model_path)
+                except (OSError, KeyError, ValueError):
+                    model = None
+                if model is None or model.training_version != version:
+                    model = train_from_examples(examples, version=version)
+                    try:
+                        model.save(model_path)
+                    except OSError as e:
+                        print(f"Warning: could not save intent model: {e}")
+                print(f"✓ Intent classifier loaded: {len(model.labels)} categories, threshold {model.threshold}")
+                _classifier = model
+    return _classifier
+
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+def cross_validate(examples: List[Dict], folds: int, threshold: float) -> Dict:
+    """
+    k-fold accuracy, coverage (share decided locally) and latency
+
+    Returns:
+        {"accuracy_all", "coverage", "accuracy_covered", "us_per_query",
+        "confusion", "predictions"}; predictions[i] is the local decision
+        for examples[i] (None = deferred to the LLM)
+    """
+    rng = np.random.default_rng(42)
+    order = rng.permutation(len(examples))
+    decisions: List[Optional[str]] = [None] * len(examples)
+    best_guesses: List[str] = [""] * len(examples)
+    elapsed = 0.0
+    for fold in range(folds):
+        test_idx = sorted(order[fold::folds].tolist())
+        held_out = set(test_idx)
+        model = train_from_examples([e for i, e in enumerate(examples) if i not in held_out], threshold)
+        start = time.perf_counter()
+        for i in test_idx:
+            decisions[i] = model.predict(examples[i]["query"])[0]
+        elapsed += time.perf_counter() - start
+        for i, (best, _) in zip(test_idx, model.predict_batch([examples[i]["query"] for i in test_idx])):
+            best_guesses[i] = best
+
+    confusion: Dict[str, Dict[str, int]] = {c: {p: 0 for p in CATEGORIES} for c in CATEGORIES}
+    for e, best in zip(examples, best_guesses):
+        confusion[e["category"]][best] += 1
+    covered = [(e, d) for e, d in zip(examples, decisions) if d is not None]
+    n = len(examples)
+    return {
+        "accuracy_all": round(sum(e["category"] == b for e, b in zip(examples, best_guesses)) / n, 3),
+        "coverage": round(len(covered) / n, 3),
+        "accuracy_covered": round(sum(e["category"] == d for e, d in covered) / len(covered), 3) if covered else None,
+        "us_per_query": round(elapsed / n * 1e6, 1),
+        "confusion": confusion,
+        "predictions": decisions
+    }
+
+
+def evaluate_llm(examples: List[Dict]) -> Dict:
+    """
+    Accuracy and latency of the Gemini path of classifier_node
+
+    The classification and generation caches and the local classifier are
+    bypassed so every query costs a real model call.
+
+    Returns:
+        {"accuracy", "ms_per_query", "predictions"}
+    """
+    import langgraph_workflow
+    from generation_cache import get_generation_cache
+
+    langgraph_workflow.get_classification_cache().get = lambda query: None
+    langgraph_workflow.classify_locally = lambda query: None
+    get_generation_cache().enabled = False
+    predictions = []
+    start = time.perf_counter()
+    for e in examples:
+        state = {"user_query": e["query"], "category": "", "response": ""}
+        predictions.append(langgraph_workflow.classifier_node(state)["category"])
+    elapsed = time.perf_counter() - start
+    correct = sum(e["category"] == p for e, p in zip(examples, predictions))
+    return {
+        "accuracy": round(correct / len(examples), 3),
+        "ms_per_query": round(elapsed / len(examples) * 1000, 1),
+        "predictions": predictions
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and evaluate the local intent classifier")
+    sub = parser.add_subparsers(dest="command")
+    train = sub.add_parser("train", help="Train and save the model")
+    train.add_argument("--logs", nargs="*", default=[], help="Logged queries (test_results_*.json or .jsonl)")
+    evaluate = sub.add_parser("evaluate", help="Cross-validated accuracy/latency report")
+    evaluate.add_argument("--folds", type=int, default=5)
+    evaluate.add_argument("--threshold", type=float, default=INTENT_CONFIDENCE_THRESHOLD)
+    evaluate.add_argument("--logs", nargs="*", default=[], help="Logged queries to add to the examples")
+    evaluate.add_argument("--llm", action="store_true", help="Also run the current classifier_node (needs GEMINI_API_KEY)")
+    evaluate.add_argument("--report", help="Write the report to this JSON file")
+
+    if len(sys.argv) > 1 and sys.argv[1] not in ("train", "evaluate", "-h", "--help"):
+        model = get_intent_classifier()
+        query = " ".join(sys.argv[1:])
+        category, confidence = model.predict(query)
+        best = model.predict_batch([query])[0][0]
+        print(f"Category: {category or 'defer to LLM'} (best: {best}, confidence: {confidence:.2f})")
+        return
+    args = parser.parse_args()
+
+    training_set = load_training_set()
+    examples = training_set + load_logged_examples(getattr(args, "logs", []))
+    if args.command == "train":
+        model = train_from_examples(examples, version=training_version(training_set))
+        model.save(INTENT_MODEL_PATH)
+        print(f"✓ Intent model saved to {INTENT_MODEL_PATH}")
+        print(f"  - Examples: {len(examples)}")
+        print(f"  - Categories: {', '.join(model.labels)}")
+        print(f"  - Training version: {model.training_version}")
+    elif args.command == "evaluate":
+        print("=" * 70)
+        print(f"LOCAL INTENT CLASSIFIER ({args.folds}-fold cross-validation, {len(examples)} examples)")
+        print("=" * 70)
+        report = {"local": cross_validate(examples, args.folds, args.threshold), "threshold": args.threshold}
+        local = report["local"]
+        print(f"  - Accuracy (every query, best guess): {local['accuracy_all']:.1%}")
+        print(f"  - Decided locally (confidence >= {args.threshold}): {local['coverage']:.1%}")
+        print(f"  - Accuracy of local decisions: {local['accuracy_covered']:.1%}" if local["accuracy_covered"] is not None else "  - No local decisions")
+        print(f"  - Latency: {local['us_per_query']} µs/query")
+        print(f"\nConfusion (rows: expected, columns: predicted):")
+        print(f"  {'':<10}" + "".join(f"{c:>10}" for c in CATEGORIES))
+        for expected, row in local["confusion"].items():
+            print(f"  {expected:<10}" + "".join(f"{row[c]:>10}" for c in CATEGORIES))
+        if args.llm:
+            print("\n" + "=" * 70)
+            print("CURRENT classifier_node (Gemini)")
+            print("=" * 70)
+            report["llm"] = evaluate_llm(examples)
+            print(f"  - Accuracy: {report['llm']['accuracy']:.1%}")
+            print(f"  - Latency: {report['llm']['ms_per_query']} ms/query")
+            
+            # Local when confident, Gemini otherwise (what classifier_node now does)
+            hybrid = [d or l for d, l in zip(local["predictions"], report["llm"]["predictions"])]
+            correct = sum(e["category"] == p for e, p in zip(examples, hybrid))
+            llm_ms = report["llm"]["ms_per_query"] * (1 - local["coverage"]) + local["us_per_query"] / 1000
+            report["hybrid"] = {"accuracy": round(correct / len(examples), 3), "ms_per_query": round(llm_ms, 1)}
+            print("\n" + "=" * 70)
+            print("LOCAL + GEMINI FALLBACK")
+            print("=" * 70)
+            print(f"  - Accuracy: {report['hybrid']['accuracy']:.1%}")
+            print(f"  - Expected latency: {report['hybrid']['ms_per_query']} ms/query ({1 - local['coverage']:.0%} of queries call Gemini)")
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"\n✓ Report written to {args.report}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,26 @@
 """
 LangGraph Workflow: Intelligent Customer Support with Classification and Routing
 - StateGraph with multi-node workflow
+- Policy node answering company policy questions from a precomputed table
+- Off-topic gate sending clearly off-topic queries straight to escalation
 - Query classifier using Gemini (with fallback)
 - RAG responder for known queries
 - Escalation for unknown queries
 """
 
 import os
+import traceback
+from functools import lru_cache
 from dotenv import load_dotenv
-from typing import TypedDict, Literal, List, Dict, Optional
-from langgraph.graph import StateGraph, END
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
+from typing import TypedDict, Literal, List, Dict, Optional, Any
+from deadlines import DeadlineExceeded, call_with_deadline, deadline_scope
+from model_router import ModelUnavailableError
+from rule_engine import get_rule_engine
+from generation_cache import template_version
+from classification_cache import ClassificationCache
+from policy_answers import PolicyAnswers, get_policy_answers
+from off_topic import OffTopicGate
+from query_normalizer import normalize_key, rewrite_query
 
 # Load environment variables
 load_dotenv()
@@ -21,13 +30,28 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY not found in .env file")
 
-# Try to import RAG chain (optional)
-try:
-    from rag_chain import create_rag_chain
+# Cap on the classifier's share of the request deadline (seconds),
+# so retrieval + generation keep most of the budget
+CLASSIFIER_TIMEOUT = float(os.getenv("CLASSIFIER_TIMEOUT", "4"))
+
+# Whether rag_chain (Chroma, Gemini embeddings) could be imported; None until
+# first use - it is imported lazily so the API starts without loading it
+RAG_AVAILABLE = None
+
+
+def load_rag_module():
+    """Import rag_chain on first use (optional); None if it is unavailable"""
+    global RAG_AVAILABLE
+    if RAG_AVAILABLE is False:
+        return None
+    try:
+        import rag_chain
+    except Exception as e:
+        print(f"Warning: RAG chain not available: {e}")
+        RAG_AVAILABLE = False
+        return None
     RAG_AVAILABLE = True
-except Exception as e:
-    print(f"Warning: RAG chain not available: {e}")
-    RAG_AVAILABLE = False
+    return rag_chain
 
 
 # ============================================================================
@@ -40,32 +64,106 @@ class SupportState(TypedDict):
     category: str  # products, returns, general, unknown
     response: str
     conversation_history: Optional[List[Dict]]  # Previous exchanges for context
+    sources: Optional[List[Dict]]  # Documents the RAG answer was generated from
+    deadline: Optional[Any]  # deadlines.Deadline for the request (None = no limit)
+    catalog: Optional[Any]  # catalog_snapshots.CatalogSnapshot pinned for the request
+    routed_to: Optional[str]  # Set by nodes that answer directly (e.g. "policy")
+    degraded: Optional[bool]  # A fallback replaced the LLM; the answer is not cached
+    off_topic: Optional[bool]  # Set by the off-topic gate for clearly off-topic queries
 
 
 # ============================================================================
-# NODE 1: CLASSIFIER
+# NODE 0: POLICY ANSWERS
 # ============================================================================
 
-def classifier_node(state: SupportState) -> SupportState:
+def get_snapshot_policy_answers(state: SupportState) -> Optional[PolicyAnswers]:
+    """The policy answers of the request's catalog snapshot (None if it has none)"""
+    snapshot = state.get("catalog")
+    if snapshot is None:
+        return get_policy_answers()
+    return snapshot.policy_answers
+
+
+def policy_node(state: SupportState) -> SupportState:
     """
-    Classify user query into categories using Gemini (with fallback)
-    Categories: products, returns, general, unknown
+    Answer plain company policy questions (returns, warranty, support,
+    shipping, payment, ...) from the precomputed table in policy_answers.py,
+    skipping classification, retrieval and generation
     """
+    try:
+        answers = get_snapshot_policy_answers(state)
+        answer, intent = answers.match(state["user_query"]) if answers is not None else (None, None)
+    except Exception as e:
+        print(f"Policy answers unavailable: {e}")
+        answer, intent = None, None
+    
+    if answer is None:
+        return {"routed_to": None}
     
     print("\n" + "=" * 70)
-    print("NODE: CLASSIFIER")
+    print("NODE: POLICY")
     print("=" * 70)
     print(f"Query: {state['user_query']}")
+    print(f"Intent: {intent['id']} ({intent['policy']})")
     
-    # Try Gemini classification first
+    return {
+        "user_query": state["user_query"],
+        "category": intent["category"],
+        "response": answer,
+        "routed_to": "policy"
+    }
+
+
+# ============================================================================
+# NODE 0b: OFF-TOPIC GATE
+# ============================================================================
+
+@lru_cache(maxsize=1)
+def get_default_off_topic_gate() -> OffTopicGate:
+    """Gate over product_info.txt for runs without a pinned catalog snapshot"""
+    from catalog import load_catalog_records
     try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=GEMINI_API_KEY,
-            temperature=0.3
-        )
-        
-        classification_prompt = """You are a customer support classifier. Classify the following query into ONE category:
+        records = load_catalog_records(os.getenv("CATALOG_PATH", "product_info.txt"))
+    except FileNotFoundError:
+        records = []
+    return OffTopicGate(records)
+
+
+def get_off_topic_gate(state: SupportState) -> OffTopicGate:
+    """The gate of the request's catalog snapshot (its vocabulary follows reloads)"""
+    snapshot = state.get("catalog")
+    gate = getattr(snapshot, "off_topic_gate", None)
+    return gate if gate is not None else get_default_off_topic_gate()
+
+
+def off_topic_gate_node(state: SupportState) -> SupportState:
+    """
+    Send clearly off-topic queries (weather, jokes, maths, with no store
+    word in them) to escalation directly, skipping the classifier,
+    retrieval and generation
+    """
+    reason = get_off_topic_gate(state).check(state["user_query"])
+    if reason is None:
+        return {"off_topic": False}
+    
+    classifier_counters["gated"] += 1
+    print("\n" + "=" * 70)
+    print("NODE: OFF-TOPIC GATE")
+    print("=" * 70)
+    print(f"Query: {state['user_query']}")
+    print(f"Gated: {reason} → escalation")
+    
+    return {
+        "category": "unknown",
+        "off_topic": reason == "off_topic"
+    }
+
+
+# ============================================================================
+# NODE 1: CLASSIFIER
+# ============================================================================
+
+CLASSIFICATION_PROMPT = """You are a customer support classifier. Classify the following query into ONE category:
 
 Categories:
 - products: Questions about product features, specifications, pricing, availability, what products we sell
@@ -82,20 +180,122 @@ IMPORTANT:
 Query: {query}
 
 Respond with ONLY the category name (products, returns, general, or unknown). No other text."""
-        
-        prompt = PromptTemplate(
-            template=classification_prompt,
-            input_variables=["query"]
-        )
-        
-        classification_chain = prompt | llm
-        category = classification_chain.invoke({"query": state["user_query"]}).content.strip().lower()
+
+
+# Classifier model settings (also part of its generation cache keys)
+CLASSIFIER_MODEL = "gemini-2.5-flash"
+CLASSIFIER_TEMPERATURE = 0.3
+
+
+@lru_cache(maxsize=1)
+def get_classifier_chain():
+    """
+    Build the classification prompt | Gemini chain once (imports Gemini on first use)
+    
+    Not behind the generation cache: classifier_node's ClassificationCache
+    is the only cache for category decisions, so every chain call is a
+    real Gemini call. The chain returns the category text.
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import PromptTemplate
+
+    llm = ChatGoogleGenerativeAI(
+        model=CLASSIFIER_MODEL,
+        google_api_key=GEMINI_API_KEY,
+        temperature=CLASSIFIER_TEMPERATURE
+    )
+    prompt = PromptTemplate(
+        template=CLASSIFICATION_PROMPT,
+        input_variables=["query"]
+    )
+    return prompt | llm | StrOutputParser()
+
+
+@lru_cache(maxsize=1)
+def get_classification_cache() -> ClassificationCache:
+    """Category decisions keyed on normalized query text (see classification_cache.py)"""
+    version = template_version(f"{CLASSIFIER_MODEL}:{CLASSIFIER_TEMPERATURE}:{CLASSIFICATION_PROMPT}")
+    return ClassificationCache(version=version, normalize=normalize_key)
+
+
+# How each classification was decided (reported in /metrics); local_errors
+# counts queries the local classifier failed on (they went to Gemini)
+classifier_counters = {"gated": 0, "cached": 0, "local": 0, "llm": 0, "fallback": 0, "local_errors": 0}
+
+# First local classifier failure, logged once with its traceback
+_local_classifier_error: Optional[str] = None
+
+
+def classify_locally(query: str) -> Optional[str]:
+    """
+    Category from the local intent classifier (intent_classifier.py), or
+    None if it is not confident enough and the LLM should decide
+    """
+    global _local_classifier_error
+    try:
+        from intent_classifier import get_intent_classifier
+        category, confidence = get_intent_classifier().predict(query)
+    except Exception as e:
+        classifier_counters["local_errors"] += 1
+        if _local_classifier_error is None:
+            # Every query now costs a Gemini call; make that visible once, not per query
+            _local_classifier_error = f"{type(e).__name__}: {e}"
+            print(f"Warning: local intent classifier failed, classifying with Gemini: {_local_classifier_error}")
+            traceback.print_exc()
+        return None
+    if category is None:
+        print(f"Local classifier not confident ({confidence:.2f}), asking Gemini")
+    return category
+
+
+def classifier_node(state: SupportState) -> SupportState:
+    """
+    Classify user query into categories
+    Categories: products, returns, general, unknown
+    
+    Cheapest source first: classification cache, then the local intent
+    classifier when confident, then Gemini (keyword fallback on errors)
+    """
+    
+    print("\n" + "=" * 70)
+    print("NODE: CLASSIFIER")
+    print("=" * 70)
+    print(f"Query: {state['user_query']}")
+    
+    # Same (normalized) query classified before: no model call
+    cache = get_classification_cache()
+    category = cache.get(state["user_query"])
+    source = "cached"
+    if category is None:
+        # Close to labeled examples: decided locally in microseconds
+        category = classify_locally(state["user_query"])
+        source = "local"
+    if category is not None:
+        classifier_counters[source] += 1
+        print(f"Classified as: {category} ({source})")
+        return {
+            "user_query": state["user_query"],
+            "category": category,
+            "response": state.get("response", "")
+        }
+    
+    # Otherwise ask Gemini
+    try:
+        classification_chain = get_classifier_chain()
+        with deadline_scope(state.get("deadline")):
+            category = call_with_deadline(
+                classification_chain.invoke, {"query": state["user_query"]},
+                step="classifier", cap=CLASSIFIER_TIMEOUT
+            ).strip().lower()
         
         valid_categories = ["products", "returns", "general", "unknown"]
         if category not in valid_categories:
             category = "unknown"
         
         print(f"Classified as: {category}")
+        classifier_counters["llm"] += 1
+        cache.put(state["user_query"], category)
         
         return {
             "user_query": state["user_query"],
@@ -124,11 +324,13 @@ Respond with ONLY the category name (products, returns, general, or unknown). No
             category = "unknown"
         
         print(f"Fallback classified as: {category}")
+        classifier_counters["fallback"] += 1
         
         return {
             "user_query": state["user_query"],
             "category": category,
-            "response": state.get("response", "")
+            "response": state.get("response", ""),
+            "degraded": True
         }
 
 
@@ -136,6 +338,19 @@ Respond with ONLY the category name (products, returns, general, or unknown). No
 # NODE 2: RAG RESPONDER
 # ============================================================================
 
+# Initialize RAG chain once (global state)
+_rag_chain = None
+
+def get_rag_chain():
+    """Get or create RAG chain (singleton pattern)"""
+    global _rag_chain
+    if _rag_chain is None:
+        rag_module = load_rag_module()
+        if rag_module is not None:
+            _rag_chain = rag_module.create_rag_chain()
+    return _rag_chain
+
+
 def rag_responder_node(state: SupportState) -> SupportState:
     """
     Use RAG chain or concise responses to generate answers
@@ -150,23 +365,44 @@ def rag_responder_node(state: SupportState) -> SupportState:
     # REMOVED: Old hardcoded product list logic
     # Now using RAG chain for all product queries
     
-    # Expand common acronyms for better RAG retrieval
-    expanded_query = expand_acronyms(state["user_query"])
+    # Spell out acronyms, SKUs and competitor brands for better retrieval
+    snapshot = state.get("catalog")
+    if snapshot is not None:
+        expanded_query = snapshot.query_normalizer.rewrite(state["user_query"])
+    else:
+        expanded_query = rewrite_query(state["user_query"])
     if expanded_query != state["user_query"]:
         print(f"Expanded query: {expanded_query}")
     
-    # Try RAG chain
-    if RAG_AVAILABLE:
+    # Try RAG chain (skipped when the request is already out of time)
+    deadline = state.get("deadline")
+    if deadline is not None and deadline.expired:
+        print(f"Deadline exhausted after {deadline.elapsed():.1f}s, skipping RAG")
+    elif load_rag_module() is not None:
         try:
-            rag_chain = create_rag_chain()
-            response = rag_chain.invoke(expanded_query)
+            # Stay on the catalog snapshot the request started with, even if a reload swaps it
+            snapshot = state.get("catalog")
+            rag_chain = snapshot.rag_chain if snapshot is not None else get_rag_chain()
+            # Single retrieval pass: answer and its source documents together
+            # (retriever and model router are bounded by the request deadline)
+            with deadline_scope(deadline):
+                result = rag_chain.invoke(expanded_query)
+            response = result["answer"]
             print(f"Response: {response[:100]}...")
             
             return {
                 "user_query": state["user_query"],
                 "category": state["category"],
-                "response": response
+                "response": response,
+                "sources": load_rag_module().serialize_sources(result["source_documents"])
             }
+        except DeadlineExceeded as e:
+            print(f"Deadline exceeded: {e}")
+            print(f"Using fallback response...")
+        except ModelUnavailableError as e:
+            # Every model failed, is circuit-broken or missed the deadline
+            print(f"Models unavailable: {e}")
+            print(f"Using fallback response...")
         except Exception as e:
             print(f"RAG error: {e}")
             print(f"Using fallback response...")
@@ -177,218 +413,22 @@ def rag_responder_node(state: SupportState) -> SupportState:
     return {
         "user_query": state["user_query"],
         "category": state["category"],
-        "response": response
+        "response": response,
+        "degraded": True
     }
 
 
-def expand_acronyms(query: str) -> str:
-    """
-    Expand common acronyms to improve vector search retrieval
-    """
-    query_lower = query.lower()
-    
-    # Dictionary of acronyms and their expansions
-    acronym_map = {
-        ' cod ': ' Cash on Delivery (COD) ',
-        'cod?': 'Cash on Delivery?',
-        'cod ': 'Cash on Delivery ',
-        ' emi ': ' EMI Equated Monthly Installments ',
-        'emi?': 'EMI payment?',
-        ' upi ': ' UPI payment ',
-        'upi?': 'UPI payment?',
-    }
-    
-    expanded = query
-    for acronym, expansion in acronym_map.items():
-        if acronym in query_lower:
-            # Replace while preserving case
-            import re
-            pattern = re.compile(re.escape(acronym), re.IGNORECASE)
-            expanded = pattern.sub(expansion, expanded)
-            break  # Only expand first match to avoid over-expansion
-    
-    return expanded
-
-
 def get_concise_response(query: str) -> str:
     """
     Generate CONCISE, SPECIFIC responses - answer ONLY what was asked
     For YES/NO questions, answer YES or NO first, then provide details if needed
     Handles greetings, acknowledgments, and product detail requests
-    """
-    query_lower = query.lower().strip()
-    
-    # ========== GREETING MESSAGES ==========
-    greeting_responses = {
-        "hi": "Hi! How can I help you today?",
-        "hello": "Hello! What would you like to know?",
-        "hey": "Hey! How can I assist you?",
-        "greetings": "Hello! What can I help you with?",
-    }
     
-    for greeting, response in greeting_responses.items():
-        if query_lower == greeting or query_lower.startswith(greeting + " "):
-            return response
-    
-    # ========== ACKNOWLEDGMENT MESSAGES ==========
-    acknowledgment_responses = {
-        "ok": "Thank you! Hope my response was helpful. Feel free to ask if you have more questions!",
-        "okay": "Thank you! Hope my response was helpful. Feel free to ask if you have more questions!",
-        "k": "Thank you! Hope my response was helpful. Feel free to ask if you have more questions!",
-        "thanks": "You're welcome! Happy to help. Anything else?",
-        "thank you": "You're welcome! Happy to help. Anything else?",
-        "thankyou": "You're welcome! Happy to help. Anything else?",
-        "got it": "Great! Let me know if you need anything else.",
-        "understood": "Perfect! Feel free to ask any other questions.",
-    }
-    
-    for ack, response in acknowledgment_responses.items():
-        if query_lower == ack or query_lower.startswith(ack + " "):
-            return response
-    
-    # ========== PRODUCT DETAIL QUERIES ==========
-    # Pattern: "I have questions on this <product>" or "Tell me about <product>"
-    product_detail_triggers = [
-        ("smartwatch", "SmartWatch Pro X: Price ₹15,999 | Heart rate monitoring, GPS tracking, 7-day battery life, water resistant (50m) | Standard warranty: 1 year, Extended: 2 years (₹1,999)"),
-        ("earbuds", "Wireless Earbuds Elite: Price ₹7,999 | Active noise cancellation, premium sound, 20-hour battery, water resistant | Standard warranty: 1 year, Extended: 2 years (₹1,999)"),
-        ("power bank", "Power Bank Ultra: Price ₹3,499 | 30,000mAh capacity, dual USB ports, fast charging support, compact design | Standard warranty: 1 year, Extended: 2 years (₹1,999)"),
-    ]
-    
-    # Check if user is asking for product details
-    detail_triggers = ["question", "questions", "tell me", "details", "about", "info", "information", "full details"]
-    
-    if any(trigger in query_lower for trigger in detail_triggers):
-        for product_name, product_details in product_detail_triggers:
-            if product_name in query_lower:
-                return product_details
-    
-    # ========== YES/NO DETECTION ==========
-    # Check if query is a YES/NO question
-    is_yes_no_question = query.strip().endswith("?") and any(word in query_lower for word in ["can i", "can you", "do you", "does", "is", "are", "will", "have", "has", "could"])
-    
-    # ========== PRODUCT LISTING QUERIES ==========
-    if any(word in query_lower for word in ["sell", "product", "products", "catalogue", "catalog", "available", "offer"]):
-        if "list" in query_lower or "what" in query_lower or "which" in query_lower or "do you" in query_lower:
-            return "SmartWatch Pro X, Wireless Earbuds Elite, Power Bank Ultra"
-    
-    # ========== YES/NO RETURN WINDOW QUERIES ==========
-    if ("return" in query_lower or "refund" in query_lower) and ("30" in query_lower or "days" in query_lower or "can i" in query_lower or "can you" in query_lower):
-        if is_yes_no_question:
-            if "30" in query_lower:
-                return "No. The return window is 7 days, not 30 days."
-            elif "7" in query_lower:
-                return "Yes. We offer a 7-day return window."
-            else:
-                return "Yes. We offer a 7-day return window for returns and refunds."
-    
-    # ========== YES/NO WARRANTY QUERIES ==========
-    if "warranty" in query_lower and is_yes_no_question:
-        if "extended" in query_lower or "2" in query_lower:
-            return "Yes. Extended warranty (2 years) costs ₹1,999."
-        return "Yes. Standard warranty is 1 year. Extended warranty (2 years) available for ₹1,999."
-    
-    # ========== YES/NO FEATURE QUERIES ==========
-    if ("feature" in query_lower or "have" in query_lower or "support" in query_lower or "include" in query_lower) and is_yes_no_question:
-        if "smartwatch" in query_lower:
-            if "heart rate" in query_lower or "heart" in query_lower:
-                return "Yes. SmartWatch Pro X has heart rate monitoring."
-            elif "gps" in query_lower:
-                return "Yes. SmartWatch Pro X has GPS tracking."
-            elif "water" in query_lower or "waterproof" in query_lower:
-                return "Yes. Water resistant up to 50m."
-        elif "earbuds" in query_lower or "earbud" in query_lower:
-            if "noise" in query_lower or "anc" in query_lower:
-                return "Yes. Wireless Earbuds Elite have active noise cancellation."
-        elif "power bank" in query_lower or "powerbank" in query_lower:
-            if "fast" in query_lower or "charging" in query_lower:
-                return "Yes. Power Bank Ultra supports fast charging."
-    
-    # ========== YES/NO AVAILABILITY QUERIES ==========
-    if ("available" in query_lower or "stock" in query_lower or "in stock" in query_lower) and is_yes_no_question:
-        if "smartwatch" in query_lower:
-            return "Yes. SmartWatch Pro X is in stock."
-        elif "earbuds" in query_lower:
-            return "Yes. Wireless Earbuds Elite is in stock."
-        elif "power bank" in query_lower:
-            return "Yes. Power Bank Ultra is in stock."
-        else:
-            return "Yes. All products are currently in stock."
-    
-    # ========== YES/NO SHIPPING QUERIES ==========
-    if ("shipping" in query_lower or "free" in query_lower) and is_yes_no_question:
-        if "free" in query_lower:
-            return "Yes. Free shipping on orders above ₹5,000."
-        return "Yes. Shipping is available. Free on orders above ₹5,000."
-    
-    # ========== PRICE QUERIES ==========
-    if "price" in query_lower or "cost" in query_lower or "how much" in query_lower:
-        if "smartwatch" in query_lower or "smartwatch pro x" in query_lower:
-            return "₹15,999"
-        elif "earbuds" in query_lower or "earbud" in query_lower or "wireless earbuds" in query_lower:
-            return "₹7,999"
-        elif "power bank" in query_lower or "powerbank" in query_lower:
-            return "₹3,499"
-    
-    # ========== WARRANTY QUERIES ==========
-    if "warranty" in query_lower:
-        if "extended" in query_lower or "2 year" in query_lower or "two year" in query_lower:
-            return "Extended warranty (2 years) costs ₹1,999"
-        return "1 year standard warranty. Extended warranty (2 years): ₹1,999"
-    
-    # ========== BATTERY LIFE QUERIES ==========
-    if "battery" in query_lower or "battery life" in query_lower:
-        if "smartwatch" in query_lower:
-            return "7 days"
-        elif "earbuds" in query_lower or "earbud" in query_lower:
-            return "20 hours"
-        elif "power bank" in query_lower or "powerbank" in query_lower:
-            return "30,000mAh capacity"
-    
-    # ========== FEATURE QUERIES ==========
-    if "feature" in query_lower or "features" in query_lower or "what does" in query_lower or "what can" in query_lower:
-        if "smartwatch" in query_lower:
-            if "heart rate" in query_lower or "heart" in query_lower:
-                return "Heart rate monitoring"
-            elif "gps" in query_lower:
-                return "GPS tracking"
-            elif "water" in query_lower:
-                return "Water resistant up to 50m"
-            return "Heart rate monitoring, GPS tracking, 7-day battery, water resistant (50m)"
-        
-        elif "earbuds" in query_lower or "earbud" in query_lower:
-            if "noise" in query_lower:
-                return "Active noise cancellation"
-            elif "battery" in query_lower:
-                return "20-hour battery life"
-            return "Active noise cancellation, premium sound, 20-hour battery, water resistant"
-        
-        elif "power bank" in query_lower or "powerbank" in query_lower:
-            if "capacity" in query_lower:
-                return "30,000mAh"
-            elif "port" in query_lower or "charging" in query_lower:
-                return "Dual USB ports with fast charging support"
-            return "30,000mAh capacity, dual USB ports, fast charging, compact design"
-    
-    # ========== CONTACT/SUPPORT QUERIES ==========
-    if any(word in query_lower for word in ["support", "contact", "email", "phone", "reach"]):
-        if "hours" in query_lower or "available" in query_lower or "open" in query_lower:
-            return "Mon-Sat, 9AM-6PM IST"
-        if "email" in query_lower:
-            return "support@techgear.com"
-        return "Email: support@techgear.com | Hours: Mon-Sat, 9AM-6PM IST"
-    
-    # ========== RETURN/REFUND QUERIES ==========
-    if "return" in query_lower or "refund" in query_lower or "exchange" in query_lower:
-        if "window" in query_lower or "days" in query_lower:
-            return "7-day return window"
-        elif "refund" in query_lower and "days" in query_lower:
-            return "5-7 business days"
-        elif "shipping" in query_lower:
-            return "Free return shipping available"
-        return "7-day return window, free shipping, refund in 5-7 business days"
-    
-    # ========== DEFAULT ==========
-    return "Information not available. Please contact support@techgear.com"
+    Answers come from the rules in response_rules.json, templated from the
+    parsed catalog (see rule_engine.py); edits to either file are picked
+    up without a restart.
+    """
+    return get_rule_engine().respond(query)
 
 
 # ============================================================================
@@ -406,15 +446,9 @@ def escalation_node(state: SupportState) -> SupportState:
     print(f"Query: {state['user_query']}")
     print(f"Category: {state['category']} (requires escalation)")
     
-    # Check if query is completely off-topic (weather, jokes, general knowledge, etc.)
-    query_lower = state['user_query'].lower()
-    off_topic_keywords = [
-        'weather', 'joke', 'capital', 'country', 'recipe', 'news', 
-        'sports', 'movie', 'music', 'game', 'celebrity', 'politics',
-        'calculate', 'math', 'what is', 'who is', 'when is', 'where is'
-    ]
-    
-    is_off_topic = any(keyword in query_lower for keyword in off_topic_keywords)
+    # Completely off-topic (weather, jokes, general knowledge, etc.)? Already
+    # known for queries the gate sent here; checked for the classifier's ones
+    is_off_topic = state.get("off_topic") or get_off_topic_gate(state).is_off_topic(state["user_query"])
     
     if is_off_topic:
         escalation_message = """I'm a TechGear Electronics support bot. I can help with products, pricing, shipping, payments, and returns.
@@ -441,6 +475,16 @@ Or ask me about products, pricing, shipping, or returns!"""
 # CONDITIONAL ROUTING
 # ============================================================================
 
+def route_policy(state: SupportState) -> Literal["answered", "gate"]:
+    """End the run if the policy node answered, otherwise check for off-topic"""
+    return "answered" if state.get("routed_to") == "policy" else "gate"
+
+
+def route_gate(state: SupportState) -> Literal["escalation", "classifier"]:
+    """Escalate gated queries, classify the rest"""
+    return "escalation" if state.get("category") == "unknown" else "classifier"
+
+
 def route_query(state: SupportState) -> Literal["rag_responder", "escalation"]:
     """
     Route query based on classification:
@@ -470,13 +514,21 @@ def build_support_workflow():
     
     Workflow Structure:
     
-    Entry (Classifier)
+    Entry (Policy)
+         ├→ [policy question] → END
+         ↓
+    Off-Topic Gate
+         ├→ [off-topic / no catalog terms] → Escalation → END
+         ↓
+    Classifier
          ↓
     Conditional Router
          ├→ [products|returns|general] → RAG Responder → END
          └→ [unknown] → Escalation → END
     """
     
+    from langgraph.graph import StateGraph, END
+    
     print("=" * 70)
     print("Building Support Workflow")
     print("=" * 70)
@@ -486,21 +538,43 @@ def build_support_workflow():
     
     # Add nodes
     print("\n[Building] Adding nodes...")
+    workflow.add_node("policy", policy_node)
+    workflow.add_node("off_topic_gate", off_topic_gate_node)
     workflow.add_node("classifier", classifier_node)
     workflow.add_node("rag_responder", rag_responder_node)
     workflow.add_node("escalation", escalation_node)
     
+    print("  ✓ policy")
+    print("  ✓ off_topic_gate")
     print("  ✓ classifier")
     print("  ✓ rag_responder")
     print("  ✓ escalation")
     
     # Set entry point
     print("\n[Building] Setting entry point...")
-    workflow.set_entry_point("classifier")
-    print("  ✓ Entry: classifier")
+    workflow.set_entry_point("policy")
+    print("  ✓ Entry: policy")
     
-    # Add conditional routing after classifier
+    # Add conditional routing after the policy node, the gate and the classifier
     print("\n[Building] Adding conditional routing...")
+    workflow.add_conditional_edges(
+        "policy",
+        route_policy,
+        {
+            "answered": END,
+            "gate": "off_topic_gate"
+        }
+    )
+    print("  ✓ Route: policy → [END | off_topic_gate]")
+    workflow.add_conditional_edges(
+        "off_topic_gate",
+        route_gate,
+        {
+            "escalation": "escalation",
+            "classifier": "classifier"
+        }
+    )
+    print("  ✓ Route: off_topic_gate → [escalation | classifier]")
     workflow.add_conditional_edges(
         "classifier",
         route_query,
@@ -102,7 +102,7 @@ def rag_responder_node(state: SupportState) -> SupportState:
     if rag_chain:
         try:
             # Use the RAG chain with the improved prompt for concise answers
-            response = rag_chain.invoke(state['user_query'])
+            response = rag_chain.invoke(state['user_query'])["answer"]
             print(f"Response generated: {response[:80]}...")
         except Exception as e:
             print(f"Error using RAG chain: {e}")
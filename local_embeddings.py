@@ -0,0 +1,62 @@
+"""
+Local Embeddings: Deterministic, offline embedding model for evaluation and CI
+Uses feature hashing over word unigrams/bigrams - no API key or network needed
+"""
+
+import hashlib
+import math
+import re
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokenizer that keeps SKU/model tokens like 'sw-pro-x-001' intact"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings using signed feature hashing
+
+    The same text always produces the same vector (across processes and
+    machines), so indexes built with it are reproducible. Quality is far
+    below embedding-001 but good enough to compare chunking strategies
+    relative to each other.
+    """
+
+    def __init__(self, dimensions: int = 512, use_bigrams: bool = True):
+        self.dimensions = dimensions
+        self.use_bigrams = use_bigrams
+
+    def _features(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        features = list(tokens)
+        if self.use_bigrams:
+            features.extend(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        return features
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            index = value % self.dimensions
+            sign = 1.0 if (value >> 63) & 1 else -1.0
+            vector[index] += sign
+
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of documents"""
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query"""
+        return self._embed(text)
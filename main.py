@@ -4,6 +4,7 @@ Integrates with LangGraph workflow for intelligent query routing and response ge
 """
 
 import os
+import asyncio
 import logging
 from typing import Optional, List, Dict
 import difflib
@@ -11,12 +12,28 @@ from contextlib import asynccontextmanager
 from pathlib import Path
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, Header, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel, Field, ConfigDict, field_validator
-from langgraph_workflow import build_support_workflow
+from langgraph_workflow import (
+    build_support_workflow, classifier_counters, get_classification_cache, get_classifier_chain,
+    get_concise_response
+)
+from rule_engine import get_rule_engine
+from warmup import WarmUp
+from health_checks import (
+    LLM_PROBE_TTL, CachedProbe, HealthChecker, check_bm25_index, check_catalog, check_llm,
+    check_rules, check_vector_store, check_workflow
+)
+from deadlines import REQUEST_TIMEOUT, Deadline, DeadlineExceeded, RequestCancelled
+from admission import AdmissionController, AdmissionRejected
+from context_budget import prompt_token_counter
+from single_flight import SingleFlight, coalescing_key
+from catalog_snapshots import SnapshotManager
+from response_cache import ResponseCache
+from generation_cache import get_generation_cache
 import uuid
 
 # Load environment variables
@@ -36,11 +53,41 @@ logger = logging.getLogger(__name__)
 # GLOBAL STATE
 # ============================================================================
 
-# Global workflow and product list
+# Global workflow (built in the background by warm-up, see warmup.py)
 workflow_app = None
 
-# In-memory product list loaded from product_info.txt for robust extraction
-product_names: List[str] = []
+# Background initialization; /ready reports its progress
+warmup = WarmUp()
+
+# Current catalog snapshot (product names, follow-up detector, vector index, RAG chain);
+# swapped atomically by POST /admin/reload or the catalog file watcher
+catalog_manager = SnapshotManager()
+
+# Answers to context-free queries, shared by workers and filled ahead of time by prewarm_cache.py
+response_cache = ResponseCache()
+
+# Required in the X-Admin-Token header of /admin endpoints when set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def on_pinned_snapshot(check):
+    """Run a probe against the current snapshot, keeping its directory until the probe ends"""
+    with catalog_manager.pin() as snapshot:
+        return check(snapshot)
+
+
+# Dependency probes for /ready and /health/deep (results cached, see health_checks.py)
+health_checker = HealthChecker([
+    # In-memory checks: cheap enough to run on every call
+    CachedProbe("workflow", lambda: check_workflow(workflow_app), ttl=0),
+    CachedProbe("catalog", lambda: check_catalog(catalog_manager.current), ttl=0),
+    CachedProbe("vector_store", lambda: on_pinned_snapshot(check_vector_store)),
+    CachedProbe("bm25_index", lambda: on_pinned_snapshot(check_bm25_index), critical=False),
+    CachedProbe("rules", check_rules, critical=False),
+    CachedProbe("llm", lambda: check_llm(catalog_manager.current.router), ttl=LLM_PROBE_TTL, critical=False),
+])
+
+# Probes that must pass for /ready (the LLM is optional: answers fall back to rules)
+READINESS_CHECKS = ["workflow", "catalog", "vector_store"]
 
 # In-memory conversation history storage
 # Structure: {session_id: {"history": [{"query": str, "response": str, "timestamp": datetime}], "last_product": str}}
@@ -49,6 +96,18 @@ conversation_sessions: Dict[str, Dict] = {}
 # Session timeout (30 minutes)
 SESSION_TIMEOUT = timedelta(minutes=30)
 
+# Concurrency limit, wait queue and rate limits in front of the workflow
+admission_controller = AdmissionController()
+
+# Identical context-free queries in flight at the same time share one workflow run
+workflow_flights = SingleFlight()
+
+# How often a running /chat request checks whether the client disconnected
+DISCONNECT_POLL_INTERVAL = 0.25
+
+# Extra time after the request deadline for nodes to return their own fallback
+DEADLINE_GRACE = 1.0
+
 
 def clean_expired_sessions():
     """Remove expired conversation sessions"""
@@ -68,42 +127,14 @@ def clean_expired_sessions():
         logger.info(f"Cleaned {len(expired_sessions)} expired sessions")
 
 
-def load_product_names(filepath: str = "product_info.txt") -> List[str]:
-    """Load product names from the product_info.txt file into memory.
-
-    Returns a list of product names found in the file.
-    """
-    products: List[str] = []
-    try:
-        repo_root = Path(__file__).parent
-        file_path = repo_root / filepath
-        if not file_path.exists():
-            logger.warning(f"Product info file not found: {file_path}")
-            return products
-
-        with open(file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if line.lower().startswith("product:"):
-                    # Format: Product: Name
-                    parts = line.split(":", 1)
-                    if len(parts) == 2:
-                        pname = parts[1].strip()
-                        if pname:
-                            products.append(pname)
-    except Exception as e:
-        logger.error(f"Failed to load product names: {e}")
-    logger.info(f"Loaded {len(products)} product names from {filepath}")
-    return products
-
-
-def extract_product_name(query: str, answer: str) -> Optional[str]:
+def extract_product_name(query: str, answer: str, product_names: List[str] = ()) -> Optional[str]:
     """
     Extract product name from query or answer using simple pattern matching
     
     Args:
         query: User's query (potentially enhanced)
         answer: Bot's response
+        product_names: Catalog product names to match first
     
     Returns:
         Product name if detected, None otherwise
@@ -233,6 +264,16 @@ class ChatRequest(BaseModel):
     )
 
 
+class SourceDocument(BaseModel):
+    """Catalog chunk the answer was generated from"""
+    name: Optional[str] = Field(None, description="Product or policy name")
+    sku: Optional[str] = Field(None, description="Product SKU")
+    category: Optional[str] = Field(None, description="Product category")
+    price: Optional[int] = Field(None, description="Price in rupees")
+    score: Optional[float] = Field(None, description="Retrieval score (relevance or fused rank score)")
+    snippet: str = Field(..., description="Start of the chunk text")
+
+
 class ChatResponse(BaseModel):
     """Response body for chat endpoint"""
     answer: str = Field(
@@ -245,12 +286,16 @@ class ChatResponse(BaseModel):
     )
     routed_to: Optional[str] = Field(
         None,
-        description="Node that handled the query (rag_responder, escalation)"
+        description="Node that handled the query (policy, rag_responder, escalation, fallback)"
     )
     session_id: str = Field(
         ...,
         description="Session ID for maintaining conversation context"
     )
+    sources: Optional[List[SourceDocument]] = Field(
+        None,
+        description="Source documents used for the answer (RAG responses only)"
+    )
 
     model_config = ConfigDict(
         json_schema_extra={
@@ -283,29 +328,53 @@ class HealthResponse(BaseModel):
 # LIFESPAN EVENTS
 # ============================================================================
 
+def load_catalog():
+    """Load the catalog snapshot (product names for extraction and follow-up handling)"""
+    catalog_manager.load_current()
+    catalog_manager.start_watcher()
+
+
+def init_workflow():
+    """Build and compile the LangGraph workflow"""
+    global workflow_app
+    workflow_app = build_support_workflow()
+    logger.info("✓ LangGraph workflow initialized successfully")
+
+
+def load_intent_classifier():
+    """Load (or train) the local intent classifier; imports NumPy"""
+    from intent_classifier import get_intent_classifier
+    get_intent_classifier()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Context manager for FastAPI lifespan events
     Handles startup and shutdown of the workflow
+    
+    Startup does not block on initialization: the server accepts
+    connections immediately (/health) and the workflow, catalog and
+    model clients are warmed up in the background (/ready).
     """
     # STARTUP
     logger.info("Starting chatbot service...")
-    try:
-        global workflow_app
-        workflow_app = build_support_workflow()
-        logger.info("✓ LangGraph workflow initialized successfully")
-        # Load product names into memory for robust product extraction and follow-up handling
-        global product_names
-        product_names = load_product_names("product_info.txt")
-    except Exception as e:
-        logger.error(f"Failed to initialize workflow: {e}")
-        raise
+    warmup.start([
+        # (stage, function, required for readiness)
+        ("catalog", load_catalog, True),
+        ("workflow", init_workflow, True),
+        ("rules", get_rule_engine, False),
+        ("intent_classifier", load_intent_classifier, False),
+        ("response_cache", response_cache.evict, False),
+        ("classifier", get_classifier_chain, False),
+        ("rag_chain", lambda: catalog_manager.current.rag_chain, False),
+    ])
 
     yield
 
     # SHUTDOWN
     logger.info("Shutting down chatbot service...")
+    catalog_manager.stop_watcher()
     logger.info("✓ Service shutdown complete")
 
 
@@ -332,6 +401,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ============================================================================
+# DEADLINE-AWARE WORKFLOW EXECUTION
+# ============================================================================
+
+def _log_cache_store_failure(store: asyncio.Future):
+    """Done callback of a background response-cache write: nobody awaits it"""
+    if not store.cancelled() and store.exception() is not None:
+        error = store.exception()
+        logger.error(f"Response cache write failed: {type(error).__name__}: {error}")
+
+
+async def run_workflow_with_deadline(initial_state: Dict, http_request: Request, deadline: Deadline,
+                                     coalesce_key: Optional[str] = None) -> Dict:
+    """
+    Run the (blocking) workflow in a worker thread under a request deadline
+
+    - Identical concurrent queries (same coalesce_key) share one run; only
+      the first request takes an admission slot and its deadline is used,
+      and the run stores its answer in the response cache once
+    - Keeps the event loop free while the workflow runs
+    - Cancels the run's deadline once every waiting client has
+      disconnected, so in-flight retrieval/LLM waits stop early
+    - Gives up DEADLINE_GRACE seconds after the deadline if the workflow
+      hasn't returned its own fallback answer by then
+
+    Raises:
+        RequestCancelled: This request's client disconnected
+        DeadlineExceeded: Deadline passed
+        AdmissionRejected: No workflow slot available
+    """
+    async def run_admitted():
+        async with admission_controller.slot(timeout=deadline.remaining()):
+            result = await asyncio.to_thread(workflow_app.invoke, initial_state)
+        if coalesce_key is not None:
+            # In the background: SQLite may wait on another writer, waiters should not
+            store = asyncio.get_running_loop().run_in_executor(
+                None, response_cache.put, initial_state["catalog"].version, initial_state["user_query"], result
+            )
+            store.add_done_callback(_log_cache_store_failure)
+        return result
+
+    flight, coalesced = workflow_flights.join(coalesce_key, run_admitted, deadline)
+    if coalesced:
+        logger.info(f"Coalesced with in-flight identical query ({flight.waiters} waiting)")
+
+    run_deadline = flight.deadline
+    while True:
+        done, _ = await asyncio.wait({flight.task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            workflow_flights.leave(flight)
+            return flight.task.result()
+        if await http_request.is_disconnected():
+            if workflow_flights.leave(flight):
+                run_deadline.cancel("client disconnected")
+            raise RequestCancelled("client disconnected")
+        if run_deadline.elapsed() > run_deadline.timeout + DEADLINE_GRACE:
+            if workflow_flights.leave(flight):
+                run_deadline.cancel("deadline exceeded")
+            raise DeadlineExceeded(f"workflow did not finish within {run_deadline.timeout:.1f}s")
+
+
 # ============================================================================
 # ROUTES
 # ============================================================================
@@ -357,6 +487,52 @@ async def health_check():
     )
 
 
+@app.get("/ready", tags=["Health"], summary="Readiness Check")
+async def readiness_check():
+    """
+    Readiness endpoint for load balancers and orchestrators
+    
+    Unlike /health (process is up), this returns 200 only once the
+    workflow and catalog have been initialized and the workflow, catalog
+    and vector store probes pass; 503 while warming up or when one fails.
+    
+    Returns:
+        Readiness, time to ready, the status of each warm-up stage and
+        the readiness probe results
+    """
+    body = warmup.snapshot()
+    if body["ready"]:
+        report = await asyncio.to_thread(health_checker.report, READINESS_CHECKS)
+        body["ready"] = report["status"] != "unhealthy"
+        body["checks"] = report["checks"]
+    code = status.HTTP_200_OK if body["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=code, content=body)
+
+
+@app.get("/health/deep", tags=["Health"], summary="Deep Health Check")
+async def deep_health_check(refresh: bool = False):
+    """
+    Check every dependency and report its latency
+    
+    Probes the compiled workflow, catalog snapshot, Chroma collection,
+    BM25 index, response rules and the LLM (each model called directly,
+    outside the router's circuit breakers, with their circuit states).
+    Results are cached (HEALTH_CACHE_TTL, LLM_PROBE_TTL) so frequent
+    polling does not add load.
+    
+    Args:
+        refresh: Ignore cached probe results
+    
+    Returns:
+        Overall status ("healthy", "degraded" or "unhealthy" - 503),
+        per-probe status, latency and age, and warm-up progress
+    """
+    report = await asyncio.to_thread(health_checker.report, None, refresh)
+    report["warmup"] = warmup.snapshot()
+    code = status.HTTP_503_SERVICE_UNAVAILABLE if report["status"] == "unhealthy" else status.HTTP_200_OK
+    return JSONResponse(status_code=code, content=report)
+
+
 @app.post(
     "/chat",
     response_model=ChatResponse,
@@ -365,7 +541,7 @@ async def health_check():
     summary="Send Chat Query",
     description="Send a query to the chatbot and receive a response"
 )
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """
     Chat endpoint for processing user queries with conversation memory
     
@@ -373,7 +549,7 @@ async def chat(request: ChatRequest):
     1. Receive user query and optional session_id
     2. Retrieve conversation history if session exists
     3. Enhance query with context if it's a follow-up question
-    4. Pass to LangGraph workflow
+    4. Pass to LangGraph workflow under a REQUEST_TIMEOUT deadline
     5. Classifier categorizes query
     6. Route to appropriate node (RAG or Escalation)
     7. Store conversation in session
@@ -381,6 +557,7 @@ async def chat(request: ChatRequest):
     
     Args:
         request (ChatRequest): Contains user's query and optional session_id
+        http_request (Request): Raw request, used to detect client disconnects
     
     Returns:
         ChatResponse: Contains answer, session_id, and routing information
@@ -389,16 +566,34 @@ async def chat(request: ChatRequest):
         HTTPException: If workflow fails or service error occurs
     """
     
+    # Time budget for the whole request, carried through the workflow state
+    # (time spent waiting for an admission slot counts against it)
+    deadline = Deadline(REQUEST_TIMEOUT)
+    
+    # Reject over-limit clients before doing any work
+    client_ip = http_request.client.host if http_request.client else None
+    try:
+        admission_controller.check_rate_limits(client_ip, request.session_id)
+    except AdmissionRejected as e:
+        logger.warning(f"Rate limited ({client_ip}): {e.reason}")
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
+    snapshot = None
     try:
         # Clean expired sessions periodically
         clean_expired_sessions()
         
-        # Validate workflow is initialized
-        if workflow_app is None:
-            logger.error("Workflow not initialized")
+        # Validate workflow is initialized (still warming up, or a required stage failed)
+        if not warmup.ready or workflow_app is None:
+            logger.warning("Chat request before the service is ready")
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Workflow service not available"
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Service is starting up",
+                headers={"Retry-After": "1"}
             )
         
         # Get or create session ID
@@ -413,117 +608,83 @@ async def chat(request: ChatRequest):
         
         session_data = conversation_sessions[session_id]
         
+        # Pin the catalog snapshot: a reload during this request does not affect it,
+        # and its indexes stay on disk until the request releases it
+        snapshot = catalog_manager.acquire()
+        
         # Log incoming query
         logger.info(f"Processing query (session: {session_id[:8]}...): {request.query[:100]}...")
         
         # Check if query is a follow-up question (missing context)
         original_query = request.query
-        enhanced_query = request.query
-        
-        # Keywords and phrases that indicate a follow-up question
-        follow_up_indicators = [
-            # Pronouns and demonstratives
-            "this", "that", "it", "its", "them", "those", "these",
-            "that product", "this product", "the product", "same product",
-            
-            # Question starters without product names
-            "what about", "how about", "what", "how", "which", "where",
-            
-            # Product attributes (when asked alone)
-            "colour", "color", "colors", "colours",
-            "price", "cost", "pricing",
-            "warranty", "guarantee",
-            "features", "specs", "specifications",
-            "availability", "available", "in stock",
-            "size", "weight", "dimensions",
-            "battery", "battery life",
-            "shipping", "delivery",
-            "reviews", "ratings",
-            "compatible", "compatibility",
-            "return", "refund",
-        ]
-        
-        # If query seems like a follow-up and we have a last product
-        query_lower = request.query.lower().strip()
-        is_follow_up = False
-        
-        # Check for follow-up indicators
-        for indicator in follow_up_indicators:
-            if indicator in query_lower:
-                is_follow_up = True
-                break
-        
-        # Additional check: queries that start with question words and are short
-        question_starters = ["what", "how", "which", "where", "when", "does", "is", "can", "do", "tell"]
-        starts_with_question = any(query_lower.startswith(q) for q in question_starters)
-        is_short_query = len(request.query.split()) <= 8
-        
-        # If it starts with a question word and is short, it's likely a follow-up
-        if starts_with_question and is_short_query:
-            is_follow_up = True
-        
-        # IMPORTANT: If we have a last_product and query doesn't mention any product name,
-        # it's very likely a follow-up question
-        if session_data["last_product"] and not is_follow_up:
-            # Check if query contains ANY product name patterns
-            has_product_mention = False
-            product_keywords = ["smart", "watch", "laptop", "earbuds", "earbud", "power bank", 
-                              "camera", "drone", "monitor", "tablet", "speaker", "phone",
-                              "keyboard", "mouse", "charger", "gimbal", "stabilizer", "lock",
-                              "hub", "display", "tracker", "headphones", "headphone", "bluetooth",
-                              "wireless", "gaming", "fitness", "portable", "external", 
-                              "compressor", "luggage", "corrector", "wearable"]
-            for keyword in product_keywords:
-                if keyword in query_lower:
-                    has_product_mention = True
-                    break
-            # Also check against loaded product names
-            if not has_product_mention and product_names:
-                for pname in product_names:
-                    if pname.lower() in query_lower:
-                        has_product_mention = True
-                        break
-            
-            # If no product mentioned and we have history, treat as follow-up
-            if not has_product_mention and len(session_data["history"]) > 0:
-                is_follow_up = True
-                logger.info(f"Detected follow-up question (no product name in query, have history)")
-        
-        if is_follow_up and session_data["last_product"]:
-            # Check if product name is NOT already in the query
-            last_product_lower = session_data["last_product"].lower()
-            if last_product_lower not in query_lower:
-                # Enhance query with context
-                enhanced_query = f"{request.query} for {session_data['last_product']}"
-                logger.info(f"Enhanced query with context: {enhanced_query}")
+        enhanced_query = snapshot.follow_up_detector.enhance(request.query, session_data["last_product"])
+        if enhanced_query != original_query:
+            logger.info(f"Enhanced query with context: {enhanced_query}")
         
         # Prepare initial state for workflow
         initial_state = {
             "user_query": enhanced_query,
             "category": "",
             "response": "",
-            "conversation_history": session_data["history"][-3:] if session_data["history"] else []  # Last 3 exchanges
+            "conversation_history": session_data["history"][-3:] if session_data["history"] else [],  # Last 3 exchanges
+            "deadline": deadline,
+            "catalog": snapshot,
+            "routed_to": None,
+            "degraded": False,
+            "off_topic": None
         }
         
-        # Execute workflow
-        try:
-            result = workflow_app.invoke(initial_state)
-        except Exception as e:
-            logger.error(f"Workflow execution error: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to process query"
-            )
+        # Context-free queries can share a run with identical in-flight queries on the same snapshot
+        coalesce_key = None
+        if enhanced_query == original_query:
+            coalesce_key = f"{snapshot.version}:{coalescing_key(enhanced_query)}"
+        
+        # Context-free queries are answered from the response cache when possible
+        # (in a thread: a hit writes, and SQLite may wait on other writers)
+        result = None
+        if coalesce_key is not None:
+            result = await asyncio.to_thread(response_cache.get, snapshot.version, enhanced_query)
+            if result is not None:
+                logger.info(f"Response cache hit ({result['cached']})")
+        
+        if result is None:
+            # Execute workflow (at most MAX_INFLIGHT at once, others queue briefly)
+            try:
+                result = await run_workflow_with_deadline(initial_state, http_request, deadline, coalesce_key)
+            except AdmissionRejected as e:
+                logger.warning(f"Admission rejected: {e.reason}")
+                raise HTTPException(
+                    status_code=e.status_code,
+                    detail=e.reason,
+                    headers={"Retry-After": str(e.retry_after)}
+                )
+            except RequestCancelled:
+                logger.info(f"Client disconnected after {deadline.elapsed():.1f}s, request cancelled")
+                raise HTTPException(status_code=499, detail="Client closed request")
+            except DeadlineExceeded as e:
+                # Out of time: answer from the local responses instead of failing
+                logger.warning(f"Request deadline exceeded ({e}), returning degraded answer")
+                result = {
+                    "response": get_concise_response(enhanced_query),
+                    "category": "general",
+                    "routed_to": "fallback"
+                }
+            except Exception as e:
+                logger.error(f"Workflow execution error: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Failed to process query"
+                )
         
         # Extract results
         answer = result.get("response", "")
         category = result.get("category", "unknown")
         
         # Determine routing node
-        routed_to = "escalation" if category == "unknown" else "rag_responder"
+        routed_to = result.get("routed_to") or ("escalation" if category == "unknown" else "rag_responder")
         
         # Extract product name from query or answer (simple extraction)
-        detected_product = extract_product_name(enhanced_query, answer)
+        detected_product = extract_product_name(enhanced_query, answer, snapshot.product_names)
         if detected_product:
             session_data["last_product"] = detected_product
             logger.info(f"Detected product: {detected_product}")
@@ -552,7 +713,8 @@ async def chat(request: ChatRequest):
             answer=answer,
             category=category,
             routed_to=routed_to,
-            session_id=session_id
+            session_id=session_id,
+            sources=result.get("sources")
         )
     
     except HTTPException:
@@ -563,6 +725,36 @@ async def chat(request: ChatRequest):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred"
         )
+    finally:
+        if snapshot is not None:
+            catalog_manager.release(snapshot)
+
+
+@app.post("/admin/reload", status_code=status.HTTP_202_ACCEPTED, tags=["Admin"])
+async def reload_catalog(force: bool = False, x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Rebuild the catalog snapshot from product_info.txt without a restart
+    
+    The new ChromaDB and BM25 indexes are built in the background; requests
+    keep using the current snapshot until the new one is swapped in.
+    
+    Args:
+        force: Rebuild even if the catalog content has not changed
+        x_admin_token: Must match ADMIN_TOKEN when it is set
+    
+    Returns:
+        Reload status ("started", "in_progress" or "unchanged") and the
+        snapshot status
+    """
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+    try:
+        result = catalog_manager.reload(force=force)
+    except OSError as e:
+        logger.error(f"Catalog reload failed: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Catalog file not readable")
+    logger.info(f"Catalog reload {result['status']} (version {result['version']})")
+    return {**result, "catalog": catalog_manager.status()}
 
 
 @app.get("/", tags=["UI"])
@@ -634,6 +826,35 @@ async def general_exception_handler(request, exc):
 # APPLICATION INFO
 # ============================================================================
 
+@app.get("/metrics", tags=["Info"])
+async def metrics():
+    """
+    Runtime metrics
+    
+    Returns:
+        Admission control (in-flight, queue depth, rejections, queue wait
+        time percentiles), request coalescing, prompt token counters,
+        response, generation and classification cache hit ratios, how
+        classifications were decided (gated, cached, local, llm, fallback),
+        the off-topic gate's shed counters and the catalog snapshot
+
+        A scrape never loads the catalog: before warm-up, off_topic_gate is
+        None
+    """
+    snapshot = catalog_manager.live
+    return {
+        "admission": admission_controller.snapshot(),
+        "catalog": catalog_manager.status(),
+        "coalescing": workflow_flights.snapshot(),
+        "prompt_tokens": prompt_token_counter.snapshot(),
+        "response_cache": response_cache.snapshot(),
+        "generation_cache": get_generation_cache().snapshot(),
+        "classification_cache": get_classification_cache().snapshot(),
+        "classifier": dict(classifier_counters),
+        "off_topic_gate": snapshot.off_topic_gate.snapshot() if snapshot else None
+    }
+
+
 @app.get("/info", tags=["Info"])
 async def app_info():
     """
@@ -651,10 +872,30 @@ async def app_info():
                 "method": "GET",
                 "description": "Health check"
             },
+            "ready": {
+                "path": "/ready",
+                "method": "GET",
+                "description": "Readiness check (503 while warming up)"
+            },
+            "deep_health": {
+                "path": "/health/deep",
+                "method": "GET",
+                "description": "Dependency probes with latency (cached)"
+            },
             "chat": {
                 "path": "/chat",
                 "method": "POST",
                 "description": "Send chat query"
+            },
+            "metrics": {
+                "path": "/metrics",
+                "method": "GET",
+                "description": "Admission control and prompt token metrics"
+            },
+            "reload": {
+                "path": "/admin/reload",
+                "method": "POST",
+                "description": "Rebuild the catalog and vector index without a restart"
             }
         },
         "workflow": {
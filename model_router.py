@@ -0,0 +1,357 @@
+"""
+Model Router: Runtime fallback across LLMs with circuit breakers and hedging
+- Per-model circuit breakers skip a model after repeated failures/timeouts
+- Per-model latency tracking; a second model is fired ("hedged") once the
+  primary has been running longer than its p95 latency
+- Hard per-request deadline; raises ModelUnavailableError when no model
+  answers in time so callers can fall back to local responses
+
+Any object with an invoke(prompt) method can be routed, which makes the
+router easy to exercise against fake_model_server.py.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from admission import MAX_INFLIGHT
+from deadlines import CANCEL_POLL_INTERVAL, current_deadline
+
+# Hard limit for one generation, across all models and hedges (seconds)
+MODEL_TIMEOUT = float(os.getenv("MODEL_TIMEOUT", "12"))
+
+# Hedge delay used until a model has enough latency samples (seconds)
+MODEL_HEDGE_DELAY = float(os.getenv("MODEL_HEDGE_DELAY", "3"))
+
+# Latency percentile after which a hedge request is fired
+MODEL_HEDGE_PERCENTILE = float(os.getenv("MODEL_HEDGE_PERCENTILE", "95"))
+
+# Lower bound for the hedge delay, so fast models don't hedge on noise
+MIN_HEDGE_DELAY = 0.5
+
+# Samples needed before the measured percentile replaces MODEL_HEDGE_DELAY
+MIN_LATENCY_SAMPLES = 20
+
+# Consecutive failures that open a model's circuit, and how long it stays open
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+
+class ModelUnavailableError(RuntimeError):
+    """Raised when no model produced an answer before the deadline"""
+
+
+# ============================================================================
+# CIRCUIT BREAKER
+# ============================================================================
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker
+
+    - closed: requests flow; consecutive failures are counted
+    - open: requests are rejected until reset_timeout has passed
+    - half-open: a single trial request is let through; success closes
+      the circuit, failure opens it again
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow_request(self) -> bool:
+        """True if a request may be sent to this model now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+# ============================================================================
+# LATENCY TRACKING
+# ============================================================================
+
+class LatencyTracker:
+    """Rolling window of call latencies for one model"""
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile of the window, or None if empty"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, int(round(pct / 100 * len(samples))))
+        return samples[min(rank, len(samples)) - 1]
+
+
+# ============================================================================
+# ROUTER
+# ============================================================================
+
+class _Attempt:
+    """
+    One call to one model; settles exactly once (success, failure or timeout)
+
+    Latency is measured from when a worker thread starts the call, not
+    from submission, so time queued in the executor is not blamed on the
+    model (and does not trigger hedges).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.submitted = time.monotonic()
+        self.started: Optional[float] = None
+        self.settled = False
+
+    def hedge_at(self, delay: float) -> float:
+        """When to hedge this attempt; a call still queued has not used any of its delay"""
+        return (self.started if self.started is not None else time.monotonic()) + delay
+
+
+class ModelRouter:
+    """
+    Route a prompt to the first healthy model, hedging slow calls
+
+    For each request:
+    1. Call the first model whose circuit is closed (or half-open)
+    2. If it fails, immediately move on to the next model
+    3. If it is still running after its p95 latency, fire the next model
+       too and take whichever answers first
+    4. If nothing answers within `timeout`, raise ModelUnavailableError
+
+    Slow calls that lose a race keep running in the background (LLM client
+    calls cannot be interrupted) and still update that model's statistics.
+    """
+
+    def __init__(self, models: List[Tuple[str, Any]], timeout: float = MODEL_TIMEOUT,
+                 hedge_delay: float = MODEL_HEDGE_DELAY,
+                 hedge_percentile: float = MODEL_HEDGE_PERCENTILE,
+                 failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_SECONDS,
+                 max_workers: Optional[int] = None):
+        """
+        Args:
+            models: (name, model) pairs in preference order; each model
+                needs an invoke(prompt) method
+            timeout: Deadline for one request, in seconds
+            hedge_delay: Hedge delay used until latency samples exist
+            hedge_percentile: Latency percentile that triggers a hedge
+            failure_threshold: Consecutive failures that open a circuit
+            reset_timeout: Seconds an open circuit waits before a trial call
+            max_workers: Thread pool size (defaults to one thread per model for
+                each of MAX_INFLIGHT requests, plus room for abandoned losers)
+        """
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.models = list(models)
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.breakers = {name: CircuitBreaker(failure_threshold, reset_timeout) for name, _ in self.models}
+        self.latencies = {name: LatencyTracker() for name, _ in self.models}
+        # Each admitted request runs at most one attempt per model (primary,
+        # hedges, failovers); losers of a race keep their thread until they
+        # return, so a finished request can still hold len(models) - 1
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or MAX_INFLIGHT * (2 * len(self.models) - 1),
+            thread_name_prefix="model-router"
+        )
+        self._lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "hedged": 0,
+            "failovers": 0,
+            "timeouts": 0,
+            "unavailable": 0,
+            "wins": {name: 0 for name, _ in self.models},
+        }
+
+    def _count(self, key: str, model: Optional[str] = None):
+        with self._lock:
+            if model is None:
+                self.counters[key] += 1
+            else:
+                self.counters[key][model] += 1
+
+    def hedge_after(self, name: str) -> float:
+        """Seconds to wait on a model before firing a hedge request"""
+        tracker = self.latencies[name]
+        if tracker.count() < MIN_LATENCY_SAMPLES:
+            return self.hedge_delay
+        return min(max(tracker.percentile(self.hedge_percentile), MIN_HEDGE_DELAY), self.timeout)
+
+    def _settle(self, attempt: _Attempt, success: bool):
+        with self._lock:
+            if attempt.settled:
+                return
+            attempt.settled = True
+        if success:
+            self.breakers[attempt.name].record_success()
+        else:
+            self.breakers[attempt.name].record_failure()
+
+    def _call(self, attempt: _Attempt, model, prompt) -> str:
+        attempt.started = time.monotonic()
+        try:
+            result = model.invoke(prompt)
+        except Exception:
+            self.latencies[attempt.name].record(time.monotonic() - attempt.started)
+            self._settle(attempt, success=False)
+            raise
+        elapsed = time.monotonic() - attempt.started
+        self.latencies[attempt.name].record(elapsed)
+        # An answer that arrives after the deadline still counts against the model
+        self._settle(attempt, success=elapsed <= self.timeout)
+        return getattr(result, "content", result)
+
+    def invoke(self, prompt, config=None) -> str:
+        """
+        Generate an answer for a prompt
+
+        Args:
+            prompt: Prompt (PromptValue, messages or string) passed to model.invoke
+            config: Ignored; accepted so the router can sit in an LCEL chain
+
+        Returns:
+            Answer text from the first model to respond
+
+        Raises:
+            ModelUnavailableError: Every model failed, was circuit-broken or
+                missed the deadline
+        """
+        self._count("requests")
+        started = time.monotonic()
+        router_deadline = deadline = started + self.timeout
+        # A request deadline (see deadlines.py) can only shorten the budget
+        request_deadline = current_deadline()
+        if request_deadline is not None:
+            deadline = min(deadline, started + request_deadline.remaining())
+        # Circuits are checked lazily, so a half-open model's single trial
+        # slot is only taken when a call is actually sent to it
+        candidates = list(self.models)
+        pending = {}
+        errors = []
+
+        def launch() -> bool:
+            while candidates:
+                name, model = candidates.pop(0)
+                if not self.breakers[name].allow_request():
+                    errors.append(f"{name}: circuit open")
+                    continue
+                attempt = _Attempt(name)
+                pending[self._executor.submit(self._call, attempt, model, prompt)] = attempt
+                return True
+            return False
+
+        launch()
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (request_deadline is not None and request_deadline.cancelled):
+                break
+            wait_for = remaining
+            if candidates:
+                # Wait for the newest attempt's hedge point before firing the next model
+                newest = max(pending.values(), key=lambda a: a.submitted)
+                hedge_at = newest.hedge_at(self.hedge_after(newest.name))
+                wait_for = min(remaining, max(hedge_at - time.monotonic(), 0))
+            if request_deadline is not None:
+                # Wake up regularly to notice a cancelled request
+                wait_for = min(wait_for, CANCEL_POLL_INTERVAL)
+
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                attempt = pending.pop(future)
+                try:
+                    answer = future.result()
+                except Exception as e:
+                    errors.append(f"{attempt.name}: {e}")
+                    continue
+                self._count("wins", attempt.name)
+                return answer
+
+            if not candidates or time.monotonic() >= deadline:
+                continue
+            if not pending:
+                # Everything in flight failed: fail over to the next model
+                if launch():
+                    self._count("failovers")
+            elif not done and newest.started is not None and time.monotonic() >= newest.hedge_at(
+                    self.hedge_after(newest.name)):
+                # Still waiting past the hedge point: race the next model
+                if launch():
+                    self._count("hedged")
+
+        if request_deadline is not None and request_deadline.cancelled:
+            # Client went away - not the models' fault, leave their circuits alone
+            self._count("unavailable")
+            raise ModelUnavailableError(f"request {request_deadline.cancel_reason}")
+
+        if time.monotonic() >= router_deadline:
+            # The models had their full timeout: calls still running count as failures
+            for attempt in pending.values():
+                self._settle(attempt, success=False)
+        # Otherwise the request ran out of budget first; _call settles each
+        # attempt from its real elapsed time when it finishes
+        if pending:
+            self._count("timeouts")
+            errors.append(f"no answer within {deadline - started:.1f}s")
+        self._count("unavailable")
+        raise ModelUnavailableError("; ".join(errors) or "No model available")
+
+    def stats(self) -> Dict:
+        """Router counters plus per-model circuit state and latency percentiles"""
+        with self._lock:
+            snapshot = {key: (dict(value) if isinstance(value, dict) else value)
+                        for key, value in self.counters.items()}
+        snapshot["models"] = {
+            name: {
+                "circuit": self.breakers[name].state,
+                "consecutive_failures": self.breakers[name].failures,
+                "p50_seconds": self.latencies[name].percentile(50),
+                "p95_seconds": self.latencies[name].percentile(95),
+                "hedge_after_seconds": round(self.hedge_after(name), 3),
+            }
+            for name, _ in self.models
+        }
+        return snapshot
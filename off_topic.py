@@ -0,0 +1,168 @@
+"""
+Off-Topic Gate: Send clearly off-topic queries to escalation before any model call
+Weather, jokes, maths and general knowledge always end in the escalation
+node, but used to pay for a Gemini classification first. The gate sheds a
+query only when it has an off-topic keyword or arithmetic ("2+2") and no
+word the store knows.
+
+The vocabulary is every word of the catalog snapshot (product names,
+features, specs, policies) plus STORE_VOCABULARY (orders, billing,
+troubleshooting), and a word one typo away from it still counts
+("hedphones"), so a query that mentions anything we sell or support goes
+through classification. Queries with no known word at all ("asdfghjkl",
+"where is my parsel") are only counted (no_catalog_terms): a missing word
+is not evidence that the query is off-topic, so the classifier decides.
+"""
+
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from rule_engine import KeywordAutomaton
+
+# Off-topic subjects; "*" matches any word starting with the keyword
+OFF_TOPIC_KEYWORDS = [
+    "weather", "forecast", "temperature outside", "joke*", "funny", "riddle*", "recipe*", "cook*",
+    "news", "sport*", "cricket", "football", "match score", "movie*", "film*", "song*", "sing",
+    "poem*", "story", "stories", "celebrit*", "politic*", "president", "prime minister",
+    "election*", "capital of", "calculate", "math*", "translate", "horoscope", "meaning of life",
+    "girlfriend", "boyfriend", "date me", "how old are you", "your name", "who made you",
+]
+
+# Words about shopping, orders and support that are not in the catalog text
+STORE_VOCABULARY = {
+    "accessory", "accessories", "address", "agent", "alternative", "alternatives", "available",
+    "best", "bill", "billing", "brand", "budget", "bulk", "bundle", "buy", "cancel", "cancellation",
+    "card", "cart", "cash", "charge", "charges", "cheap", "cheapest", "checkout", "claim", "cod",
+    "color", "colour", "compare", "comparison", "complaint", "contact", "cost", "coupon", "customer",
+    "damaged", "deal", "deals", "defective", "deliver", "delivered", "delivery", "demo", "details",
+    "device", "devices", "discount", "discounted", "discounts", "email", "emi", "exchange",
+    "expensive", "express", "favorite", "favourite", "festive", "free", "gadget", "gadgets", "gift",
+    "guarantee", "hello", "help", "hey", "hi", "hours", "human", "install", "installation",
+    "invoice", "item", "items", "latest", "loyalty", "model", "money", "new", "offer", "offers",
+    "open", "option", "options", "order", "orders", "packaging", "pay", "payment", "payments",
+    "pick", "policy", "popular", "price", "prices", "pricing", "privacy", "product", "products",
+    "purchase", "range", "recommend", "recommendation", "refund", "refunds", "reliable",
+    "replacement", "representative", "return", "returns", "sale", "sell", "seller", "service",
+    "setup", "ship", "shipping", "shop", "similar", "sku", "specs", "status", "stock", "store",
+    "suggest", "support", "tech", "technical", "thanks", "thank", "track", "tracking", "trending",
+    "upi", "value", "warranty", "website", "wrong", "else", "more", "other", "elaborate", "okay",
+    "ok", "bye", "good", "morning", "evening", "afternoon", "everything", "anything", "something",
+    "electronics", "package", "part", "number", "located", "location", "restocking", "fee", "fees",
+    "ipad", "tablet", "laptop", "got", "understood", "sure", "great", "cool", "nice", "yes", "no",
+    # Orders and billing
+    "parcel", "courier", "shipment", "arrive", "arrived", "received", "receive", "late", "delayed",
+    "missing", "lost", "overcharged", "charged", "double", "twice", "receipt", "account", "login",
+    "password", "subscription",
+    # Troubleshooting
+    "reset", "restart", "stopped", "working", "work", "works", "broken", "broke", "repair", "fix",
+    "issue", "problem", "faulty", "connect", "pair", "pairing", "update", "turn", "manual",
+    # Electronics we may not stock; still a shopping question
+    "airpods", "headphones", "earphones", "headset", "phone", "mobile", "charger", "cable",
+    "adapter", "battery", "screen", "speaker", "camera", "watch",
+}
+
+# Words at least this long also match vocabulary words one typo away
+TYPO_MIN_LENGTH = 5
+
+# Function words; a query needs at least one other word to be judged
+STOPWORDS = {
+    "a", "about", "all", "am", "an", "and", "any", "are", "as", "at", "be", "by", "can", "could",
+    "did", "do", "does", "for", "from", "get", "give", "have", "has", "how", "i", "if", "in", "is",
+    "it", "its", "it's", "me", "my", "need", "of", "on", "or", "please", "show", "so", "tell", "that",
+    "the", "there", "this", "to", "u", "want", "was", "what", "whats", "what's", "when", "where",
+    "which", "who", "why", "will", "with", "would", "you", "your", "s", "t", "much", "many", "some",
+    "today", "now", "like", "know", "let", "us", "we", "our", "just", "really", "very",
+}
+
+ARITHMETIC = re.compile(r"\d+\s*[-+*/x×÷^]\s*\d+")
+WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def _deletions(word: str) -> List[str]:
+    """The word with one character removed, at every position"""
+    return [word[:i] + word[i + 1:] for i in range(len(word))]
+
+
+def catalog_vocabulary(records: Iterable[Dict]) -> set:
+    """Every word in the catalog records (names, features, specs, policies)"""
+    vocabulary = set()
+    for record in records:
+        vocabulary.update(WORD.findall(record.get("text", "").lower()))
+        vocabulary.update(WORD.findall(record.get("name", "").lower()))
+    return vocabulary
+
+
+class OffTopicGate:
+    """
+    Pre-classification check for queries that can only end in escalation
+
+    Build once per catalog snapshot; check() is a few set lookups per word
+    plus one Aho-Corasick scan.
+    """
+
+    def __init__(self, records: List[Dict]):
+        self._off_topic = KeywordAutomaton(OFF_TOPIC_KEYWORDS)
+        off_topic_words = {k.rstrip("*") for k in OFF_TOPIC_KEYWORDS if " " not in k}
+        # A catalog that mentions "music" or "weather resistance" must not make those on-topic
+        self.vocabulary = (catalog_vocabulary(records) | STORE_VOCABULARY) - off_topic_words - STOPWORDS
+        # Single-deletion neighbourhood of the vocabulary: one lookup finds a missing,
+        # extra or substituted letter ("headphnes", "headphoness", "headphanes")
+        self._typos = {
+            deletion for word in self.vocabulary if len(word) >= TYPO_MIN_LENGTH
+            for deletion in _deletions(word)
+        }
+        self._lock = threading.Lock()
+        self.counters = {"checked": 0, "off_topic": 0, "no_catalog_terms": 0}
+
+    def _known(self, word: str) -> bool:
+        if word in self.vocabulary:
+            return True
+        # Plurals and simple inflections of catalog words
+        for suffix in ("s", "es", "ing", "ed"):
+            if word.endswith(suffix) and word[:-len(suffix)] in self.vocabulary:
+                return True
+        # One typo away from a catalog or store word, unless it is an off-topic
+        # word itself ("weather" is one letter from "leather")
+        if len(word) >= TYPO_MIN_LENGTH - 1 and not self._off_topic.matches(word):
+            if word in self._typos:
+                return True
+            if len(word) >= TYPO_MIN_LENGTH:
+                return any(d in self.vocabulary or d in self._typos for d in _deletions(word))
+        return False
+
+    def check(self, query: str) -> Optional[str]:
+        """
+        Returns:
+            "off_topic" if the query should go straight to escalation, None
+            if it needs classification
+        """
+        text = query.lower()
+        # Numbers say nothing about the topic ("2+2" vs "PowerMax 20000")
+        words = [w for w in WORD.findall(text) if w not in STOPWORDS and not w.isdigit()]
+        reason = None
+        unknown = bool(words) and not any(self._known(w) for w in words)
+        if (unknown or not words) and self.is_off_topic(text):
+            reason = "off_topic"
+        with self._lock:
+            self.counters["checked"] += 1
+            if reason:
+                self.counters[reason] += 1
+            elif unknown:
+                # Informational: these are still classified
+                self.counters["no_catalog_terms"] += 1
+        return reason
+
+    def is_off_topic(self, query: str) -> bool:
+        """Off-topic subject (weather, jokes, maths, ...) regardless of other words"""
+        text = query.lower()
+        return bool(self._off_topic.matches(text) or ARITHMETIC.search(text))
+
+    def snapshot(self) -> Dict:
+        """Counters and the share of checked queries shed before classification"""
+        with self._lock:
+            counters = dict(self.counters)
+        shed = counters["off_topic"]
+        counters["shed"] = shed
+        counters["shed_ratio"] = round(shed / counters["checked"], 3) if counters["checked"] else None
+        return counters
@@ -0,0 +1,310 @@
+"""
+Policy Answers: Precomputed answers for company policy questions
+Return, warranty, support, shipping, payment, bulk order and installation
+questions are all answered by the fixed "COMPANY POLICIES & SUPPORT"
+section of product_info.txt, so they do not need the classifier, an
+embedding call, Chroma or Gemini.
+
+At ingest time (embed_and_store.py, or `python policy_answers.py`) each
+policy is parsed into its bullet facts and a canonical answer is rendered
+for every intent in policy_intents.json. The table is saved with the
+catalog's content hash. The API builds one PolicyAnswers per catalog
+snapshot (catalog_snapshots.py): the saved table if it matches the
+snapshot's version, otherwise rendered in memory from the parsed records.
+
+Usage:
+    python policy_answers.py                       # Rebuild chroma_db/policy_answers.json
+    python policy_answers.py "Do you offer COD?"   # Show which intent answers a query
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from catalog import catalog_mtime, catalog_version, iter_catalog_file, load_product_names
+from follow_up import FollowUpDetector
+from off_topic import STOPWORDS
+from rule_engine import KeywordAutomaton
+
+CATALOG_PATH = os.getenv("CATALOG_PATH", "product_info.txt")
+POLICY_INTENTS_PATH = os.getenv("POLICY_INTENTS_PATH", "policy_intents.json")
+POLICY_ANSWERS_PATH = os.getenv("POLICY_ANSWERS_PATH", os.path.join("chroma_db", "policy_answers.json"))
+
+# Longer questions usually combine several asks; leave them to RAG
+POLICY_MAX_WORDS = 12
+
+YES_NO_START = re.compile(r"^(?:is|are|do|does|can|could|will|would|have|has)\b", re.IGNORECASE)
+
+# Words that ask about a policy without narrowing it ("what is your return policy")
+POLICY_FILLER_WORDS = {
+    "policy", "policies", "offer", "accept", "available", "option", "provide", "allow", "possible",
+    "method", "info", "information", "detail", "techgear", "take", "under", "condition", "term",
+    "rule", "help", "estimate", "estimated", "typical", "usual",
+}
+
+CONTENT_WORD = re.compile(r"[a-z]+")
+
+
+# ============================================================================
+# INGEST: RENDER THE ANSWER TABLE
+# ============================================================================
+
+def policy_facts(records: Iterable[Dict]) -> Dict[str, List[str]]:
+    """Map each policy name to its bullet lines (without the "- ")"""
+    facts = {}
+    for record in records:
+        if record.get("type") != "policy":
+            continue
+        lines = record["text"].splitlines()[1:]
+        facts[record["name"]] = [line.lstrip("- ").strip() for line in lines if line.strip().startswith("-")]
+    return facts
+
+
+def _sentence(fact: str) -> str:
+    fact = fact.rstrip(".")
+    return fact[0].upper() + fact[1:] + "." if fact else ""
+
+
+def render_answer(bullets: List[str], selectors: List[str]) -> Optional[str]:
+    """Join the bullets containing any selector (all bullets if none) into an answer"""
+    if selectors:
+        bullets = [b for b in bullets if any(s.lower() in b.lower() for s in selectors)]
+    if not bullets:
+        return None
+    return " ".join(_sentence(b) for b in bullets)
+
+
+def _forms(word: str) -> set:
+    """The word and its likely base forms ("payments" -> "payment", "provided" -> "provide")"""
+    forms = {word}
+    if word.endswith("s") and not word.endswith("ss"):
+        forms.add(word[:-1])
+    if word.endswith(("es", "ed")):
+        forms.add(word[:-2])
+    if word.endswith("ed"):
+        forms.add(word[:-1])
+    if word.endswith("ing"):
+        forms.update((word[:-3], word[:-3] + "e"))
+    return forms
+
+
+def _word_forms(words: Iterable[str]) -> set:
+    return {form for word in words for form in _forms(word)}
+
+
+def build_answer_table(records: Iterable[Dict], intents: List[Dict], version: str) -> Dict:
+    """
+    Pre-generate the canonical answer of every intent
+
+    Intents whose policy or facts are missing from the catalog are left
+    out, so those questions fall through to the normal workflow.
+    """
+    facts = policy_facts(records)
+    table = []
+    for intent in intents:
+        answer = render_answer(facts.get(intent["policy"], []), intent.get("facts", []))
+        if answer:
+            table.append({**intent, "answer": answer})
+    return {
+        "catalog_version": version,
+        "generated_at": datetime.now().isoformat(),
+        "policies": facts,
+        "intents": table,
+    }
+
+
+def build_policy_answers(catalog_path: str = CATALOG_PATH, intents_path: str = POLICY_INTENTS_PATH,
+                         output_path: Optional[str] = POLICY_ANSWERS_PATH) -> Dict:
+    """
+    Ingest step: parse the catalog policies and save the answer table
+
+    Returns:
+        The answer table (also written to output_path unless it is None)
+    """
+    with open(intents_path, "r", encoding="utf-8") as f:
+        intents = json.load(f)["intents"]
+    table = build_answer_table(iter_catalog_file(catalog_path), intents, catalog_version(catalog_path))
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(table, f, indent=2, ensure_ascii=False)
+    return table
+
+
+# ============================================================================
+# SERVING
+# ============================================================================
+
+class PolicyAnswers:
+    """
+    Matches queries against the precomputed policy intents
+
+    Questions that name a product ("warranty on SmartWatch Pro X"), contain
+    numbers ("return within 30 days?") or are long are not answered here:
+    they need product data or a comparison the canonical answer cannot give.
+    Neither are questions with a word the intent's keywords and answer do
+    not cover ("is international shipping free?", "can I pay with PayPal?"):
+    the canonical answer would ignore the qualifier and mislead.
+    """
+
+    def __init__(self, table: Dict, product_names: List[str] = ()):
+        self.version = table.get("catalog_version")
+        self.intents = table["intents"]
+        keywords = {k for intent in self.intents for group in intent["match"] for k in group}
+        self._keywords = KeywordAutomaton(keywords)
+        self._products = FollowUpDetector(product_names)
+        # Per intent: word forms of its answer, and of its answer plus keywords (prefixes for "word*")
+        self._answer_words = {}
+        self._covered_words = {}
+        self._covered_prefixes = {}
+        for intent in self.intents:
+            answer_words = _word_forms(CONTENT_WORD.findall(intent["answer"].lower()))
+            keyword_words = _word_forms(
+                w for group in intent["match"] for k in group if not k.endswith("*")
+                for w in CONTENT_WORD.findall(k.lower())
+            )
+            self._answer_words[intent["id"]] = answer_words
+            self._covered_words[intent["id"]] = answer_words | keyword_words
+            self._covered_prefixes[intent["id"]] = tuple(
+                k[:-1].lower() for group in intent["match"] for k in group if k.endswith("*")
+            )
+
+    def _uncovered(self, words: List[str], intent: Dict, answer_only: bool = False) -> List[str]:
+        """Content words of the query the intent does not speak to"""
+        if answer_only:
+            return [w for w in words if not _forms(w) & self._answer_words[intent["id"]]]
+        covered = self._covered_words[intent["id"]]
+        prefixes = self._covered_prefixes[intent["id"]]
+        return [w for w in words if not _forms(w) & covered and not w.startswith(prefixes)]
+
+    def match(self, query: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        Find the policy intent for a query
+
+        Returns:
+            (answer, intent) or (None, None) if the query is not a plain
+            policy question
+        """
+        text = query.strip()
+        if not text or len(text.split()) > POLICY_MAX_WORDS or re.search(r"\d", text):
+            return None, None
+        if self._products.score(text)["product_mentioned"]:
+            return None, None
+
+        matched = self._keywords.matches(text.lower())
+        words = [
+            w for w in CONTENT_WORD.findall(text.lower())
+            if w not in STOPWORDS and not _forms(w) & POLICY_FILLER_WORDS
+        ]
+        for intent in self.intents:
+            if not all(any(k in matched for k in group) for group in intent["match"]):
+                continue
+            if self._uncovered(words, intent):
+                # A broader intent later in the list may cover it; otherwise RAG answers
+                continue
+            answer = intent["answer"]
+            # "Yes." only when the answer itself states everything that was asked
+            if intent.get("affirmative") and YES_NO_START.match(text) and not self._uncovered(words, intent, answer_only=True):
+                answer = "Yes. " + answer
+            return answer, intent
+        return None, None
+
+
+_answers: Optional[PolicyAnswers] = None
+_answers_mtimes: Tuple[float, float] = (0.0, 0.0)
+_answers_lock = threading.Lock()
+
+
+def _mtime(path: str) -> float:
+    try:
+        return catalog_mtime(path)
+    except OSError:
+        return 0.0
+
+
+def _saved_table(version: str, intents_path: str, answers_path: str) -> Optional[Dict]:
+    """Saved table if it was built from this catalog version and the current intents"""
+    try:
+        with open(answers_path, "r", encoding="utf-8") as f:
+            table = json.load(f)
+        if table.get("catalog_version") == version and _mtime(answers_path) >= _mtime(intents_path):
+            return table
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _load_table(catalog_path: str, intents_path: str, answers_path: str) -> Dict:
+    """Saved table if it was built from the current catalog, otherwise rebuild it"""
+    version = catalog_version(catalog_path)
+    table = _saved_table(version, intents_path, answers_path)
+    if table is not None:
+        return table
+    print(f"Policy answers out of date for catalog {version}, rebuilding...")
+    try:
+        return build_policy_answers(catalog_path, intents_path, answers_path)
+    except OSError:
+        # Read-only deployment: serve the rebuilt table from memory
+        return build_policy_answers(catalog_path, intents_path, None)
+
+
+def load_policy_answers(records: List[Dict], version: str, product_names: List[str],
+                        intents_path: str = POLICY_INTENTS_PATH,
+                        answers_path: str = POLICY_ANSWERS_PATH) -> PolicyAnswers:
+    """
+    Policy answers for one catalog snapshot
+
+    Uses the saved table if it was built from this version, otherwise
+    renders it from the snapshot's records in memory (nothing is re-read
+    or hashed).
+    """
+    table = _saved_table(version, intents_path, answers_path)
+    if table is None:
+        with open(intents_path, "r", encoding="utf-8") as f:
+            intents = json.load(f)["intents"]
+        table = build_answer_table(records, intents, version)
+    return PolicyAnswers(table, product_names)
+
+
+def get_policy_answers(catalog_path: str = CATALOG_PATH, intents_path: str = POLICY_INTENTS_PATH,
+                       answers_path: str = POLICY_ANSWERS_PATH) -> PolicyAnswers:
+    """
+    Get the policy answer table of the catalog file, refreshing it if the
+    catalog or intents changed (CLI and runs without a catalog snapshot)
+
+    A failed refresh keeps the previous table in service.
+    """
+    global _answers, _answers_mtimes
+    mtimes = (_mtime(catalog_path), _mtime(intents_path))
+    if _answers is not None and mtimes == _answers_mtimes:
+        return _answers
+
+    with _answers_lock:
+        if _answers is None or mtimes != _answers_mtimes:
+            try:
+                product_names = load_product_names(catalog_path)
+                _answers = PolicyAnswers(_load_table(catalog_path, intents_path, answers_path), product_names)
+                print(f"✓ Policy answers loaded: {len(_answers.intents)} intents (catalog {_answers.version})")
+            except (OSError, ValueError, KeyError) as e:
+                if _answers is None:
+                    raise
+                print(f"Warning: keeping previous policy answers, reload failed: {e}")
+            _answers_mtimes = mtimes
+    return _answers
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        answer, intent = get_policy_answers().match(" ".join(sys.argv[1:]))
+        print(f"Intent: {intent['id'] if intent else None}")
+        print(f"Answer: {answer}")
+    else:
+        table = build_policy_answers()
+        print(f"✓ Policy answers saved to {POLICY_ANSWERS_PATH}")
+        print(f"  - Catalog version: {table['catalog_version']}")
+        print(f"  - Policies: {len(table['policies'])}")
+        print(f"  - Intents answered: {len(table['intents'])}")
@@ -0,0 +1,252 @@
+"""
+Cache Pre-warming: Answer known top queries before a replica takes traffic
+Runs the queries we already know customers ask (test_queries.json,
+ALL_TEST_QUESTIONS.md, past test_results_*.json) through the workflow in
+bulk and stores the answers in the response cache under the current
+catalog version. Run it at deploy time, after embed_and_store.py, so a
+fresh replica answers the head of the query distribution without any
+Gemini calls.
+
+Concurrency and request rate are bounded to stay within the API quota;
+queries already cached for this catalog version are skipped, so re-runs
+only fill gaps.
+
+Usage:
+    python prewarm_cache.py
+    python prewarm_cache.py --concurrency 4 --rate 2 --limit 200
+    python prewarm_cache.py --dry-run              # List the queries only
+    python prewarm_cache.py --force --prune        # Regenerate all, drop other catalog versions
+"""
+
+import argparse
+import glob
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+
+from admission import TokenBucket
+from deadlines import REQUEST_TIMEOUT, Deadline
+from response_cache import ResponseCache, is_cacheable
+from single_flight import coalescing_key
+
+DEFAULT_SOURCES = ["test_queries.json", "ALL_TEST_QUESTIONS.md", "test_results_*.json"]
+
+# Numbered, quoted questions in the markdown question bank: 1. "What smartwatches do you have?"
+MARKDOWN_QUESTION = re.compile(r'^\s*\d+\.\s+"(.+)"\s*$')
+
+
+# ============================================================================
+# QUERY SOURCES
+# ============================================================================
+
+def queries_from_json(path: str) -> List[str]:
+    """Every "queries" list and "query" field in a JSON file (test_queries.json, test results)"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    found = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "queries" and isinstance(value, list):
+                    found.extend(q for q in value if isinstance(q, str))
+                elif key == "query" and isinstance(value, str):
+                    found.append(value)
+                else:
+                    walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(data)
+    return found
+
+
+def queries_from_markdown(path: str) -> List[str]:
+    """Numbered, quoted questions from a markdown question bank"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [m.group(1) for m in map(MARKDOWN_QUESTION.match, f) if m]
+
+
+def collect_queries(patterns: List[str]) -> List[Dict]:
+    """
+    Load and deduplicate queries from all sources
+
+    Queries are deduplicated by their cache key; ones that appear in more
+    sources are more common and come first.
+
+    Returns:
+        [{"query", "count", "sources"}] most frequent first
+    """
+    queries: Dict[str, Dict] = {}
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            loader = queries_from_markdown if path.endswith(".md") else queries_from_json
+            try:
+                found = loader(path)
+            except (OSError, ValueError) as e:
+                print(f"Warning: skipping {path}: {e}")
+                continue
+            print(f"  - {path}: {len(found)} queries")
+            for query in found:
+                query = query.strip()
+                if not query:
+                    continue
+                entry = queries.setdefault(coalescing_key(query), {"query": query, "count": 0, "sources": []})
+                entry["count"] += 1
+                if path not in entry["sources"]:
+                    entry["sources"].append(path)
+    # Stable sort keeps first-seen order among equally common queries
+    return sorted(queries.values(), key=lambda e: e["count"], reverse=True)
+
+
+# ============================================================================
+# PRE-WARMING
+# ============================================================================
+
+class RateGate:
+    """Blocking wrapper around TokenBucket for worker threads"""
+
+    def __init__(self, rate: float):
+        self.bucket = TokenBucket(rate, capacity=max(1, int(rate))) if rate > 0 else None
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.bucket is None:
+            return
+        while True:
+            with self._lock:
+                acquired, retry_after = self.bucket.try_acquire()
+            if acquired:
+                return
+            time.sleep(retry_after)
+
+
+def prewarm(queries: List[Dict], cache: ResponseCache, concurrency: int, rate: float,
+            timeout: float, force: bool) -> Dict:
+    """
+    Run queries through the workflow and store the answers
+
+    Args:
+        queries: Output of collect_queries()
+        cache: Response cache to fill
+        concurrency: Workflow runs in parallel
+        rate: Max workflow runs started per second (0 = unlimited)
+        timeout: Per-query deadline in seconds
+        force: Regenerate queries that are already cached
+
+    Returns:
+        Counts per outcome (stored, cached, uncacheable, failed) and timing
+    """
+    from catalog_snapshots import SnapshotManager
+    from langgraph_workflow import build_support_workflow
+
+    manager = SnapshotManager()
+    snapshot = manager.load_current()
+    workflow = build_support_workflow()
+    print(f"\n✓ Catalog version: {snapshot.version}")
+
+    counts = {"stored": 0, "cached": 0, "uncacheable": 0, "failed": 0}
+    todo = []
+    for entry in queries:
+        if not force and cache.contains(snapshot.version, entry["query"]):
+            counts["cached"] += 1
+        else:
+            todo.append(entry)
+    print(f"✓ {len(todo)} queries to run ({counts['cached']} already cached)")
+
+    gate = RateGate(rate)
+    lock = threading.Lock()
+    latencies = []
+
+    def run(entry: Dict) -> str:
+        gate.wait()
+        start = time.perf_counter()
+        result = workflow.invoke({
+            "user_query": entry["query"],
+            "category": "",
+            "response": "",
+            "conversation_history": [],
+            "deadline": Deadline(timeout),
+            "catalog": snapshot,
+            "routed_to": None,
+            "degraded": False,
+            "off_topic": None
+        })
+        with lock:
+            latencies.append(time.perf_counter() - start)
+        if not is_cacheable(result):
+            return "uncacheable"
+        return "stored" if cache.put(snapshot.version, entry["query"], result, source="prewarm") else "failed"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="prewarm") as pool:
+        futures = {pool.submit(run, entry): entry for entry in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            entry = futures[future]
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = "failed"
+                print(f"Warning: '{entry['query'][:60]}' failed: {e}")
+            counts[outcome] += 1
+            print(f"  [{done}/{len(todo)}] {outcome:<11} {entry['query'][:70]}")
+
+    counts["seconds"] = round(time.perf_counter() - start, 2)
+    counts["avg_query_seconds"] = round(sum(latencies) / len(latencies), 2) if latencies else None
+    counts["catalog_version"] = snapshot.version
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm the response cache with known top queries")
+    parser.add_argument("--sources", nargs="+", default=DEFAULT_SOURCES,
+                        help="Query files or glob patterns (.json or .md)")
+    parser.add_argument("--limit", type=int, help="Only the N most common queries")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel workflow runs (default: 4)")
+    parser.add_argument("--rate", type=float, default=2.0, help="Max queries started per second (0 = unlimited)")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Per-query deadline in seconds")
+    parser.add_argument("--force", action="store_true", help="Regenerate queries that are already cached")
+    parser.add_argument("--prune", action="store_true", help="Drop cached answers of other catalog versions")
+    parser.add_argument("--dry-run", action="store_true", help="List the queries without running them")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("RESPONSE CACHE PRE-WARM")
+    print("=" * 70)
+    print("\n[Step 1] Collecting queries...")
+    queries = collect_queries(args.sources)
+    if args.limit:
+        queries = queries[:args.limit]
+    print(f"✓ {len(queries)} unique queries")
+
+    if args.dry_run:
+        for entry in queries:
+            print(f"  {entry['count']:>3}x  {entry['query']}")
+        return
+
+    print("\n[Step 2] Running workflow...")
+    cache = ResponseCache(enabled=True)
+    counts = prewarm(queries, cache, args.concurrency, args.rate, args.timeout, args.force)
+
+    if args.prune:
+        removed = cache.evict(keep_version=counts["catalog_version"])
+        print(f"\n✓ Pruned {removed} entries of other catalog versions")
+
+    print("\n" + "=" * 70)
+    print("SUMMARY")
+    print("=" * 70)
+    print(f"  - Stored: {counts['stored']}")
+    print(f"  - Already cached: {counts['cached']}")
+    print(f"  - Not cacheable (degraded answers): {counts['uncacheable']}")
+    print(f"  - Failed: {counts['failed']}")
+    print(f"  - Total time: {counts['seconds']}s (avg {counts['avg_query_seconds']}s per query)")
+    print(f"  - Cache: {cache.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Startup Profiler: Measure import cost and time to ready for the API
+- Import profile of `import main` from Python's -X importtime output
+  (slowest modules by cumulative and self time)
+- Optionally starts the server and times the first 200 from /health
+  (accepting traffic) and /ready (warm-up finished)
+
+Usage:
+    python profile_startup.py
+    python profile_startup.py --module langgraph_workflow --top 30
+    python profile_startup.py --serve --port 8010
+    python profile_startup.py --serve --report startup_profile.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+
+# ============================================================================
+# IMPORT PROFILE
+# ============================================================================
+
+def profile_imports(module: str) -> Dict:
+    """
+    Import a module in a fresh interpreter with -X importtime
+
+    Returns:
+        Dict with wall-clock seconds and one entry per imported module:
+        {"module", "self_us", "cumulative_us", "depth"}
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=os.environ.copy()
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"import {module} failed:\n" + "\n".join(errors[-10:]))
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            # Nesting is shown as two spaces per level
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2
+        })
+    return {"module": module, "wall_seconds": round(wall, 3), "imports": entries}
+
+
+def top_level_packages(entries: List[Dict]) -> List[Dict]:
+    """Cumulative import time per top-level package (first import only)"""
+    totals: Dict[str, int] = {}
+    for entry in entries:
+        if entry["depth"] == 0:
+            package = entry["module"].split(".")[0]
+            totals[package] = totals.get(package, 0) + entry["cumulative_us"]
+    return [{"package": p, "cumulative_us": us} for p, us in sorted(totals.items(), key=lambda i: i[1], reverse=True)]
+
+
+# ============================================================================
+# TIME TO READY
+# ============================================================================
+
+def _status(url: str) -> Optional[int]:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return None
+
+
+def measure_time_to_ready(port: int, timeout: float) -> Dict:
+    """
+    Start uvicorn and poll /health and /ready until both return 200
+
+    Returns:
+        Seconds from process start to the first 200 of each endpoint
+        (None if not reached within timeout) and the final /ready body
+    """
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    result = {"health_seconds": None, "ready_seconds": None, "ready": None}
+    try:
+        while time.perf_counter() - start < timeout:
+            if result["health_seconds"] is None and _status(f"{base}/health") == 200:
+                result["health_seconds"] = round(time.perf_counter() - start, 3)
+            if result["health_seconds"] is not None and _status(f"{base}/ready") == 200:
+                result["ready_seconds"] = round(time.perf_counter() - start, 3)
+                break
+            time.sleep(0.05)
+        try:
+            with urllib.request.urlopen(f"{base}/ready", timeout=1) as response:
+                result["ready"] = json.load(response)
+        except urllib.error.HTTPError as e:
+            result["ready"] = json.load(e)
+        except (urllib.error.URLError, OSError):
+            pass
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile API import time and time to ready")
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--top", type=int, default=20, help="Number of slowest imports to show")
+    parser.add_argument("--serve", action="store_true", help="Also start the server and time /health and /ready")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Max seconds to wait for /ready")
+    parser.add_argument("--report", help="Write the full profile to this JSON file")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"IMPORT PROFILE: import {args.module}")
+    print("=" * 70)
+    profile = profile_imports(args.module)
+    entries = profile["imports"]
+    print(f"  - Wall time: {profile['wall_seconds']:.3f}s (interpreter start + import)")
+    print(f"  - Modules imported: {len(entries)}")
+
+    print(f"\nTop-level packages by cumulative time:")
+    for item in top_level_packages(entries)[:args.top]:
+        print(f"  {item['cumulative_us'] / 1000:>9.1f} ms  {item['package']}")
+
+    print(f"\nSlowest modules by self time:")
+    for entry in sorted(entries, key=lambda e: e["self_us"], reverse=True)[:args.top]:
+        print(f"  {entry['self_us'] / 1000:>9.1f} ms  {entry['module']}")
+
+    if args.serve:
+        print("\n" + "=" * 70)
+        print(f"TIME TO READY (uvicorn main:app on port {args.port})")
+        print("=" * 70)
+        profile["serve"] = measure_time_to_ready(args.port, args.timeout)
+        serve = profile["serve"]
+        print(f"  - /health 200 after: {serve['health_seconds']}s")
+        print(f"  - /ready 200 after: {serve['ready_seconds']}s")
+        if serve["ready"]:
+            for name, stage in serve["ready"]["stages"].items():
+                print(f"    {name:<12} {stage['status']:<8} {stage['seconds']}s")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(profile, f, indent=2)
+        print(f"\n✓ Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Query Filters: Extract category and price constraints from user queries
+Turns "Show me laptops under $1000" into
+{"categories": ["Laptops"], "max_price": 83000, ...} so the retriever can
+push them down as metadata filters instead of relying on similarity alone.
+"""
+
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Catalog prices are in rupees; dollar amounts in queries are converted
+USD_TO_INR = float(os.getenv("USD_TO_INR", "83"))
+
+# Extra phrases customers use for catalog categories
+CATEGORY_SYNONYMS = {
+    "smart watch": ["Smartwatches"],
+    "smart watches": ["Smartwatches"],
+    "watch": ["Smartwatches"],
+    "watches": ["Smartwatches"],
+    "fitness tracker": ["Fitness Trackers", "Wearables"],
+    "fitness trackers": ["Fitness Trackers", "Wearables"],
+    "wearable": ["Wearables", "Smartwatches", "Fitness Trackers"],
+    "wearables": ["Wearables", "Smartwatches", "Fitness Trackers"],
+    "wearable devices": ["Wearables", "Smartwatches", "Fitness Trackers"],
+    "earphones": ["Earbuds"],
+    "earbud": ["Earbuds"],
+    "headphone": ["Headphones"],
+    "powerbank": ["Power Banks"],
+    "powerbanks": ["Power Banks"],
+    "notebook": ["Laptops"],
+    "notebooks": ["Laptops"],
+    "phone cases": ["Phone Cases"],
+    "phone case": ["Phone Cases"],
+    "smart home devices": ["Smart Home"],
+    "smart home products": ["Smart Home"],
+    "audio products": ["Audio", "Headphones", "Earbuds"],
+    "photography equipment": ["Cameras", "Camera Accessories"],
+}
+
+# Single-word categories that usually act as adjectives ("gaming monitor")
+# rather than as the product type being asked for
+AMBIGUOUS_CATEGORIES = {"gaming", "professional", "office", "productivity", "emergency", "gadgets", "cooling"}
+
+_AMOUNT = (
+    r"(?P<cur>[$₹]|rs\.?|inr|usd)?\s*"
+    r"(?P<num>\d[\d,]*(?:\.\d+)?)\s*(?P<mult>k\b)?\s*"
+    r"(?P<cur2>dollars?|usd|rupees?|rs\b|inr)?"
+    r"(?![\w.])"
+)
+_BETWEEN = re.compile(
+    r"\bbetween\s+" + _AMOUNT.replace("?P<", "?P<a_") + r"\s*(?:and|to|-)\s*" + _AMOUNT.replace("?P<", "?P<b_"),
+    re.IGNORECASE
+)
+_MAX_PRICE = re.compile(
+    r"\b(?:under|below|less than|cheaper than|up to|upto|within|max(?:imum)?|no more than|at most)\s+" + _AMOUNT,
+    re.IGNORECASE
+)
+_MIN_PRICE = re.compile(
+    r"\b(?:over|above|more than|at least|min(?:imum)?|starting at|starting from)\s+" + _AMOUNT,
+    re.IGNORECASE
+)
+_CHEAPEST = re.compile(r"\b(?:cheapest|lowest[- ]priced?|least expensive|most affordable|lowest cost)\b", re.IGNORECASE)
+_PRICIEST = re.compile(r"\b(?:most expensive|priciest|highest[- ]priced?|costliest|most premium)\b", re.IGNORECASE)
+
+
+def _singular(phrase: str) -> str:
+    words = phrase.split()
+    last = words[-1]
+    if re.search(r"(?:ches|shes|xes|sses)$", last):
+        last = last[:-2]
+    elif last.endswith("s") and not last.endswith("ss"):
+        last = last[:-1]
+    return " ".join(words[:-1] + [last])
+
+
+def build_category_vocabulary(categories: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Map lowercase query phrases to the catalog categories they refer to
+
+    Args:
+        categories: Category names found in the catalog
+
+    Returns:
+        Dictionary of phrase -> list of category names
+    """
+    known = set(categories)
+    vocabulary: Dict[str, List[str]] = {}
+    for category in known:
+        phrase = category.lower()
+        if phrase in AMBIGUOUS_CATEGORIES:
+            continue
+        for variant in {phrase, _singular(phrase)}:
+            vocabulary.setdefault(variant, []).append(category)
+    for phrase, mapped in CATEGORY_SYNONYMS.items():
+        mapped = [c for c in mapped if c in known]
+        if mapped:
+            vocabulary[phrase] = mapped
+    return vocabulary
+
+
+def compile_category_pattern(vocabulary: Dict[str, List[str]]):
+    """Compile all vocabulary phrases into one word-boundary regex (longest first)"""
+    phrases = sorted(vocabulary, key=len, reverse=True)
+    if not phrases:
+        return None
+    return re.compile(r"\b(?:" + "|".join(re.escape(p) for p in phrases) + r")\b", re.IGNORECASE)
+
+
+def _amount_to_inr(match, prefix: str = "") -> Optional[float]:
+    group = lambda name: match.group(prefix + name)
+    value = float(group("num").replace(",", ""))
+    if group("mult"):
+        value *= 1000
+    currency = (group("cur") or group("cur2") or "").lower()
+    if currency in ("$", "usd", "dollar", "dollars"):
+        return value * USD_TO_INR
+    if not currency and value < 100:
+        # Bare small numbers are quantities ("under 10 hours"), not prices
+        return None
+    return value
+
+
+def extract_query_constraints(query: str, vocabulary: Dict[str, List[str]], pattern=None) -> Dict:
+    """
+    Extract category and price constraints from a query
+
+    Args:
+        query: User query
+        vocabulary: Phrase -> categories map from build_category_vocabulary
+        pattern: Precompiled pattern from compile_category_pattern (optional)
+
+    Returns:
+        Dictionary with "categories", "min_price", "max_price" and
+        "sort" ("asc", "desc" or None)
+    """
+    pattern = pattern or compile_category_pattern(vocabulary)
+    categories: List[str] = []
+    if pattern:
+        for match in pattern.finditer(query):
+            for category in vocabulary[match.group(0).lower()]:
+                if category not in categories:
+                    categories.append(category)
+
+    min_price = max_price = None
+    between = _BETWEEN.search(query)
+    if between:
+        low, high = _amount_to_inr(between, "a_"), _amount_to_inr(between, "b_")
+        if low is not None and high is not None:
+            min_price, max_price = min(low, high), max(low, high)
+    else:
+        upper = _MAX_PRICE.search(query)
+        if upper:
+            max_price = _amount_to_inr(upper)
+        lower = _MIN_PRICE.search(query)
+        if lower:
+            min_price = _amount_to_inr(lower)
+
+    sort = None
+    if _CHEAPEST.search(query):
+        sort = "asc"
+    elif _PRICIEST.search(query):
+        sort = "desc"
+
+    return {
+        "categories": categories,
+        "min_price": min_price,
+        "max_price": max_price,
+        "sort": sort,
+    }
+
+
+def has_constraints(constraints: Dict) -> bool:
+    """True if any filter or ordering was extracted"""
+    return bool(
+        constraints["categories"]
+        or constraints["min_price"] is not None
+        or constraints["max_price"] is not None
+        or constraints["sort"]
+    )
+
+
+def build_chroma_filter(constraints: Dict) -> Optional[Dict]:
+    """
+    Convert constraints into a Chroma `where` metadata filter
+
+    Only product records carry category/price metadata, so any filter
+    also restricts the search to products.
+    """
+    clauses = []
+    if constraints["categories"]:
+        if len(constraints["categories"]) == 1:
+            clauses.append({"category": constraints["categories"][0]})
+        else:
+            clauses.append({"category": {"$in": constraints["categories"]}})
+    if constraints["min_price"] is not None:
+        clauses.append({"price": {"$gte": int(constraints["min_price"])}})
+    if constraints["max_price"] is not None:
+        clauses.append({"price": {"$lte": int(constraints["max_price"])}})
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+def matches_constraints(metadata: Dict, constraints: Dict) -> bool:
+    """True if a chunk's metadata satisfies the category and price constraints"""
+    if constraints["categories"] and metadata.get("category") not in constraints["categories"]:
+        return False
+    price = metadata.get("price")
+    if constraints["min_price"] is not None and (price is None or price < constraints["min_price"]):
+        return False
+    if constraints["max_price"] is not None and (price is None or price > constraints["max_price"]):
+        return False
+    return True
+
+
+def filter_records(records: List[Dict], constraints: Dict) -> List[Dict]:
+    """Apply constraints to parsed catalog product records (sorted if requested)"""
+    matches = []
+    for record in records:
+        if record.get("type") != "product" or record.get("price") is None:
+            continue
+        if matches_constraints(record, constraints):
+            matches.append(record)
+
+    if constraints["sort"]:
+        matches.sort(key=lambda r: r["price"], reverse=constraints["sort"] == "desc")
+    return matches
@@ -0,0 +1,273 @@
+"""
+Query Normalizer: One-pass synonym and acronym rewriting
+Every alias the store knows is compiled into a single case-insensitive,
+word-boundary-aware regex, so a query is rewritten in one scan however
+many terms it contains ("COD or EMI?", "cod" on its own, "c.o.d").
+
+Two rewrites share the compiled pattern:
+- rewrite(): for retrieval - acronyms are spelled out, SKUs gain their
+  product name and competitor brands gain the products we sell instead
+  ("airpods" -> "airpods (wireless earbuds)")
+- key(): for cache keys (response cache, request coalescing,
+  classification cache) - every alias becomes its canonical term, then
+  case, punctuation and whitespace are folded, so "Do you offer cash on
+  delivery?" and "do you offer COD" share one entry. Brand hints are not
+  applied: a question about AirPods is not a question about our earbuds.
+
+SKU aliases come from the catalog ("SW-PRO-X-001", "sw pro x 001",
+"swprox001"). A SKU prefix without its running number ("SW-PRO-X",
+"WEATHER") only matches as written in uppercase: many prefixes are
+ordinary words or phrases ("weather", "present", "bike lock"). In the API each catalog snapshot builds its own normalizer
+and installs it when it goes live, so requests never stat or parse the
+catalog; elsewhere the catalog file's mtime is checked at most every
+NORMALIZER_CHECK_INTERVAL seconds.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from catalog import catalog_mtime, load_catalog_records
+
+CATALOG_PATH = os.getenv("CATALOG_PATH", "product_info.txt")
+
+# Seconds between checks of the catalog file's mtime (when no snapshot installed a normalizer)
+NORMALIZER_CHECK_INTERVAL = float(os.getenv("NORMALIZER_CHECK_INTERVAL", "5"))
+
+# (canonical term, retrieval text, aliases); the canonical term is what cache keys contain
+SYNONYMS = [
+    ("cod", "Cash on Delivery (COD)", ["cod", "c.o.d", "cash on delivery", "pay on delivery"]),
+    ("emi", "EMI (Equated Monthly Installments)", ["emi", "emis", "equated monthly installment",
+                                                   "equated monthly installments"]),
+    ("upi", "UPI payment", ["upi", "unified payments interface"]),
+    ("sku", "SKU (product code)", ["sku", "skus", "stock keeping unit", "product code"]),
+    ("gst", "GST (Goods and Services Tax)", ["gst", "goods and services tax"]),
+    ("rma", "return authorization (RMA)", ["rma", "return merchandise authorization"]),
+    ("wifi", "WiFi", ["wifi", "wi-fi", "wi fi"]),
+]
+
+# Competitor brands and products -> what the catalog sells instead (retrieval only)
+BRAND_ALTERNATIVES = {
+    "apple watch": "smartwatch", "galaxy watch": "smartwatch", "garmin": "smartwatch",
+    "amazfit": "smartwatch", "fitbit": "fitness tracker", "mi band": "fitness tracker",
+    "whoop": "fitness tracker", "oura": "smart ring",
+    "airpods": "wireless earbuds", "galaxy buds": "wireless earbuds",
+    "bose": "headphones", "jbl": "bluetooth speaker",
+    "anker": "power bank charger", "macbook": "laptop", "chromebook": "laptop", "ipad": "tablet",
+    "kindle": "e-reader", "gopro": "action camera", "dji": "drone", "alexa": "smart speaker",
+    "echo dot": "smart speaker", "google home": "smart speaker", "ring doorbell": "video doorbell",
+    "roomba": "robot vacuum", "airtag": "luggage tracker", "playstation": "gaming controller",
+    "xbox": "gaming controller", "oculus": "vr headset", "meta quest": "vr headset",
+}
+
+# Separators that may appear, or not, inside an alias ("wi-fi", "c.o.d", "sw pro x 001")
+SEPARATORS = r"[\s.\-]*"
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+PUNCTUATION = re.compile(r"[^\w\s]+")
+WHITESPACE = re.compile(r"\s+")
+
+
+def fold(text: str) -> str:
+    """Lookup form of an alias: lowercase letters and digits only"""
+    return NON_ALNUM.sub("", text.lower())
+
+
+def alias_parts(alias: str) -> List[str]:
+    """Words of an alias ("wi-fi" -> ["wi", "fi"]); separators between them are optional"""
+    return [part for part in NON_ALNUM.split(alias.lower()) if part]
+
+
+def trie_pattern(aliases: Iterable[str], upper: bool = False) -> str:
+    """
+    One regex for all aliases, shaped as a trie over their words
+
+    A flat alternation tries every alias at every position; sharing
+    prefixes ("sw" -> "pro"/"ultra"/"gold"...) lets the engine rule most
+    of them out on the first characters (about 3x faster on this catalog).
+    With upper=True the words are matched in uppercase only.
+    """
+    root: Dict[str, Dict] = {}
+    for alias in aliases:
+        node = root
+        for part in alias_parts(alias):
+            node = node.setdefault(part, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Dict]) -> str:
+        branches = []
+        # Longest word first, so "emis" is not cut short by "emi"
+        for part in sorted((p for p in node if p), key=len, reverse=True):
+            child = node[part]
+            rest = build(child)
+            if rest:
+                rest = f"(?:{SEPARATORS}{rest})" + ("?" if "" in child else "")
+            branches.append(re.escape(part.upper() if upper else part) + rest)
+        return "(?:" + "|".join(branches) + ")" if branches else ""
+
+    return build(root)
+
+
+def sku_aliases(records: Iterable[Dict]) -> Tuple[List[Tuple[str, str, List[str]]], List[Tuple[str, str, List[str]]]]:
+    """
+    Synonym entries for catalog SKUs
+
+    The canonical term is the SKU itself. "SW-PRO-X" (without the running
+    number) refers to it too when no other SKU shares the prefix; those
+    prefix entries are returned separately because they are matched
+    case-sensitively.
+
+    Returns:
+        (full SKU entries, prefix entries)
+    """
+    entries = []
+    prefixes: Dict[str, List[int]] = {}
+    for record in records:
+        sku = record.get("sku")
+        if not sku or record.get("type") != "product":
+            continue
+        entries.append((sku.lower(), f"{record.get('name', '')} ({sku})".strip(), [sku]))
+        prefix, _, number = sku.rpartition("-")
+        if prefix and number.isdigit():
+            prefixes.setdefault(prefix, []).append(len(entries) - 1)
+    prefix_entries = [
+        (entries[indexes[0]][0], entries[indexes[0]][1], [prefix.upper()])
+        for prefix, indexes in prefixes.items() if len(indexes) == 1
+    ]
+    return entries, prefix_entries
+
+
+class QueryNormalizer:
+    """
+    Compiled alias table
+
+    Usage:
+        normalizer = get_query_normalizer()
+        normalizer.rewrite("Is COD available?")  # "Is Cash on Delivery (COD) available?"
+        normalizer.key("Is cash on delivery available?")  # "is cod available"
+    """
+
+    def __init__(self, records: Optional[List[Dict]] = None):
+        # fold(alias) -> (canonical term, retrieval text)
+        self.terms: Dict[str, Tuple[str, str]] = {}
+        aliases = []
+        skus, sku_prefixes = sku_aliases(records or [])
+        for canonical, expansion, names in SYNONYMS + skus:
+            for alias in names:
+                self.terms.setdefault(fold(alias), (canonical, expansion))
+                aliases.append(alias)
+        for brand, alternative in BRAND_ALTERNATIVES.items():
+            self.terms.setdefault(fold(brand), (None, alternative))
+            aliases.append(brand)
+        prefixes = []
+        for canonical, expansion, names in sku_prefixes:
+            for alias in names:
+                self.terms.setdefault(fold(alias), (canonical, expansion))
+                prefixes.append(alias)
+        # One scan: aliases in any case, then uppercase-only SKU prefixes
+        alternatives = f"(?i:{trie_pattern(aliases)})"
+        if prefixes:
+            alternatives = f"(?:{alternatives}|{trie_pattern(prefixes, upper=True)})"
+        self.pattern = re.compile(r"(?<![\w-])" + alternatives + r"(?![\w-])")
+
+    def _lookup(self, match: "re.Match") -> Optional[Tuple[Optional[str], str]]:
+        return self.terms.get(fold(match.group(0)))
+
+    def rewrite(self, query: str) -> str:
+        """Query for retrieval, with acronyms, SKUs and brands spelled out"""
+        def replace(match):
+            term = self._lookup(match)
+            if term is None:
+                return match.group(0)
+            canonical, expansion = term
+            if canonical is None:
+                # Brand: keep what the customer asked for, add what we sell
+                return f"{match.group(0)} ({expansion})"
+            return expansion
+
+        return self.pattern.sub(replace, query)
+
+    def key(self, query: str) -> str:
+        """Canonical form for cache keys: aliases unified, case/punctuation/whitespace folded"""
+        def replace(match):
+            term = self._lookup(match)
+            if term is None or term[0] is None:
+                return match.group(0)
+            return f" {term[0]} "
+
+        text = self.pattern.sub(replace, query).lower()
+        text = PUNCTUATION.sub(" ", text)
+        return WHITESPACE.sub(" ", text).strip()
+
+
+_normalizer: Optional[QueryNormalizer] = None
+_normalizer_mtime: Optional[float] = None
+_normalizer_checked_at = 0.0
+# Set once a catalog snapshot installed its normalizer; the file is no longer checked
+_normalizer_installed = False
+_normalizer_lock = threading.Lock()
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return catalog_mtime(path)
+    except OSError:
+        return None
+
+
+def install_query_normalizer(normalizer: QueryNormalizer):
+    """Serve this normalizer (the live catalog snapshot's) from get_query_normalizer()"""
+    global _normalizer, _normalizer_installed
+    with _normalizer_lock:
+        _normalizer = normalizer
+        _normalizer_installed = True
+
+
+def _fresh() -> bool:
+    return _normalizer is not None and (
+        _normalizer_installed or time.monotonic() - _normalizer_checked_at < NORMALIZER_CHECK_INTERVAL
+    )
+
+
+def get_query_normalizer(catalog_path: str = CATALOG_PATH) -> QueryNormalizer:
+    """
+    Get the normalizer: the installed snapshot's, or one over the catalog
+    file, rebuilt when its mtime changes (checked at most every
+    NORMALIZER_CHECK_INTERVAL seconds)
+    """
+    global _normalizer, _normalizer_mtime, _normalizer_checked_at
+    if _fresh():
+        return _normalizer
+
+    with _normalizer_lock:
+        if not _fresh():
+            mtime = _mtime(catalog_path)
+            if _normalizer is None or mtime != _normalizer_mtime:
+                try:
+                    records = load_catalog_records(catalog_path)
+                except (OSError, ValueError) as e:
+                    print(f"Warning: query normalizer without catalog SKUs: {e}")
+                    records = []
+                _normalizer = QueryNormalizer(records)
+                _normalizer_mtime = mtime
+            _normalizer_checked_at = time.monotonic()
+    return _normalizer
+
+
+def rewrite_query(query: str) -> str:
+    """Query for retrieval (see QueryNormalizer.rewrite)"""
+    return get_query_normalizer().rewrite(query)
+
+
+def normalize_key(query: str) -> str:
+    """Cache key form of a query (see QueryNormalizer.key)"""
+    return get_query_normalizer().key(query)
+
+
+if __name__ == "__main__":
+    for query in sys.argv[1:] or ["Do you offer COD?", "cod", "EMI on SW-PRO-X-001 or upi?", "airpods alternative"]:
+        print(f"{query!r}")
+        print(f"  rewrite: {rewrite_query(query)!r}")
+        print(f"  key:     {normalize_key(query)!r}")
@@ -4,96 +4,44 @@ Uses LangChain, ChromaDB, and Google Generative AI (Gemini)
 """
 
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 from langchain_community.vectorstores import Chroma
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
+from catalog import load_catalog_records
+from bm25_index import BM25_INDEX_PATH
+from catalog_shards import load_shard_manifest, shard_index_path
+from context_budget import CONTEXT_TOKEN_BUDGET, assemble_context, estimate_tokens, prompt_token_counter
+from generation_cache import CachedLLM, template_version
+from model_router import MODEL_TIMEOUT, ModelRouter
+from retrievers import FilteredRetriever, HybridRetriever, ShardedRetriever
 
 # Load environment variables
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in .env file")
+# Number of chunks retrieved per query (see evaluate_retrieval.py for the sweep)
+RETRIEVER_K = 4
 
+# "hybrid" (vector + BM25, fused), "filtered" (vector + metadata filters) or "similarity"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
 
-def format_docs(docs):
-    """Format retrieved documents for the prompt"""
-    return "\n\n".join(doc.page_content for doc in docs)
+# Candidates fetched from each side before rank fusion
+HYBRID_FETCH_K = 10
 
+# Models tried at request time, in order (see model_router.py)
+PRIMARY_MODEL = os.getenv("PRIMARY_MODEL", "gemini-2.5-flash")
+FALLBACK_MODEL = os.getenv("FALLBACK_MODEL", "gemini-2.5-pro")
+TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
 
-def create_rag_chain():
-    """
-    Create a complete RAG chain:
-    1. Load existing ChromaDB vector store
-    2. Create a retriever (top k = 3)
-    3. Initialize Gemini model
-    4. Create RetrievalQA chain
-    5. Return the final RAG chain
-    """
-    
-    print("=" * 70)
-    print("Building RAG Chain with Gemini")
-    print("=" * 70)
-    
-    # Step 1: Load existing ChromaDB vector store
-    print("\n[Step 1] Loading ChromaDB vector store...")
-    persist_directory = "chroma_db"
-    
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=GEMINI_API_KEY
-    )
-    
-    vectorstore = Chroma(
-        persist_directory=persist_directory,
-        embedding_function=embeddings,
-        collection_name="product_info"
-    )
-    print(f"✓ ChromaDB loaded successfully")
-    print(f"  - Persist directory: {persist_directory}")
-    print(f"  - Collection: product_info")
-    
-    # Step 2: Create retriever - optimized for speed and accuracy
-    print("\n[Step 2] Creating retriever...")
-    retriever = vectorstore.as_retriever(
-        search_type="similarity",
-        search_kwargs={
-            "k": 4  # Optimal balance: 4 chunks * 600 chars = 2400 chars context
-        }
-    )
-    print(f"✓ Retriever created")
-    print(f"  - Top K: 4 documents (optimized)")
-    print(f"  - Search type: similarity")
-    print(f"  - Total context: ~2400 characters")
-    
-    # Step 3: Initialize Gemini model
-    print("\n[Step 3] Initializing Gemini model...")
-    try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=GEMINI_API_KEY,
-            temperature=0.7,
-            convert_system_message_to_human=True
-        )
-    except:
-        # Fallback to a different model name
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro",
-            google_api_key=GEMINI_API_KEY,
-            temperature=0.7,
-            convert_system_message_to_human=True
-        )
-    print(f"✓ Gemini model initialized")
-    print(f"  - Model: gemini-1.5-flash-latest")
-    print(f"  - Temperature: 0.7")
-    
-    # Step 4: Create custom prompt template
-    print("\n[Step 4] Creating prompt template...")
-    prompt_template = """You are a Retrieval-Augmented chatbot for TechGear Electronics customer support.
+# Optional API endpoint override, e.g. http://localhost:8081 for fake_model_server.py
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+# Static instruction prefix of the RAG prompt - identical for every request
+RAG_INSTRUCTIONS = """You are a Retrieval-Augmented chatbot for TechGear Electronics customer support.
 
 INSTRUCTIONS (VERY IMPORTANT):
 - Answer ONLY what the user asked
@@ -131,33 +79,263 @@ FORMAT RULES:
 - DO NOT list all features unless explicitly asked
 - Answer in 1–2 sentences maximum
 
-Context:
+"""
+
+RAG_PROMPT_TEMPLATE = RAG_INSTRUCTIONS + """Context:
 {context}
 
 Question: {question}
 
 Answer:"""
-    
-    PROMPT = PromptTemplate(
-        template=prompt_template,
+
+STATIC_PREFIX_TOKENS = estimate_tokens(RAG_INSTRUCTIONS)
+
+# Part of every generation cache key: editing the prompt invalidates cached answers
+RAG_TEMPLATE_VERSION = template_version(RAG_PROMPT_TEMPLATE)
+
+
+@lru_cache(maxsize=1)
+def get_rag_prompt():
+    """Build the RAG PromptTemplate once and reuse it across chains"""
+    return PromptTemplate(
+        template=RAG_PROMPT_TEMPLATE,
         input_variables=["context", "question"]
     )
+
+
+def format_docs(docs):
+    """
+    Format retrieved documents for the prompt
+
+    Drops low-score chunks, removes overlapping/duplicate text and trims
+    to the context token budget (see context_budget.py).
+    """
+    context, stats = assemble_context(docs)
+    prompt_token_counter.record_context(stats)
+    return context
+
+
+def record_prompt_tokens(inputs):
+    """Count prompt tokens for this request and pass the prompt inputs through"""
+    prompt_tokens = (
+        STATIC_PREFIX_TOKENS
+        + estimate_tokens(inputs["context"])
+        + estimate_tokens(inputs["question"])
+    )
+    prompt_token_counter.record_prompt(prompt_tokens)
+    return inputs
+
+
+def create_chat_model(model_name):
+    """Create a Gemini chat model, honouring GEMINI_API_ENDPOINT if set"""
+    kwargs = {}
+    if GEMINI_API_ENDPOINT:
+        kwargs = {"client_options": {"api_endpoint": GEMINI_API_ENDPOINT}, "transport": "rest"}
+    return ChatGoogleGenerativeAI(
+        model=model_name,
+        google_api_key=GEMINI_API_KEY,
+        temperature=TEMPERATURE,
+        convert_system_message_to_human=True,
+        **kwargs
+    )
+
+
+def create_model_router(model_names=None):
+    """
+    Create the runtime model router used for generation
+
+    Args:
+        model_names: Models in preference order (default: PRIMARY_MODEL, FALLBACK_MODEL)
+
+    Returns:
+        ModelRouter with a circuit breaker and latency tracker per model
+    """
+    names = model_names or [PRIMARY_MODEL, FALLBACK_MODEL]
+    models = []
+    for name in dict.fromkeys(names):
+        try:
+            models.append((name, create_chat_model(name)))
+        except Exception as e:
+            print(f"Warning: could not initialize {name}: {e}")
+    return ModelRouter(models)
+
+
+def create_retriever(vectorstore, k=RETRIEVER_K, records=None, mode=RETRIEVAL_MODE,
+                     index_path=BM25_INDEX_PATH):
+    """
+    Create the retriever used by the RAG chain
+
+    Args:
+        vectorstore: Chroma vector store to search
+        k: Number of chunks to retrieve
+        records: Parsed catalog records; enable category/price filtering
+        mode: "hybrid", "filtered" or "similarity"
+        index_path: BM25 index file used in hybrid mode
+
+    Returns:
+        HybridRetriever, FilteredRetriever or VectorStoreRetriever
+    """
+    if mode == "hybrid":
+        dense = FilteredRetriever.from_records(vectorstore, records or [], k=max(k, HYBRID_FETCH_K))
+        return HybridRetriever(dense_retriever=dense, index_path=index_path, k=k, fetch_k=max(k, HYBRID_FETCH_K))
+    if mode == "filtered":
+        return FilteredRetriever.from_records(vectorstore, records or [], k=k)
+    return vectorstore.as_retriever(
+        search_type="similarity",
+        search_kwargs={"k": k}
+    )
+
+
+def create_sharded_retriever(embeddings, shards, persist_directory, k=RETRIEVER_K, records=None,
+                             mode=RETRIEVAL_MODE):
+    """
+    Create the retriever over a sharded catalog (see catalog_shards.py)
+
+    Args:
+        embeddings: Embedding function shared by all shard collections
+        shards: Entries of shards.json
+        persist_directory: Directory holding the shard collections and BM25 indexes
+        k: Number of chunks to retrieve
+        records: Parsed records of the whole catalog
+        mode: "hybrid" (BM25 indexes of all shards on the lexical side) or
+            "filtered"; "similarity" searches shards like "filtered", since
+            merging across shards needs relevance scores
+
+    Returns:
+        ShardedRetriever, wrapped in a HybridRetriever in hybrid mode
+    """
+    fetch_k = max(k, HYBRID_FETCH_K) if mode == "hybrid" else k
+    retrievers = {}
+    for shard in shards:
+        vectorstore = Chroma(
+            persist_directory=persist_directory,
+            embedding_function=embeddings,
+            collection_name=shard["collection"]
+        )
+        retrievers[shard["name"]] = FilteredRetriever.from_records(vectorstore, records or [], k=fetch_k)
+    dense = ShardedRetriever.from_shards(
+        retrievers, {shard["name"]: shard["categories"] for shard in shards}, records or [], k=fetch_k
+    )
+    if mode == "hybrid":
+        index_paths = [shard_index_path(persist_directory, shard) for shard in shards]
+        return HybridRetriever(dense_retriever=dense, index_paths=index_paths, k=k, fetch_k=fetch_k)
+    return dense
+
+
+def create_rag_chain(k=RETRIEVER_K, persist_directory="chroma_db", catalog_path="product_info.txt",
+                     index_path=BM25_INDEX_PATH, router=None):
+    """
+    Create a complete RAG chain:
+    1. Load existing ChromaDB vector store
+    2. Create a retriever (top k = RETRIEVER_K)
+    3. Initialize Gemini model
+    4. Create RetrievalQA chain
+    5. Return the final RAG chain
+
+    The paths default to the index built by embed_and_store.py; catalog
+    snapshots (catalog_snapshots.py) pass their own versioned copies and
+    their own model router, which health checks probe. A vector store
+    written from a catalog directory (shards.json present) is searched
+    shard by shard.
+    """
+    
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY not found in .env file")
+    
+    print("=" * 70)
+    print("Building RAG Chain with Gemini")
+    print("=" * 70)
+    
+    # Step 1: Load existing ChromaDB vector store
+    print("\n[Step 1] Loading ChromaDB vector store...")
+    
+    embeddings = GoogleGenerativeAIEmbeddings(
+        model="models/embedding-001",
+        google_api_key=GEMINI_API_KEY
+    )
+    
+    shards = load_shard_manifest(persist_directory)
+    if not shards:
+        vectorstore = Chroma(
+            persist_directory=persist_directory,
+            embedding_function=embeddings,
+            collection_name="product_info"
+        )
+    print(f"✓ ChromaDB loaded successfully")
+    print(f"  - Persist directory: {persist_directory}")
+    if shards:
+        print(f"  - Collections: {len(shards)} shards ({', '.join(s['name'] for s in shards)})")
+    else:
+        print(f"  - Collection: product_info")
+    
+    # Step 2: Create retriever - optimized for speed and accuracy
+    print("\n[Step 2] Creating retriever...")
+    # Default k=4: 4 chunks * 600 chars = 2400 chars context
+    # Catalog records let the retriever honour category/price constraints
+    try:
+        records = load_catalog_records(catalog_path)
+    except FileNotFoundError:
+        records = []
+    if shards:
+        retriever = create_sharded_retriever(embeddings, shards, persist_directory, k=k, records=records)
+    else:
+        retriever = create_retriever(vectorstore, k=k, records=records, index_path=index_path)
+    print(f"✓ Retriever created")
+    print(f"  - Top K: {k} documents")
+    print(f"  - Search type: {RETRIEVAL_MODE}" + (", routed by category across shards" if shards else ""))
+    
+    # Step 3: Initialize Gemini models behind the runtime router
+    print("\n[Step 3] Initializing Gemini models...")
+    router = router or create_model_router()
+    print(f"✓ Gemini models initialized")
+    print(f"  - Models: {', '.join(name for name, _ in router.models)}")
+    print(f"  - Temperature: {TEMPERATURE}")
+    print(f"  - Timeout: {MODEL_TIMEOUT}s (hedge after p95 latency, circuit breaker per model)")
+    
+    # Identical prompts (same template, models, temperature, context and question) reuse
+    # the stored generation, across restarts and processes (see generation_cache.py)
+    generator = CachedLLM(
+        router,
+        model=",".join(name for name, _ in router.models),
+        temperature=TEMPERATURE,
+        template_version=RAG_TEMPLATE_VERSION,
+        namespace="rag"
+    )
+    print(f"  - Generation cache: {'on' if generator.cache.enabled else 'off'} ({generator.cache.path})")
+    
+    # Step 4: Create custom prompt template (static prefix built once per process)
+    print("\n[Step 4] Creating prompt template...")
+    PROMPT = get_rag_prompt()
     print(f"✓ Prompt template created")
+    print(f"  - Static instructions: ~{STATIC_PREFIX_TOKENS} tokens (cached)")
+    print(f"  - Context budget: {CONTEXT_TOKEN_BUDGET} tokens")
     
     # Step 5: Create RAG chain using LCEL (LangChain Expression Language)
     print("\n[Step 5] Creating RAG chain...")
     
-    # Define the chain
-    rag_chain = (
-        {"context": retriever | format_docs, "question": RunnablePassthrough()}
+    # Generation step: context + question -> answer string
+    answer_chain = (
+        RunnableLambda(lambda x: {"context": format_docs(x["source_documents"]), "question": x["question"]})
+        | RunnableLambda(record_prompt_tokens)
         | PROMPT
-        | llm
-        | StrOutputParser()
+        | RunnableLambda(generator.invoke)
     )
     
+    # Retrieve ONCE, then generate from those documents and return both,
+    # so callers get the sources without a second embedding + vector search.
+    # Steps run sequentially in the caller's thread so the request deadline
+    # (deadlines.py context variable) reaches the retriever and model router.
+    def retrieve(question, config):
+        return {"question": question, "source_documents": retriever.invoke(question, config=config)}
+    
+    def generate(inputs, config):
+        return {"answer": answer_chain.invoke(inputs, config=config), "source_documents": inputs["source_documents"]}
+    
+    rag_chain = RunnableLambda(retrieve) | RunnableLambda(generate)
+    
     print(f"✓ RAG chain created")
     print(f"  - Chain type: Retrieval-Augmented Generation")
-    print(f"  - Returns formatted response: True")
+    print(f"  - Returns: {{'answer', 'source_documents'}} from a single retrieval")
     
     print("\n" + "=" * 70)
     print("RAG Chain Ready!")
@@ -166,13 +344,37 @@ Answer:"""
     return rag_chain
 
 
-def query_rag_chain(rag_chain, retriever, query):
+def serialize_sources(source_docs):
+    """
+    Convert source Documents into JSON-friendly dicts for the API
+
+    Args:
+        source_docs: Documents returned by the RAG chain
+
+    Returns:
+        List of dicts with name, sku, category, price, score and a snippet
+    """
+    sources = []
+    for doc in source_docs:
+        metadata = doc.metadata or {}
+        score = metadata.get("relevance_score", metadata.get("rrf_score"))
+        sources.append({
+            "name": metadata.get("name"),
+            "sku": metadata.get("sku"),
+            "category": metadata.get("category"),
+            "price": metadata.get("price"),
+            "score": score,
+            "snippet": doc.page_content[:150]
+        })
+    return sources
+
+
+def query_rag_chain(rag_chain, query):
     """
     Query the RAG chain and return the response with source documents
     
     Args:
-        rag_chain: The RAG chain
-        retriever: The retriever for getting source documents
+        rag_chain: The RAG chain from create_rag_chain()
         query: User's question
     
     Returns:
@@ -182,11 +384,10 @@ def query_rag_chain(rag_chain, retriever, query):
     print(f"Query: {query}")
     print(f"{'=' * 70}")
     
-    # Get response from RAG chain
-    answer = rag_chain.invoke(query)
-    
-    # Get source documents
-    source_docs = retriever.invoke(query)
+    # One retrieval pass yields both the answer and its sources
+    result = rag_chain.invoke(query)
+    answer = result["answer"]
+    source_docs = result["source_documents"]
     
     # Display answer
     print(f"\nAnswer:\n{answer}")
@@ -195,7 +396,8 @@ def query_rag_chain(rag_chain, retriever, query):
     if source_docs:
         print(f"\nSource Documents:")
         for i, doc in enumerate(source_docs, 1):
-            print(f"\n  Document {i}:")
+            score = doc.metadata.get("relevance_score")
+            print(f"\n  Document {i}:" + (f" (score: {score})" if score is not None else ""))
             print(f"  {doc.page_content[:150]}...")
     
     return {"answer": answer, "source_documents": source_docs}
@@ -220,22 +422,10 @@ def main(test_queries=True):
             "What are the features of Wireless Earbuds Elite?"
         ]
         
-        # Recreate retriever for source document retrieval
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=GEMINI_API_KEY
-        )
-        vectorstore = Chroma(
-            persist_directory="chroma_db",
-            embedding_function=embeddings,
-            collection_name="product_info"
-        )
-        retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
-        
-        # Query the RAG chain
+        # Query the RAG chain (sources come back with each answer)
         for query in test_query_list:
             try:
-                response = query_rag_chain(rag_chain, retriever, query)
+                response = query_rag_chain(rag_chain, query)
                 print("\n" + "-" * 70)
             except Exception as e:
                 print(f"Error querying: {e}")
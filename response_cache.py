@@ -0,0 +1,215 @@
+"""
+Response Cache: Persistent answers for context-free queries
+Answers are stored in SQLite keyed by (catalog version, normalized query),
+so every worker and replica on a host shares them and survives restarts,
+and a catalog reload never serves an answer built from an old catalog.
+
+Filled by live traffic and ahead of time by prewarm_cache.py. Only
+complete answers are stored: degraded responses (deadline or model
+failures) and follow-up queries enhanced with a session's product are not.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+
+from single_flight import coalescing_key
+from sqlite_store import SQLiteStore
+
+# SQLite file shared by all workers (WAL mode allows concurrent readers)
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join("chroma_db", "response_cache.sqlite"))
+
+# Set to "false" to disable cache lookups and stores
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+
+# Seconds an answer is served before it is regenerated (0 = no expiry)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Entries kept across all catalog versions; least recently used are evicted
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "50000"))
+
+# Routes whose answers are not worth caching or must not be reused
+UNCACHEABLE_ROUTES = {"fallback"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    catalog_version TEXT NOT NULL,
+    query_key TEXT NOT NULL,
+    query TEXT NOT NULL,
+    response TEXT NOT NULL,
+    category TEXT,
+    routed_to TEXT,
+    sources TEXT,
+    source TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_hit REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (catalog_version, query_key)
+);
+CREATE INDEX IF NOT EXISTS responses_last_hit ON responses (last_hit);
+"""
+
+
+def is_cacheable(result: Dict) -> bool:
+    """A workflow result can be reused for other sessions"""
+    return (
+        bool(result.get("response"))
+        and not result.get("degraded")
+        and result.get("routed_to") not in UNCACHEABLE_ROUTES
+    )
+
+
+class ResponseCache:
+    """
+    SQLite-backed answer cache
+
+    One connection per thread (see sqlite_store.py); writes are short
+    transactions so several processes can share the file.
+    """
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, ttl: float = RESPONSE_CACHE_TTL,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "errors": 0}
+        self._store = SQLiteStore(path, SCHEMA)
+        self._stores_since_evict = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._store.connect()
+
+    def get(self, catalog_version: str, query: str) -> Optional[Dict]:
+        """
+        Cached result for a query on a catalog version
+
+        Returns:
+            {"response", "category", "routed_to", "sources", "cached": source}
+            or None on a miss (or any cache error - the cache never fails a request)
+        """
+        if not self.enabled:
+            return None
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response, category, routed_to, sources, source, created_at FROM responses "
+                "WHERE catalog_version = ? AND query_key = ?",
+                (catalog_version, coalescing_key(query))
+            ).fetchone()
+            now = time.time()
+            if row is None or (self.ttl and now - row[5] > self.ttl):
+                self.counters["misses"] += 1
+                return None
+            conn.execute(
+                "UPDATE responses SET hits = hits + 1, last_hit = ? WHERE catalog_version = ? AND query_key = ?",
+                (now, catalog_version, coalescing_key(query))
+            )
+        except sqlite3.Error as e:
+            self.counters["errors"] += 1
+            print(f"Warning: response cache lookup failed: {e}")
+            return None
+        self.counters["hits"] += 1
+        return {
+            "response": row[0],
+            "category": row[1],
+            "routed_to": row[2],
+            "sources": json.loads(row[3]) if row[3] else None,
+            "cached": row[4]
+        }
+
+    def contains(self, catalog_version: str, query: str) -> bool:
+        """Whether a fresh answer is stored (does not count as a hit)"""
+        try:
+            row = self._connect().execute(
+                "SELECT created_at FROM responses WHERE catalog_version = ? AND query_key = ?",
+                (catalog_version, coalescing_key(query))
+            ).fetchone()
+        except sqlite3.Error:
+            return False
+        return row is not None and not (self.ttl and time.time() - row[0] > self.ttl)
+
+    def put(self, catalog_version: str, query: str, result: Dict, source: str = "live") -> bool:
+        """
+        Store a workflow result if it is cacheable
+
+        Args:
+            catalog_version: Version of the snapshot that produced the answer
+            query: Query as sent to the workflow
+            result: Workflow result (response, category, routed_to, sources)
+            source: Who produced it ("live" or "prewarm")
+
+        Returns:
+            True if stored
+        """
+        if not self.enabled or not is_cacheable(result):
+            return False
+        now = time.time()
+        sources = result.get("sources")
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(catalog_version, query_key, query, response, category, routed_to, sources, source, created_at, last_hit, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (catalog_version, coalescing_key(query), query, result["response"], result.get("category"),
+                 result.get("routed_to"), json.dumps(sources) if sources else None, source, now, now)
+            )
+            self.counters["stores"] += 1
+            # Evicting is a full-table count, so only do it every few hundred stores
+            self._stores_since_evict += 1
+            if self._stores_since_evict >= 200:
+                self._stores_since_evict = 0
+                self.evict()
+        except sqlite3.Error as e:
+            self.counters["errors"] += 1
+            print(f"Warning: response cache store failed: {e}")
+            return False
+        return True
+
+    def evict(self, keep_version: Optional[str] = None) -> int:
+        """
+        Drop expired entries, then least recently used ones above max_entries
+
+        Args:
+            keep_version: If given, also drop every entry of other catalog versions
+
+        Returns:
+            Number of entries removed
+        """
+        conn = self._connect()
+        removed = 0
+        if self.ttl:
+            removed += conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)).rowcount
+        if keep_version is not None:
+            removed += conn.execute("DELETE FROM responses WHERE catalog_version != ?", (keep_version,)).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            removed += conn.execute(
+                "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses ORDER BY last_hit LIMIT ?)",
+                (excess,)
+            ).rowcount
+        return removed
+
+    def snapshot(self) -> Dict:
+        """Counters, hit ratio and entries per catalog version (for /metrics)"""
+        lookups = self.counters["hits"] + self.counters["misses"]
+        stats = {
+            "enabled": self.enabled,
+            **self.counters,
+            "hit_ratio": round(self.counters["hits"] / lookups, 3) if lookups else None,
+        }
+        if self.enabled:
+            try:
+                rows = self._connect().execute(
+                    "SELECT catalog_version, source, COUNT(*) FROM responses GROUP BY catalog_version, source"
+                ).fetchall()
+                entries: Dict[str, Dict[str, int]] = {}
+                for version, source, count in rows:
+                    entries.setdefault(version, {})[source] = count
+                stats["entries"] = entries
+            except sqlite3.Error as e:
+                stats["error"] = str(e)
+        return stats
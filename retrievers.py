@@ -0,0 +1,268 @@
+"""
+Custom Retrievers for the RAG chain
+- FilteredRetriever: pushes category/price constraints down as Chroma
+  metadata filters, and answers "cheapest"/"most expensive" queries
+  straight from the parsed catalog
+- HybridRetriever: fuses vector results with a BM25 lexical index using
+  Reciprocal Rank Fusion, for exact SKU/model-name matches
+- ShardedRetriever: one retriever per catalog shard (catalog_shards.py);
+  searches only the shards holding the query's category, or all of them
+  in parallel, and merges the results by score
+"""
+
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+from bm25_index import BM25_INDEX_PATH, load_bm25_index, merge_by_score, reciprocal_rank_fusion
+from catalog import record_metadata
+from deadlines import call_with_deadline, check_deadline
+from query_filters import (
+    build_category_vocabulary,
+    build_chroma_filter,
+    compile_category_pattern,
+    extract_query_constraints,
+    filter_records,
+    has_constraints,
+    matches_constraints,
+)
+
+# Threads searching catalog shards, shared by all requests
+_shard_executor = ThreadPoolExecutor(max_workers=int(os.getenv("SHARD_SEARCH_WORKERS", "16")),
+                                     thread_name_prefix="shard")
+
+
+class FilteredRetriever(BaseRetriever):
+    """
+    Similarity retriever that honours category and price constraints
+
+    - No constraints: plain similarity search (same as as_retriever)
+    - Sort requested ("cheapest earbuds"): candidates come from the parsed
+      catalog, sorted by price - no vector search at all
+    - Otherwise: similarity search restricted by a metadata `where` filter,
+      falling back to unfiltered search if the filter matches nothing
+      (e.g. an index built with the legacy character splitter)
+    """
+
+    vectorstore: VectorStore
+    records: List[Dict] = []
+    k: int = 4
+    vocabulary: Dict[str, List[str]] = {}
+    category_pattern: Any = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @classmethod
+    def from_records(cls, vectorstore: VectorStore, records: List[Dict], k: int = 4) -> "FilteredRetriever":
+        """Create a retriever whose category vocabulary comes from the catalog records"""
+        vocabulary = build_category_vocabulary(
+            {r["category"] for r in records if r.get("type") == "product" and r.get("category")}
+        )
+        return cls(
+            vectorstore=vectorstore,
+            records=records,
+            k=k,
+            vocabulary=vocabulary,
+            category_pattern=compile_category_pattern(vocabulary),
+        )
+
+    def _search(self, query: str, where: Dict = None) -> List[Document]:
+        """Similarity search that records each hit's relevance score in metadata"""
+        kwargs = {"filter": where} if where else {}
+        # Query embedding + vector search, bounded by the request deadline
+        results = call_with_deadline(
+            self.vectorstore.similarity_search_with_relevance_scores, query,
+            step="vector search", k=self.k, **kwargs
+        )
+        docs = []
+        for doc, score in results:
+            doc.metadata["relevance_score"] = round(score, 4)
+            docs.append(doc)
+        return docs
+
+    def constraints(self, query: str) -> Dict:
+        """Extract the category/price constraints this retriever applies to a query"""
+        return extract_query_constraints(query, self.vocabulary, self.category_pattern)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        constraints = self.constraints(query)
+        if not has_constraints(constraints):
+            return self._search(query)
+
+        if constraints["sort"] and self.records:
+            ranked = filter_records(self.records, constraints)[:self.k]
+            if ranked:
+                return [
+                    Document(page_content=r["text"], metadata=record_metadata(r))
+                    for r in ranked
+                ]
+
+        where = build_chroma_filter(constraints)
+        if where:
+            docs = self._search(query, where)
+            if docs:
+                return docs
+
+        return self._search(query)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense + lexical retriever merged with Reciprocal Rank Fusion
+
+    The dense side is any retriever (normally a FilteredRetriever fetching
+    fetch_k candidates); the lexical side is the BM25 index built at ingest
+    time, loaded lazily on the first query. If no BM25 index exists the
+    dense results are returned unchanged.
+
+    A sharded catalog has one BM25 index per shard (index_paths); their
+    hits are merged by BM25 score before fusion.
+    """
+
+    dense_retriever: BaseRetriever
+    index_path: str = BM25_INDEX_PATH
+    index_paths: List[str] = []
+    k: int = 4
+    fetch_k: int = 10
+    rrf_k: int = 60
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense_docs = self.dense_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+
+        check_deadline("lexical search")
+        indexes = [load_bm25_index(path) for path in self.index_paths or [self.index_path]]
+        indexes = [index for index in indexes if index is not None]
+        if not indexes:
+            return dense_docs[:self.k]
+
+        lexical_lists = []
+        for index in indexes:
+            hits = []
+            for doc_id, score in index.search(query, self.fetch_k):
+                doc = index.document(doc_id)
+                doc.metadata["bm25_score"] = round(score, 4)
+                hits.append(doc)
+            lexical_lists.append(hits)
+        if len(lexical_lists) == 1:
+            lexical_docs = lexical_lists[0]
+        else:
+            lexical_docs = merge_by_score(lexical_lists, k=self.fetch_k, score_key="bm25_score")
+
+        # Keep the lexical side consistent with any category/price filter
+        if isinstance(self.dense_retriever, (FilteredRetriever, ShardedRetriever)):
+            constraints = self.dense_retriever.constraints(query)
+            if constraints["sort"]:
+                # Already ranked by price from the catalog - fusion would undo the ordering
+                return dense_docs[:self.k]
+            if has_constraints(constraints):
+                lexical_docs = [d for d in lexical_docs if matches_constraints(d.metadata, constraints)]
+
+        return reciprocal_rank_fusion([dense_docs, lexical_docs], k=self.k, rrf_k=self.rrf_k)
+
+
+class ShardedRetriever(BaseRetriever):
+    """
+    Fan-out retriever over one retriever per catalog shard
+
+    - Sort requested ("cheapest earbuds"): ranked by price from the parsed
+      catalog, as FilteredRetriever does - no shard is searched
+    - Category known ("earbuds under 3000"): only the shards holding that
+      category are searched
+    - Otherwise every shard is searched in parallel and the results are
+      merged by relevance score into the top k
+
+    Shard retrievers are FilteredRetrievers, so each applies the query's
+    category/price filter to its own collection and scores are comparable
+    (one embedding model across shards).
+    """
+
+    shards: Dict[str, BaseRetriever]
+    shard_categories: Dict[str, List[str]] = {}
+    records: List[Dict] = []
+    k: int = 4
+    vocabulary: Dict[str, List[str]] = {}
+    category_pattern: Any = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @classmethod
+    def from_shards(cls, shards: Dict[str, BaseRetriever], shard_categories: Dict[str, List[str]],
+                    records: List[Dict], k: int = 4) -> "ShardedRetriever":
+        """
+        Args:
+            shards: Shard name -> retriever over that shard's collection
+            shard_categories: Shard name -> product categories it holds (from shards.json)
+            records: Parsed records of the whole catalog
+        """
+        vocabulary = build_category_vocabulary(
+            {category for categories in shard_categories.values() for category in categories}
+        )
+        return cls(
+            shards=shards,
+            shard_categories=shard_categories,
+            records=records,
+            k=k,
+            vocabulary=vocabulary,
+            category_pattern=compile_category_pattern(vocabulary),
+        )
+
+    def constraints(self, query: str) -> Dict:
+        """Extract the category/price constraints this retriever applies to a query"""
+        return extract_query_constraints(query, self.vocabulary, self.category_pattern)
+
+    def route(self, constraints: Dict) -> List[str]:
+        """Shards that can answer a query: those holding its categories, else all"""
+        wanted = set(constraints["categories"])
+        if wanted:
+            names = [name for name in self.shards if wanted & set(self.shard_categories.get(name, ()))]
+            if names:
+                return names
+        return list(self.shards)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        constraints = self.constraints(query)
+        if constraints["sort"] and self.records:
+            ranked = filter_records(self.records, constraints)[:self.k]
+            if ranked:
+                return [
+                    Document(page_content=r["text"], metadata=record_metadata(r))
+                    for r in ranked
+                ]
+
+        names = self.route(constraints)
+        config = {"callbacks": run_manager.get_child()}
+        if len(names) == 1:
+            docs = self.shards[names[0]].invoke(query, config=config)
+            for doc in docs:
+                doc.metadata["shard"] = names[0]
+            return docs[:self.k]
+
+        # Each search runs in a copy of this context, so the request deadline reaches it
+        futures = {
+            name: _shard_executor.submit(contextvars.copy_context().run, self.shards[name].invoke, query, config)
+            for name in names
+        }
+        results = []
+        for name, future in futures.items():
+            docs = future.result()
+            for doc in docs:
+                doc.metadata["shard"] = name
+            results.append(docs)
+        return merge_by_score(results, k=self.k)
@@ -0,0 +1,375 @@
+"""
+Rule Engine: Data-driven fallback answers (replaces the if-chain in get_concise_response)
+- Rules are declared in response_rules.json, not code
+- All rule keywords and catalog product names are compiled into one
+  Aho-Corasick automaton, so a query is scanned once per request
+- Answers are templated from the parsed catalog (product_info.txt), so
+  prices, warranties and policies never drift from the source data
+- Rules and catalog are hot-reloaded when either file changes
+"""
+
+import json
+import os
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from catalog import catalog_mtime, load_catalog_records, POLICY_SECTION
+
+RULES_PATH = os.getenv("RESPONSE_RULES_PATH", "response_rules.json")
+CATALOG_PATH = os.getenv("CATALOG_PATH", "product_info.txt")
+
+# Sections listed in the product-listing answer
+LISTING_HIGHLIGHTS = 8
+
+PLACEHOLDER = re.compile(r"\{(\w+)(?:\.(\w+))?\}")
+WORD = re.compile(r"[a-z0-9]+")
+
+# Words ignored when matching a question against a product's features
+FEATURE_STOPWORDS = {
+    "a", "an", "and", "are", "can", "do", "does", "for", "has", "have", "how", "i", "in",
+    "include", "includes", "is", "it", "its", "of", "on", "support", "supports", "the",
+    "this", "that", "what", "with", "you", "your", "feature", "features", "much", "tell", "me",
+}
+
+
+# ============================================================================
+# KEYWORD AUTOMATON
+# ============================================================================
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over lowercase keywords and phrases
+
+    Matches respect word boundaries. A keyword ending in "*" only needs a
+    boundary on the left, so "refund*" matches "refund", "refunds" and
+    "refunded". Scanning is a single pass over the text regardless of
+    how many keywords are compiled in.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, int, bool]]] = [[]]
+        for keyword in set(keywords):
+            self._add(keyword)
+        self._build_failure_links()
+
+    def _add(self, keyword: str):
+        prefix = keyword.endswith("*")
+        phrase = keyword.rstrip("*").lower()
+        if not phrase:
+            return
+        state = 0
+        for ch in phrase:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((keyword, len(phrase), prefix))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> List[Tuple[str, int, int]]:
+        """
+        Find all keyword occurrences
+
+        Returns:
+            (keyword, start, end) tuples; keyword is as given (with any "*")
+        """
+        text = text.lower()
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for keyword, length, prefix in self._out[state]:
+                start, end = i - length + 1, i + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if not prefix and end < len(text) and text[end].isalnum():
+                    continue
+                matches.append((keyword, start, end))
+        return matches
+
+    def matches(self, text: str) -> Set[str]:
+        """Set of keywords found in text"""
+        return {keyword for keyword, _, _ in self.find(text)}
+
+
+# ============================================================================
+# RULE ENGINE
+# ============================================================================
+
+class RuleEngine:
+    """
+    Compiled response rules plus the catalog data they template from
+
+    Build with RuleEngine.load(); answer with respond(query).
+    """
+
+    def __init__(self, config: Dict, records: List[Dict]):
+        self.rules = config["rules"]
+        self.yes_no_markers = config.get("yes_no_markers", [])
+        self.products = {r["name"].lower(): r for r in records if r.get("type") == "product" and r.get("name")}
+        self.aliases = {alias.lower(): name.lower() for alias, name in config.get("product_aliases", {}).items()
+                        if name.lower() in self.products}
+        self.facts = self._extract_facts(config.get("facts", {}), records)
+        self.catalog = self._catalog_summary(records)
+
+        keywords = set(self.yes_no_markers)
+        for rule in self.rules:
+            keywords.update(self._rule_keywords(rule))
+        self._keywords = KeywordAutomaton(keywords)
+        self._product_names = KeywordAutomaton(list(self.products) + list(self.aliases))
+
+    @classmethod
+    def load(cls, rules_path: str = RULES_PATH, catalog_path: str = CATALOG_PATH) -> "RuleEngine":
+        """Read the rules file and catalog and compile them"""
+        with open(rules_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        try:
+            records = load_catalog_records(catalog_path)
+        except FileNotFoundError:
+            records = []
+        return cls(config, records)
+
+    @staticmethod
+    def _rule_keywords(rule: Dict) -> Set[str]:
+        keywords = set()
+        when = rule.get("when", {})
+        keywords.update(when.get("any", []))
+        keywords.update(when.get("none", []))
+        for group in when.get("all", []):
+            keywords.update(group)
+        for branch in rule.get("answers", []):
+            keywords.update(branch.get("if_any", []))
+            for group in branch.get("if_all", []):
+                keywords.update(group)
+        return keywords
+
+    @staticmethod
+    def _extract_facts(fact_specs: Dict, records: List[Dict]) -> Dict[str, str]:
+        policies = {r["name"]: r["text"] for r in records if r.get("type") == "policy"}
+        facts = {}
+        for name, spec in fact_specs.items():
+            text = policies.get(spec["policy"], "")
+            if spec.get("lines"):
+                lines = [line.lstrip("- ").strip() for line in text.splitlines()[1:]]
+                if any(lines):
+                    facts[name] = "; ".join(line for line in lines if line)
+                continue
+            match = re.search(spec["pattern"], text)
+            if match:
+                facts[name] = match.group(1).strip()
+        return facts
+
+    @staticmethod
+    def _catalog_summary(records: List[Dict]) -> Dict[str, str]:
+        products = [r for r in records if r.get("type") == "product"]
+        sections = []
+        for record in products:
+            section = record.get("section", "")
+            if section and section != POLICY_SECTION and section not in sections and "PRODUCTS" not in section:
+                sections.append(section)
+        highlights = ", ".join(s.lower() for s in sections[:LISTING_HIGHLIGHTS])
+        if len(sections) > LISTING_HIGHLIGHTS:
+            highlights += ", and more"
+        return {
+            "product_count": str(len(products)),
+            "section_count": str(len(sections)),
+            "highlights": highlights,
+        } if products else {}
+
+    # ------------------------------------------------------------------
+    # Matching
+    # ------------------------------------------------------------------
+
+    def _find_product(self, query: str) -> Optional[Dict]:
+        """Longest product name (or alias) mentioned in the query"""
+        best = None
+        for phrase, start, end in self._product_names.find(query):
+            if best is None or end - start > best[1] - best[0]:
+                best = (start, end, phrase)
+        if best is None:
+            return None
+        phrase = best[2]
+        return self.products.get(phrase) or self.products.get(self.aliases.get(phrase, ""))
+
+    @staticmethod
+    def _any(keywords: List[str], matched: Set[str]) -> bool:
+        return any(k in matched for k in keywords)
+
+    def _conditions_hold(self, when: Dict, query: str, matched: Set[str], product, is_yes_no: bool) -> bool:
+        starts = when.get("starts_with")
+        if starts and not any(query == p or query.startswith(p + " ") for p in starts):
+            return False
+        if "yes_no" in when and when["yes_no"] != is_yes_no:
+            return False
+        if "product" in when and when["product"] != (product is not None):
+            return False
+        if "any" in when and not self._any(when["any"], matched):
+            return False
+        if any(not self._any(group, matched) for group in when.get("all", [])):
+            return False
+        if self._any(when.get("none", []), matched):
+            return False
+        return True
+
+    def _branch_applies(self, branch: Dict, matched: Set[str], product) -> bool:
+        if "if_any" in branch and not self._any(branch["if_any"], matched):
+            return False
+        if any(not self._any(group, matched) for group in branch.get("if_all", [])):
+            return False
+        if "if_product" in branch:
+            wanted = branch["if_product"]
+            if product is None:
+                return False
+            if isinstance(wanted, dict) and any(product.get(k) != v for k, v in wanted.items()):
+                return False
+        return True
+
+    # ------------------------------------------------------------------
+    # Templating
+    # ------------------------------------------------------------------
+
+    def _resolve_feature(self, query: str, product: Dict) -> Optional[str]:
+        """Pick the product feature/spec item that best matches the question"""
+        name_words = set(WORD.findall(product["name"].lower()))
+        words = [w for w in WORD.findall(query.lower()) if w not in FEATURE_STOPWORDS and w not in name_words]
+        if not words:
+            return None
+        items = [i.strip() for field in ("features", "specifications")
+                 for i in product.get(field, "").split(",") if i.strip()]
+        best, best_score = None, 0
+        for item in items:
+            item_words = WORD.findall(item.lower())
+            score = sum(
+                1 for w in words
+                if any(iw == w or (min(len(iw), len(w)) >= 3 and (iw.startswith(w) or w.startswith(iw)))
+                       for iw in item_words)
+            )
+            if score > best_score:
+                best, best_score = item, score
+        return best
+
+    def _render(self, template: str, values: Dict) -> Optional[str]:
+        """Fill placeholders; None if any value is missing"""
+        missing = False
+
+        def replace(match):
+            nonlocal missing
+            scope, key = match.group(1), match.group(2)
+            value = values.get(scope)
+            if key is not None:
+                value = value.get(key) if isinstance(value, dict) else None
+            if value is None or value == "":
+                missing = True
+                return ""
+            return str(value)
+
+        text = PLACEHOLDER.sub(replace, template)
+        return None if missing else text
+
+    def _answer(self, spec, query: str, values: Dict) -> Optional[str]:
+        if isinstance(spec, str):
+            return self._render(spec, values)
+        if spec.get("resolver") == "feature" and values.get("product"):
+            feature = self._resolve_feature(query, values["product"])
+            if feature:
+                return self._render(spec["template"], {**values, "feature": feature})
+        return None
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def match(self, query: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Evaluate the rules against a query
+
+        Returns:
+            (answer, rule id) of the first rule that produced an answer
+        """
+        query_lower = query.lower().strip()
+        matched = self._keywords.matches(query_lower)
+        product = self._find_product(query_lower)
+        is_yes_no = query.strip().endswith("?") and self._any(self.yes_no_markers, matched)
+        values = {"product": product, "facts": self.facts, "catalog": self.catalog}
+
+        for rule in self.rules:
+            if not self._conditions_hold(rule.get("when", {}), query_lower, matched, product, is_yes_no):
+                continue
+            if "answers" in rule:
+                for branch in rule["answers"]:
+                    if not self._branch_applies(branch, matched, product):
+                        continue
+                    answer = self._answer(branch.get("answer", branch), query_lower, values)
+                    if answer:
+                        return answer, rule["id"]
+            else:
+                answer = self._answer(rule.get("answer"), query_lower, values)
+                if answer:
+                    return answer, rule["id"]
+        return None, None
+
+    def respond(self, query: str) -> str:
+        """Answer a query from the rules (generic message if nothing matches)"""
+        answer, _ = self.match(query)
+        return answer or "Information not available. Please contact support@techgear.com"
+
+
+# ============================================================================
+# HOT RELOAD
+# ============================================================================
+
+_engine: Optional[RuleEngine] = None
+_engine_mtimes: Tuple[float, float] = (0.0, 0.0)
+_engine_lock = threading.Lock()
+
+
+def _mtime(path: str) -> float:
+    try:
+        return catalog_mtime(path)
+    except OSError:
+        return 0.0
+
+
+def get_rule_engine(rules_path: str = RULES_PATH, catalog_path: str = CATALOG_PATH) -> RuleEngine:
+    """
+    Get the compiled rule engine, recompiling if the rules or catalog changed
+
+    A broken rules file keeps the previously compiled engine in service.
+    """
+    global _engine, _engine_mtimes
+    mtimes = (_mtime(rules_path), _mtime(catalog_path))
+    if _engine is not None and mtimes == _engine_mtimes:
+        return _engine
+
+    with _engine_lock:
+        if _engine is None or mtimes != _engine_mtimes:
+            try:
+                _engine = RuleEngine.load(rules_path, catalog_path)
+                print(f"✓ Response rules loaded: {len(_engine.rules)} rules, {len(_engine.products)} products")
+            except (OSError, ValueError, KeyError) as e:
+                if _engine is None:
+                    raise
+                print(f"Warning: keeping previous response rules, reload failed: {e}")
+            _engine_mtimes = mtimes
+    return _engine
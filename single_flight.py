@@ -0,0 +1,101 @@
+"""
+Single-Flight Request Coalescing
+Concurrent identical queries (e.g. everyone asking about the same promotion)
+share one workflow run instead of each making its own classifier + RAG calls.
+
+Only context-free queries are coalesced: a query enhanced with a session's
+last product depends on that session, so it always runs on its own.
+
+All methods are called from the server's event loop, so no locking is needed.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from query_normalizer import normalize_key
+
+
+def coalescing_key(query: str) -> str:
+    """Normalize a query so trivially different spellings share a flight (and a cache entry)"""
+    return normalize_key(query)
+
+
+class Flight:
+    """One in-progress computation and the requests waiting on it"""
+
+    def __init__(self, key: Optional[str], task: asyncio.Task, deadline):
+        self.key = key
+        self.task = task
+        self.deadline = deadline
+        self.waiters = 1
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls by key
+
+    Usage:
+        flight, coalesced = flights.join(key, lambda: run(...), deadline)
+        result = await flight.task
+        flights.leave(flight)
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self.counters = {"started": 0, "coalesced": 0, "abandoned": 0}
+
+    def join(self, key: Optional[str], start: Callable[[], Awaitable], deadline) -> Tuple[Flight, bool]:
+        """
+        Join the in-flight computation for key, or start a new one
+
+        Args:
+            key: Coalescing key (None = never share)
+            start: Creates the coroutine to run when no flight exists
+            deadline: Deadline the computation runs under (the first
+                request's); cancelled only when every waiter has left
+
+        Returns:
+            (flight, True if an existing flight was joined)
+        """
+        if key is not None:
+            flight = self._flights.get(key)
+            if flight is not None and not flight.task.done():
+                flight.waiters += 1
+                self.counters["coalesced"] += 1
+                return flight, True
+
+        task = asyncio.ensure_future(start())
+        flight = Flight(key, task, deadline)
+        self.counters["started"] += 1
+        if key is not None:
+            self._flights[key] = flight
+        task.add_done_callback(lambda t: self._finish(flight))
+        return flight, False
+
+    def _finish(self, flight: Flight):
+        if flight.key is not None and self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+        if not flight.task.cancelled():
+            # Mark the exception as retrieved even if every waiter has left
+            flight.task.exception()
+
+    def leave(self, flight: Flight) -> bool:
+        """
+        A waiter stops waiting (finished, disconnected or timed out)
+
+        Returns:
+            True if it was the last waiter of an unfinished flight; the
+            caller should then cancel the flight's deadline
+        """
+        flight.waiters -= 1
+        if flight.waiters > 0 or flight.task.done():
+            return False
+        # Nobody wants the result any more - new arrivals must not join it
+        if flight.key is not None and self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+        self.counters["abandoned"] += 1
+        return True
+
+    def snapshot(self) -> Dict:
+        """Counters plus the number of flights currently running"""
+        return {"in_flight": len(self._flights), **self.counters}
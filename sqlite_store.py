@@ -0,0 +1,32 @@
+"""
+SQLite Store: Shared connection setup for the on-disk caches
+The response and generation caches keep one connection per thread on a
+WAL-mode database, so worker threads read concurrently and several
+processes on the same host can share one file.
+"""
+
+import os
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """Thread-local connections to one SQLite file, created with `schema` on first use"""
+
+    def __init__(self, path: str, schema: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.schema = schema
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+    def connect(self) -> sqlite3.Connection:
+        """This thread's connection (autocommit; each statement is its own transaction)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.schema)
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,175 @@
+"""
+Unit tests for admission.py: token buckets, rate limiters and the
+concurrency limiter's queue
+
+Run: python -m pytest -q test_admission.py
+"""
+
+import asyncio
+
+import pytest
+
+import admission
+from admission import AdmissionController, AdmissionRejected, RateLimiter, TokenBucket
+
+
+class FakeClock:
+    """Stands in for the time module inside admission.py"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission, "time", clock)
+    return clock
+
+
+# ============================================================================
+# TOKEN BUCKETS
+# ============================================================================
+
+def test_bucket_allows_burst_then_reports_wait(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert [bucket.try_acquire()[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = bucket.try_acquire()
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+
+
+def test_bucket_refills_at_rate_up_to_capacity(clock):
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.try_acquire()
+    bucket.try_acquire()
+    clock.now += 1.5
+    assert bucket.try_acquire() == (True, 0.0)
+    assert not bucket.try_acquire()[0]
+
+    clock.now += 100
+    assert [bucket.try_acquire()[0] for _ in range(3)] == [True, True, False]
+
+
+def test_bucket_without_rate_never_refills(clock):
+    bucket = TokenBucket(rate=0, capacity=1)
+    assert bucket.try_acquire()[0]
+    clock.now += 3600
+    assert bucket.try_acquire() == (False, 60.0)
+
+
+def test_rate_limiter_keeps_one_bucket_per_key(clock):
+    limiter = RateLimiter(rate=1, burst=1)
+    assert limiter.check("a")[0]
+    assert not limiter.check("a")[0]
+    assert limiter.check("b")[0]
+
+
+def test_rate_limiter_skips_missing_keys_and_zero_rate(clock):
+    assert all(RateLimiter(rate=1, burst=1).check(None)[0] for _ in range(5))
+    assert all(RateLimiter(rate=0, burst=1).check("a")[0] for _ in range(5))
+
+
+def test_rate_limiter_evicts_least_recently_used(clock):
+    limiter = RateLimiter(rate=1, burst=1, max_keys=2)
+    limiter.check("a")
+    limiter.check("b")
+    limiter.check("a")
+    limiter.check("c")  # evicts "b", the least recently used
+    assert list(limiter._buckets) == ["a", "c"]
+    assert limiter.check("b")[0]
+
+
+def test_check_rate_limits_rejects_with_429(clock):
+    controller = AdmissionController()
+    controller.ip_limiter = RateLimiter(rate=0.5, burst=1)
+    controller.check_rate_limits("10.0.0.1", None)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.check_rate_limits("10.0.0.1", None)
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after == 2
+    assert controller.counters["rate_limited_ip"] == 1
+
+
+# ============================================================================
+# CONCURRENCY LIMITER
+# ============================================================================
+
+def test_slot_limits_concurrency_and_queues_waiters():
+    async def scenario():
+        controller = AdmissionController(max_inflight=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        order = []
+
+        async def request(name):
+            async with controller.slot():
+                order.append(name)
+                await release.wait()
+
+        first = asyncio.ensure_future(request("first"))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(request("second"))
+        await asyncio.sleep(0)
+        assert (controller.inflight, controller.waiting) == (1, 1)
+
+        # Queue is full: the next request is turned away at once
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.slot():
+                pass
+        assert rejected.value.status_code == 503
+
+        release.set()
+        await asyncio.gather(first, second)
+        return controller, order
+
+    controller, order = asyncio.run(scenario())
+    assert order == ["first", "second"]
+    assert (controller.inflight, controller.waiting) == (0, 0)
+    assert controller.counters["admitted"] == 2
+    assert controller.counters["admitted_after_wait"] == 1
+    assert controller.counters["rejected_queue_full"] == 1
+
+
+def test_slot_rejects_when_queue_wait_times_out():
+    async def scenario():
+        controller = AdmissionController(max_inflight=1, max_queue=4, queue_timeout=5)
+        release = asyncio.Event()
+
+        async def holder():
+            async with controller.slot():
+                await release.wait()
+
+        task = asyncio.ensure_future(holder())
+        await asyncio.sleep(0)
+        # The request's own (shorter) timeout bounds the wait
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.slot(timeout=0.01):
+                pass
+        assert controller.waiting == 0
+        release.set()
+        await task
+        return controller, rejected.value
+
+    controller, rejected = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert controller.counters["rejected_queue_timeout"] == 1
+    assert controller.inflight == 0
+
+
+def test_slot_is_released_when_the_block_raises():
+    async def scenario():
+        controller = AdmissionController(max_inflight=1)
+        with pytest.raises(ValueError):
+            async with controller.slot():
+                raise ValueError("workflow failed")
+        # The slot is free again without waiting
+        async with controller.slot(timeout=0):
+            pass
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert controller.counters["admitted"] == 2
+    assert controller.counters["admitted_after_wait"] == 0
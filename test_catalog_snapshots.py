@@ -0,0 +1,178 @@
+"""
+Unit tests for catalog_snapshots.py: startup load, background reload and
+swap, and pruning of old snapshot directories while requests pin them
+
+Embedding is replaced by a builder that only lays out the snapshot
+directory, so no vector store or model is needed.
+
+Run: python -m pytest -q test_catalog_snapshots.py
+"""
+
+import itertools
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from catalog import catalog_version
+from catalog_snapshots import CatalogSnapshot, SnapshotManager
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = tmp_path / "product_info.txt"
+    shutil.copyfile("product_info.txt", path)
+    return str(path)
+
+
+def make_snapshot_dir(snapshot_dir: str, name: str, catalog: str) -> str:
+    """Snapshot directory as SnapshotManager._build lays it out (catalog copy + chroma/)"""
+    directory = os.path.join(snapshot_dir, name)
+    os.makedirs(os.path.join(directory, "chroma"))
+    shutil.copyfile(catalog, os.path.join(directory, os.path.basename(catalog)))
+    return directory
+
+
+@pytest.fixture
+def manager(tmp_path, catalog):
+    """Manager whose startup snapshot and reloads live under tmp_path/snapshots"""
+    snapshot_dir = str(tmp_path / "snapshots")
+    make_snapshot_dir(snapshot_dir, f"{catalog_version(catalog)}-0", catalog)
+    manager = SnapshotManager(catalog, snapshot_dir)
+    manager.build_gate = threading.Event()
+    manager.build_gate.set()
+    counter = itertools.count(1)
+
+    def build(version):
+        manager.build_gate.wait(5)
+        directory = make_snapshot_dir(manager.snapshot_dir, f"{version}-{next(counter)}", catalog)
+        return CatalogSnapshot(version, os.path.join(directory, os.path.basename(catalog)),
+                               os.path.join(directory, "chroma"), os.path.join(directory, "bm25_index.json"))
+
+    manager._build = build
+    manager.load_current()
+    return manager
+
+
+def wait_idle(manager: SnapshotManager):
+    deadline = time.monotonic() + 5
+    while manager._build_lock.locked() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not manager._build_lock.locked()
+
+
+def snapshot_dirs(manager: SnapshotManager):
+    return sorted(os.listdir(manager.snapshot_dir))
+
+
+def reload(manager: SnapshotManager) -> CatalogSnapshot:
+    assert manager.reload(force=True)["status"] == "started"
+    wait_idle(manager)
+    return manager.current
+
+
+# ============================================================================
+# LOAD AND RELOAD
+# ============================================================================
+
+def test_load_current_reuses_the_newest_snapshot_of_the_version(manager, catalog):
+    version = catalog_version(catalog)
+    make_snapshot_dir(manager.snapshot_dir, f"{version}-5", catalog)
+    make_snapshot_dir(manager.snapshot_dir, "otherversion-9", catalog)
+    snapshot = manager.load_current()
+    assert snapshot.version == version
+    assert snapshot.persist_directory == os.path.join(manager.snapshot_dir, f"{version}-5", "chroma")
+    assert snapshot.product_names
+
+
+def test_live_does_not_load_a_snapshot(tmp_path, catalog):
+    manager = SnapshotManager(catalog, str(tmp_path / "snapshots"))
+    assert manager.live is None
+    assert manager.status()["current"] is None
+
+
+def test_unchanged_catalog_is_not_rebuilt(manager):
+    assert manager.reload()["status"] == "unchanged"
+    assert manager.counters["unchanged"] == 1
+
+
+def test_changed_catalog_is_built_in_the_background_and_swapped(manager, catalog):
+    old = manager.current
+    with open(catalog, "a", encoding="utf-8") as f:
+        f.write("\n")
+    new_version = catalog_version(catalog)
+
+    manager.build_gate.clear()
+    assert manager.reload() == {"status": "started", "version": new_version}
+    # A second reload while building does not start another build
+    assert manager.reload()["status"] == "in_progress"
+    # Requests keep getting the old snapshot until the build finishes
+    assert manager.current is old
+
+    manager.build_gate.set()
+    wait_idle(manager)
+    assert manager.current.version == new_version
+    assert manager.status()["previous"] == old.version
+    assert manager.counters["reloads"] == 1
+
+
+def test_failed_build_keeps_serving_the_current_snapshot(manager):
+    old = manager.current
+
+    def broken(version):
+        raise RuntimeError("embedding failed")
+
+    manager._build = broken
+    manager.reload(force=True)
+    wait_idle(manager)
+    assert manager.current is old
+    assert manager.counters["failed"] == 1
+    assert manager.last_error == "RuntimeError: embedding failed"
+
+
+# ============================================================================
+# PRUNE AND PINNING
+# ============================================================================
+
+def test_prune_keeps_only_current_and_previous(manager):
+    for _ in range(3):
+        reload(manager)
+    version = manager.current.version
+    assert snapshot_dirs(manager) == [f"{version}-2", f"{version}-3"]
+
+
+def test_pinned_snapshot_survives_reloads_until_released(manager):
+    pinned = manager.acquire()
+    for _ in range(3):
+        reload(manager)
+    # Neither current nor previous, but a request still reads it
+    assert os.path.isdir(pinned.persist_directory)
+    assert manager.status()["pinned"] == 1
+    assert manager.status()["awaiting_release"] == 1
+
+    manager.release(pinned)
+    assert not os.path.exists(os.path.dirname(pinned.persist_directory))
+    assert manager.status()["pinned"] == 0
+    assert manager.status()["awaiting_release"] == 0
+
+
+def test_directory_is_deleted_only_after_the_last_lease(manager):
+    first = manager.acquire()
+    second = manager.acquire()
+    assert first is second
+    reload(manager)
+    reload(manager)
+
+    manager.release(first)
+    assert os.path.isdir(first.persist_directory)
+    manager.release(second)
+    assert not os.path.exists(os.path.dirname(first.persist_directory))
+
+
+def test_released_snapshot_that_is_still_current_is_kept(manager):
+    with manager.pin() as snapshot:
+        assert manager.status()["pinned"] == 1
+    assert os.path.isdir(snapshot.persist_directory)
+    assert manager.status()["pinned"] == 0
@@ -0,0 +1,60 @@
+"""
+Unit tests for deadlines.py: running blocking calls under a request
+deadline and the messages they time out with
+
+Run: python -m pytest -q test_deadlines.py
+"""
+
+import threading
+
+import pytest
+
+from deadlines import Deadline, DeadlineExceeded, call_with_deadline, deadline_scope
+
+
+class LenientDeadline(Deadline):
+    """Deadline whose check() never fires, so call_with_deadline's own timeout does"""
+
+    def check(self, step: str = "request"):
+        pass
+
+
+def test_call_without_a_deadline_runs_inline():
+    assert call_with_deadline(threading.get_ident) == threading.get_ident()
+
+
+def test_call_within_budget_returns_its_result():
+    with deadline_scope(Deadline(5)):
+        assert call_with_deadline(lambda x: x * 2, 21, step="double", cap=1) == 42
+
+
+def test_step_cap_is_named_when_it_applied():
+    release = threading.Event()
+    with deadline_scope(Deadline(5)):
+        with pytest.raises(DeadlineExceeded, match=r"^retrieval: step budget of 0.05s exceeded$"):
+            call_with_deadline(release.wait, 5, step="retrieval", cap=0.05)
+    release.set()
+
+
+def test_remaining_budget_is_named_without_a_cap():
+    release = threading.Event()
+    with deadline_scope(LenientDeadline(0.05)):
+        with pytest.raises(DeadlineExceeded, match=r"^generation: remaining budget of 0.05s exceeded$"):
+            call_with_deadline(release.wait, 5, step="generation")
+    release.set()
+
+
+def test_remaining_budget_is_named_when_below_the_cap():
+    release = threading.Event()
+    with deadline_scope(LenientDeadline(0.05)):
+        with pytest.raises(DeadlineExceeded, match="remaining budget"):
+            call_with_deadline(release.wait, 5, step="generation", cap=10)
+    release.set()
+
+
+def test_expired_request_deadline_is_reported_as_such():
+    release = threading.Event()
+    with deadline_scope(Deadline(0.05)):
+        with pytest.raises(DeadlineExceeded, match=r"deadline of 0.1s exceeded"):
+            call_with_deadline(release.wait, 5, step="generation")
+    release.set()
@@ -0,0 +1,76 @@
+"""
+Unit tests for intent_classifier.py: hashed features, training,
+prediction and saving/loading the model
+
+Run: python -m pytest -q test_intent_classifier.py
+"""
+
+import numpy as np
+import pytest
+
+from intent_classifier import IntentClassifier, _hashed, embed_queries
+
+EXAMPLES = [
+    ("what is the return policy", "returns"),
+    ("how do i return an item", "returns"),
+    ("can i get a refund", "returns"),
+    ("refund for damaged product", "returns"),
+    ("price of the smartwatch", "products"),
+    ("tell me about wireless earbuds", "products"),
+    ("which laptop has the best battery", "products"),
+    ("do you sell power banks", "products"),
+    ("hello", "general"),
+    ("what are your support hours", "general"),
+    ("do you offer cash on delivery", "general"),
+    ("thanks", "general"),
+    ("what's the weather today", "unknown"),
+    ("tell me a joke", "unknown"),
+    ("who won the match", "unknown"),
+    ("asdfghjkl", "unknown"),
+]
+
+
+@pytest.fixture(scope="module")
+def model():
+    queries, categories = zip(*EXAMPLES)
+    return IntentClassifier.train(list(queries), list(categories), threshold=0.5, training_version="test")
+
+
+def test_hashed_indices_can_be_counted():
+    indices, weights = _hashed([("w:refund", 1.0), ("c:#re", 0.5)], 64)
+    assert indices.dtype == np.intp
+    assert ((indices >= 0) & (indices < 64)).all()
+    # np.bincount rejects uint64 indices before NumPy 2
+    assert np.bincount(indices, weights=weights, minlength=64).shape == (64,)
+
+
+def test_embeddings_are_normalized_and_deterministic():
+    vectors = embed_queries(["return policy", "", "return policy"], dimensions=256)
+    assert vectors.shape == (3, 256)
+    assert np.linalg.norm(vectors[0]) == pytest.approx(1.0, abs=1e-5)
+    assert not vectors[1].any()
+    assert np.array_equal(vectors[0], vectors[2])
+
+
+def test_predict_known_queries(model):
+    category, confidence = model.predict("what is your return policy?")
+    assert category == "returns"
+    assert confidence >= model.threshold
+    assert model.predict("price of the earbuds")[0] == "products"
+
+
+def test_unsure_prediction_defers_to_the_llm(model):
+    unsure = IntentClassifier(model.examples, model.targets, model.labels, threshold=1.01)
+    category, confidence = unsure.predict("what is your return policy?")
+    assert category is None
+    assert 0 < confidence <= 1
+
+
+def test_save_and_load_round_trip(model, tmp_path):
+    path = str(tmp_path / "models" / "intent.npz")
+    model.save(path)
+    loaded = IntentClassifier.load(path, threshold=model.threshold)
+    assert loaded.labels == model.labels
+    assert loaded.training_version == "test"
+    queries = ["can i get a refund", "do you sell laptops", "hi there"]
+    assert loaded.predict_batch(queries) == model.predict_batch(queries)
@@ -0,0 +1,192 @@
+"""
+Unit tests for model_router.py with in-process fake models: hedging,
+failover, latency measurement and how attempts settle circuit breakers
+
+Run: python -m pytest -q test_model_router.py
+"""
+
+import threading
+import time
+
+import pytest
+
+from admission import MAX_INFLIGHT
+from deadlines import Deadline, deadline_scope
+from model_router import ModelRouter, ModelUnavailableError
+
+
+class FakeModel:
+    """invoke() answers, raises, or blocks until released"""
+
+    def __init__(self, answer: str = "ok", error: Exception = None, blocked: bool = False):
+        self.answer = answer
+        self.error = error
+        self.release = threading.Event()
+        if not blocked:
+            self.release.set()
+        self.called = threading.Event()
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        self.called.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.answer
+
+
+@pytest.fixture
+def routers():
+    """Routers built by a test; their pools are drained afterwards"""
+    created = []
+
+    def build(models, **kwargs):
+        router = ModelRouter(models, **kwargs)
+        created.append((router, [model for _, model in models]))
+        return router
+
+    yield build
+    for router, models in created:
+        for model in models:
+            model.release.set()
+        router._executor.shutdown(wait=True)
+
+
+def test_primary_answers_without_hedging(routers):
+    primary, backup = FakeModel("a"), FakeModel("b")
+    router = routers([("a", primary), ("b", backup)], hedge_delay=1)
+    assert router.invoke("q") == "a"
+    assert backup.calls == 0
+    assert router.counters["wins"] == {"a": 1, "b": 0}
+    assert router.counters["hedged"] == 0
+
+
+def test_slow_primary_is_hedged_and_the_backup_wins(routers):
+    primary, backup = FakeModel("a", blocked=True), FakeModel("b")
+    router = routers([("a", primary), ("b", backup)], hedge_delay=0.05, timeout=5)
+    assert router.invoke("q") == "b"
+    assert router.counters["hedged"] == 1
+    assert router.counters["wins"]["b"] == 1
+
+
+def test_failed_primary_fails_over(routers):
+    primary, backup = FakeModel(error=RuntimeError("quota")), FakeModel("b")
+    router = routers([("a", primary), ("b", backup)], hedge_delay=5, timeout=5)
+    assert router.invoke("q") == "b"
+    assert router.counters["failovers"] == 1
+    assert router.breakers["a"].failures == 1
+    assert router.breakers["b"].failures == 0
+
+
+def test_every_model_failing_raises(routers):
+    router = routers([("a", FakeModel(error=RuntimeError("down"))), ("b", FakeModel(error=RuntimeError("down")))],
+                     hedge_delay=5, timeout=5)
+    with pytest.raises(ModelUnavailableError, match="a: down; b: down"):
+        router.invoke("q")
+    assert router.counters["unavailable"] == 1
+
+
+def test_queued_call_is_not_hedged_or_timed_from_submission(routers):
+    primary, backup = FakeModel("a"), FakeModel("b")
+    router = routers([("a", primary), ("b", backup)], hedge_delay=0.05, timeout=5, max_workers=1)
+    # Occupy the only worker: the primary's call waits in the executor queue
+    blocker = threading.Event()
+    router._executor.submit(blocker.wait, 5)
+
+    answers = []
+    caller = threading.Thread(target=lambda: answers.append(router.invoke("q")))
+    caller.start()
+    time.sleep(0.3)
+    assert not primary.called.is_set()
+    assert router.counters["hedged"] == 0
+
+    blocker.set()
+    caller.join(5)
+    assert answers == ["a"]
+    assert backup.calls == 0
+    # The queue wait is not part of the model's latency
+    assert router.latencies["a"].percentile(50) < 0.1
+
+
+def test_default_pool_covers_inflight_requests_and_hedges(routers):
+    router = routers([("a", FakeModel()), ("b", FakeModel())])
+    assert router._executor._max_workers == MAX_INFLIGHT * 3
+
+
+# ============================================================================
+# SETTLING ATTEMPTS
+# ============================================================================
+
+def wait_for_settle(router, name: str, model: FakeModel):
+    """Let a released call finish and settle its attempt"""
+    model.release.set()
+    deadline = time.monotonic() + 5
+    while router.latencies[name].count() == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+
+def test_router_timeout_counts_against_the_model(routers):
+    model = FakeModel(blocked=True)
+    router = routers([("a", model)], timeout=0.1, hedge_delay=5)
+    with pytest.raises(ModelUnavailableError, match="no answer within"):
+        router.invoke("q")
+    assert router.breakers["a"].failures == 1
+    assert router.counters["timeouts"] == 1
+
+    # The late answer does not settle the attempt a second time
+    wait_for_settle(router, "a", model)
+    assert router.breakers["a"].failures == 1
+
+
+def test_short_request_budget_does_not_blame_a_healthy_model(routers):
+    model = FakeModel(blocked=True)
+    router = routers([("a", model)], timeout=5, hedge_delay=5)
+    with deadline_scope(Deadline(0.1)):
+        with pytest.raises(ModelUnavailableError):
+            router.invoke("q")
+    assert router.breakers["a"].failures == 0
+
+    # Answering well within the router timeout settles the attempt as a success
+    wait_for_settle(router, "a", model)
+    assert router.breakers["a"].state == "closed"
+    assert router.breakers["a"].failures == 0
+
+
+def test_cancelled_request_leaves_circuits_alone(routers):
+    model = FakeModel(blocked=True)
+    router = routers([("a", model)], timeout=5, hedge_delay=5)
+    deadline = Deadline(5)
+    threading.Timer(0.05, deadline.cancel, args=("client disconnected",)).start()
+    with deadline_scope(deadline):
+        with pytest.raises(ModelUnavailableError, match="client disconnected"):
+            router.invoke("q")
+    assert router.breakers["a"].failures == 0
+
+
+def test_circuit_opens_after_repeated_failures_and_skips_the_model(routers):
+    failing, backup = FakeModel(error=RuntimeError("down")), FakeModel("b")
+    router = routers([("a", failing), ("b", backup)], timeout=5, hedge_delay=5,
+                     failure_threshold=2, reset_timeout=60)
+    router.invoke("q")
+    router.invoke("q")
+    assert router.breakers["a"].state == "open"
+
+    calls = failing.calls
+    assert router.invoke("q") == "b"
+    assert failing.calls == calls
+    assert router.stats()["models"]["a"]["circuit"] == "open"
+
+
+def test_half_open_trial_success_closes_the_circuit(routers):
+    model = FakeModel(error=RuntimeError("down"))
+    router = routers([("a", model)], timeout=5, hedge_delay=5, failure_threshold=1, reset_timeout=0.05)
+    with pytest.raises(ModelUnavailableError):
+        router.invoke("q")
+    assert router.breakers["a"].state == "open"
+
+    time.sleep(0.1)
+    model.error = None
+    assert router.invoke("q") == "ok"
+    assert router.breakers["a"].state == "closed"
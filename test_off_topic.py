@@ -0,0 +1,81 @@
+"""
+Unit tests for off_topic.py: which queries are shed before classification
+and which go on to the classifier
+
+Run: python -m pytest -q test_off_topic.py
+"""
+
+import pytest
+
+from catalog import load_catalog_records
+from off_topic import OffTopicGate
+
+
+@pytest.fixture
+def gate():
+    return OffTopicGate(load_catalog_records("product_info.txt"))
+
+
+# ============================================================================
+# SHED
+# ============================================================================
+
+@pytest.mark.parametrize("query", [
+    "what's the weather",
+    "tell me a joke",
+    "2+2",
+    "what is the capital of France",
+])
+def test_off_topic_queries_are_shed(gate, query):
+    assert gate.check(query) == "off_topic"
+
+
+def test_off_topic_words_are_not_typos_of_catalog_words(gate):
+    # "weather" is one letter from "leather"; "jokee" is one from "joke"
+    assert "weather" not in gate.vocabulary
+    assert gate.check("tell me a jokee") == "off_topic"
+
+
+# ============================================================================
+# CLASSIFIED
+# ============================================================================
+
+@pytest.mark.parametrize("query", [
+    "do you have airpods",
+    "price of PowerMax 20000",
+    "where is my parcel",
+    "I was overcharged",
+    "How do I reset",
+    # An off-topic word next to a store word is still a shopping question
+    "is the watch weather resistant",
+])
+def test_store_queries_are_classified(gate, query):
+    assert gate.check(query) is None
+
+
+@pytest.mark.parametrize("query", [
+    "my headphnes stopped working",
+    "hedphones",
+    "headphoness",
+    "weather resistant headphnes",
+])
+def test_typos_of_store_words_are_known(gate, query):
+    assert gate.check(query) is None
+    assert gate.counters["no_catalog_terms"] == 0
+
+
+def test_unknown_words_are_classified_not_shed(gate):
+    # Missing from the vocabulary is not evidence of off-topic
+    assert gate.check("asdfghjkl") is None
+    assert gate.check("where is my parsel") is None
+    assert gate.check("whats the wether") is None
+    assert gate.counters["off_topic"] == 0
+
+
+def test_snapshot_reports_shed_ratio(gate):
+    assert gate.snapshot()["shed_ratio"] is None
+    for query in ["tell me a joke", "do you have airpods", "asdfghjkl", "2+2"]:
+        gate.check(query)
+    assert gate.snapshot() == {
+        "checked": 4, "off_topic": 2, "no_catalog_terms": 1, "shed": 2, "shed_ratio": 0.5,
+    }
@@ -0,0 +1,81 @@
+"""
+Unit tests for policy_answers.py: which policy questions are answered from
+the precomputed table and which fall through to RAG
+
+Run: python -m pytest -q test_policy_answers.py
+"""
+
+import pytest
+
+from catalog import load_product_names
+from policy_answers import PolicyAnswers, build_policy_answers, render_answer
+
+
+@pytest.fixture(scope="module")
+def answers():
+    table = build_policy_answers(output_path=None)
+    return PolicyAnswers(table, load_product_names("product_info.txt"))
+
+
+def intent_id(answers: PolicyAnswers, query: str):
+    _, intent = answers.match(query)
+    return intent["id"] if intent else None
+
+
+# ============================================================================
+# ANSWERED
+# ============================================================================
+
+@pytest.mark.parametrize("query, expected", [
+    ("What is your return policy?", "return_policy"),
+    ("What is the warranty?", "warranty_policy"),
+    ("Do you offer installation services?", "installation"),
+    ("Can I pay with gpay?", "upi"),
+])
+def test_plain_policy_questions_are_answered(answers, query, expected):
+    assert intent_id(answers, query) == expected
+
+
+def test_yes_no_question_covered_by_the_answer_gets_yes(answers):
+    answer, _ = answers.match("Is shipping free?")
+    assert answer.startswith("Yes. Free shipping")
+    assert answers.match("Do you offer EMI?")[0].startswith("Yes. EMI")
+    assert answers.match("Do you offer COD?")[0].startswith("Yes. Cash on Delivery")
+
+
+def test_yes_only_when_the_answer_states_what_was_asked(answers):
+    # "gpay" is a UPI keyword, but the answer does not say it
+    answer, intent = answers.match("Can I pay with gpay?")
+    assert intent["id"] == "upi"
+    assert not answer.startswith("Yes.")
+
+
+# ============================================================================
+# FALL THROUGH TO RAG
+# ============================================================================
+
+@pytest.mark.parametrize("query", [
+    "Is international shipping free?",
+    "Do you offer EMI on debit cards?",
+    "Do you accept crypto payments?",
+    "Can I pay with PayPal?",
+])
+def test_qualifiers_the_answer_does_not_cover_fall_through(answers, query):
+    assert answers.match(query) == (None, None)
+
+
+@pytest.mark.parametrize("query", [
+    "warranty on SmartWatch Pro X",
+    "Can I return within 30 days?",
+    "I bought headphones last month and want to know if the return policy still applies to them",
+    "",
+])
+def test_product_numeric_and_long_questions_fall_through(answers, query):
+    assert answers.match(query) == (None, None)
+
+
+def test_render_answer_selects_bullets():
+    bullets = ["free shipping on orders above 1000", "express delivery available"]
+    assert render_answer(bullets, ["express"]) == "Express delivery available."
+    assert render_answer(bullets, []) == "Free shipping on orders above 1000. Express delivery available."
+    assert render_answer(bullets, ["drone"]) is None
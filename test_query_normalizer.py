@@ -0,0 +1,113 @@
+"""
+Unit tests for query_normalizer.py: retrieval rewrites and cache keys
+(response cache, request coalescing and classification cache)
+
+Run: python -m pytest -q test_query_normalizer.py
+"""
+
+import pytest
+
+from catalog import load_catalog_records
+from query_normalizer import QueryNormalizer, sku_aliases
+
+RECORDS = [
+    {"type": "product", "name": "SmartWatch Pro X", "sku": "SW-PRO-X-001"},
+    {"type": "product", "name": "Weather Station WiFi", "sku": "WEATHER-148"},
+    {"type": "product", "name": "Smart Bike Lock", "sku": "BIKE-LOCK-090"},
+    # Two SKUs share "PB-MINI": the prefix alone names neither
+    {"type": "product", "name": "Power Bank Mini", "sku": "PB-MINI-010"},
+    {"type": "product", "name": "Power Bank Mini Plus", "sku": "PB-MINI-011"},
+    {"type": "policy", "name": "Return Policy"},
+]
+
+
+@pytest.fixture(scope="module")
+def normalizer():
+    return QueryNormalizer(RECORDS)
+
+
+@pytest.fixture(scope="module")
+def catalog_normalizer():
+    return QueryNormalizer(load_catalog_records("product_info.txt"))
+
+
+# ============================================================================
+# REWRITE (RETRIEVAL)
+# ============================================================================
+
+def test_rewrite_spells_out_acronyms(normalizer):
+    assert normalizer.rewrite("Is COD available?") == "Is Cash on Delivery (COD) available?"
+    assert normalizer.rewrite("EMI or UPI?") == "EMI (Equated Monthly Installments) or UPI payment?"
+
+
+def test_rewrite_names_skus_in_any_spelling(normalizer):
+    expected = "SmartWatch Pro X (SW-PRO-X-001) battery"
+    for sku in ["SW-PRO-X-001", "sw pro x 001", "swprox001", "sw-pro-x-001"]:
+        assert normalizer.rewrite(f"{sku} battery") == expected
+
+
+def test_rewrite_adds_what_we_sell_for_brands(normalizer):
+    assert normalizer.rewrite("airpods alternative") == "airpods (wireless earbuds) alternative"
+
+
+def test_rewrite_leaves_words_inside_other_words(normalizer):
+    assert normalizer.rewrite("decode the episode") == "decode the episode"
+
+
+# ============================================================================
+# KEY (CACHES)
+# ============================================================================
+
+def test_key_unifies_synonyms_case_and_punctuation(normalizer):
+    assert normalizer.key("Do you offer Cash on Delivery?") == normalizer.key("do you offer COD") == "do you offer cod"
+    assert normalizer.key("  What   is the PRICE?? ") == "what is the price"
+
+
+@pytest.mark.parametrize("spelling", ["wi-fi", "wi fi", "Wi-Fi", "wifi"])
+def test_key_separator_variants_of_wifi(normalizer, spelling):
+    assert normalizer.key(f"{spelling} range") == "wifi range"
+
+
+@pytest.mark.parametrize("spelling", ["c.o.d", "C.O.D", "cod", "cash on delivery", "pay on delivery"])
+def test_key_separator_variants_of_cod(normalizer, spelling):
+    assert normalizer.key(f"is {spelling} available") == "is cod available"
+
+
+@pytest.mark.parametrize("spelling", ["SW-PRO-X-001", "sw pro x 001", "swprox001", "sw.pro.x.001"])
+def test_key_separator_variants_of_skus(normalizer, spelling):
+    assert normalizer.key(f"price of {spelling}") == "price of sw pro x 001"
+
+
+def test_brand_hints_do_not_change_the_key(normalizer):
+    # A question about AirPods is not a question about our earbuds
+    assert normalizer.key("AirPods alternative?") == "airpods alternative"
+    assert normalizer.key("airpods alternative") != normalizer.key("wireless earbuds alternative")
+
+
+# ============================================================================
+# SKU PREFIXES
+# ============================================================================
+
+def test_unique_prefixes_are_aliases_shared_ones_are_not():
+    skus, prefixes = sku_aliases(RECORDS)
+    assert [entry[0] for entry in skus] == ["sw-pro-x-001", "weather-148", "bike-lock-090", "pb-mini-010", "pb-mini-011"]
+    assert sorted(entry[2][0] for entry in prefixes) == ["BIKE-LOCK", "SW-PRO-X", "WEATHER"]
+
+
+def test_uppercase_prefix_names_the_product(normalizer):
+    assert normalizer.rewrite("SW-PRO-X battery") == "SmartWatch Pro X (SW-PRO-X-001) battery"
+    assert normalizer.key("SW-PRO-X battery") == "sw pro x 001 battery"
+    assert normalizer.rewrite("PB-MINI price") == "PB-MINI price"
+
+
+@pytest.mark.parametrize("query", [
+    "Is the SmartWatch Pro X weather resistant?",
+    "any present for diwali?",
+    "do you have a bike lock",
+    "Does the drone hover in wind?",
+    "posture corrector",
+])
+def test_ordinary_words_are_not_sku_prefixes(catalog_normalizer, query):
+    # WEATHER, PRESENT, BIKE-LOCK, HOVER and POSTURE are catalog SKU prefixes
+    assert catalog_normalizer.rewrite(query) == query
+    assert catalog_normalizer.key(query) == query.lower().rstrip("?")
@@ -0,0 +1,140 @@
+"""
+Unit tests for single_flight.py: joining, leaving and finishing flights
+
+Run: python -m pytest -q test_single_flight.py
+"""
+
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight, coalescing_key
+
+
+class FakeDeadline:
+    def __init__(self, name: str):
+        self.name = name
+
+
+def run(scenario):
+    return asyncio.run(scenario())
+
+
+def test_identical_keys_share_one_run():
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await release.wait()
+            return "answer"
+
+        first, coalesced_first = flights.join("k", work, FakeDeadline("first"))
+        second, coalesced_second = flights.join("k", work, FakeDeadline("second"))
+        assert second is first
+        assert (coalesced_first, coalesced_second) == (False, True)
+        assert first.waiters == 2
+        # The first request's deadline governs the shared run
+        assert first.deadline.name == "first"
+
+        release.set()
+        assert await first.task == "answer"
+        assert flights.leave(first) is False
+        assert flights.leave(second) is False
+        return flights, runs
+
+    flights, runs = run(scenario)
+    assert runs == [1]
+    assert flights.snapshot() == {"in_flight": 0, "started": 1, "coalesced": 1, "abandoned": 0}
+
+
+def test_none_key_never_coalesces():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def work():
+            return 1
+
+        first, _ = flights.join(None, work, None)
+        second, coalesced = flights.join(None, work, None)
+        await asyncio.gather(first.task, second.task)
+        return flights, first, second, coalesced
+
+    flights, first, second, coalesced = run(scenario)
+    assert first is not second and not coalesced
+    assert flights.counters["started"] == 2
+
+
+def test_finished_flight_is_not_joined():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def work():
+            return "done"
+
+        first, _ = flights.join("k", work, None)
+        await first.task
+        await asyncio.sleep(0)  # let the done callback run
+        assert flights.snapshot()["in_flight"] == 0
+        second, coalesced = flights.join("k", work, None)
+        await second.task
+        return first, second, coalesced
+
+    first, second, coalesced = run(scenario)
+    assert second is not first and not coalesced
+
+
+def test_last_waiter_leaving_abandons_the_flight():
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+
+        flight, _ = flights.join("k", work, None)
+        flights.join("k", work, None)
+        # One waiter disconnects: the other still wants the result
+        assert flights.leave(flight) is False
+        assert flights.snapshot()["in_flight"] == 1
+        # The last waiter leaves: the caller should cancel the run's deadline
+        assert flights.leave(flight) is True
+        assert flights.snapshot()["in_flight"] == 0
+
+        # New arrivals start a fresh run instead of joining the abandoned one
+        fresh, coalesced = flights.join("k", work, None)
+        assert fresh is not flight and not coalesced
+        release.set()
+        await asyncio.gather(flight.task, fresh.task)
+        # The abandoned flight finishing late does not drop the fresh one's entry
+        return flights
+
+    flights = run(scenario)
+    assert flights.counters == {"started": 2, "coalesced": 1, "abandoned": 1}
+
+
+def test_failed_flight_raises_for_every_waiter():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0)
+            raise RuntimeError("model down")
+
+        first, _ = flights.join("k", work, None)
+        second, _ = flights.join("k", work, None)
+        for flight in (first, second):
+            with pytest.raises(RuntimeError):
+                await flight.task
+            flights.leave(flight)
+        return flights
+
+    flights = run(scenario)
+    assert flights.snapshot()["in_flight"] == 0
+
+
+def test_coalescing_key_folds_case_punctuation_and_aliases():
+    assert coalescing_key("Do you offer Cash on Delivery?") == coalescing_key("do you offer COD")
+    assert coalescing_key("What is  the price?") == "what is the price"
@@ -0,0 +1,82 @@
+"""
+Startup Warm-up: Build heavy components after the server starts accepting connections
+The API process imports only lightweight modules; the LangGraph workflow,
+catalog snapshot, Gemini clients and RAG chain are built here in a
+background thread. /health answers as soon as the process is up, /ready
+only once every required stage has finished, so orchestrators route
+traffic to warm instances only.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class WarmUp:
+    """
+    Runs named initialization stages in order on a background thread
+
+    Required stages must succeed before the service is ready; optional
+    stages (e.g. pre-building the RAG chain) only make the first requests
+    faster and are logged if they fail.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict] = {}
+        self.started_at: Optional[float] = None
+        self.ready_after: Optional[float] = None
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, stages: List[Tuple[str, Callable[[], object], bool]]):
+        """
+        Start warming up
+
+        Args:
+            stages: (name, function, required) tuples, run in order
+        """
+        self.started_at = time.perf_counter()
+        self.stages = {
+            name: {"status": "pending", "required": required, "seconds": None, "error": None}
+            for name, _, required in stages
+        }
+        self._thread = threading.Thread(target=self._run, args=(stages,), name="warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self, stages: List[Tuple[str, Callable[[], object], bool]]):
+        for name, func, required in stages:
+            stage = self.stages[name]
+            stage["status"] = "running"
+            start = time.perf_counter()
+            try:
+                func()
+                stage["status"] = "done"
+            except Exception as e:
+                stage["status"] = "failed"
+                stage["error"] = f"{type(e).__name__}: {e}"
+                print(f"Warning: warm-up stage '{name}' failed: {stage['error']}")
+            stage["seconds"] = round(time.perf_counter() - start, 3)
+            # A failed required stage keeps the service unready; later stages still run and report
+            if not self._ready.is_set() and self._required_done():
+                self.ready_after = round(time.perf_counter() - self.started_at, 3)
+                self._ready.set()
+                print(f"✓ Service ready after {self.ready_after}s")
+
+    def _required_done(self) -> bool:
+        return all(s["status"] == "done" for s in self.stages.values() if s["required"])
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until ready (or timeout); returns readiness"""
+        return self._ready.wait(timeout)
+
+    def snapshot(self) -> Dict:
+        """Readiness, time to ready and per-stage status (for /ready)"""
+        return {
+            "ready": self.ready,
+            "ready_after_seconds": self.ready_after,
+            "stages": self.stages
+        }